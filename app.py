@@ -9,15 +9,26 @@ streamlit run app.py
 ```
 """
 
+import json
+import time
+from typing import Callable
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
 
 from src.helpers.config import Config
-from src.processing.readers import PDFReader
-from src.processing.chunking import SymbolChunker
-from src.database.chromadb import ChromaDB
-from src.embeddings.ollama import OllamaEmbedding
-from src.database.types import CollectionItem
-from src.llm.ollama import OllamaLLM
+from src.helpers.metrics import METRICS
+from src.builders import (
+    build_answer_cache,
+    build_chunker,
+    build_database,
+    build_embedder,
+    build_llm,
+    build_manifest,
+    build_pipeline,
+    build_reader,
+)
+from src.processing.jobs import IngestionJob, IngestionJobQueue
 
 ###########################################################################################
 ##################################### Configurations ######################################
@@ -26,81 +37,199 @@ CONFIG_PATH = "configs/settings-ollama.yaml"
 CONFIG = Config(CONFIG_PATH)
 
 
+def timed(build: Callable[[Config], object]) -> tuple[object, float]:
+    start = time.perf_counter()
+    component = build(CONFIG)
+    return component, time.perf_counter() - start
+
+
 # https://docs.streamlit.io/develop/concepts/architecture/caching
 @st.cache_resource(show_spinner="Loading models...")
 def load_models():
-    pdf_reader = PDFReader(enable_ocr=CONFIG.readers["enable_ocr"])
-    chunker = SymbolChunker(
-        chars_limit=CONFIG.readers["chunk_size"],
-        overlap=CONFIG.readers["chunk_overlap"],
+    # The components are independent, so they are initialized concurrently. The
+    # Ollama components share a single helper, which checks the server once.
+    start = time.perf_counter()
+    builders = {
+        "reader": build_reader,
+        "chunker": build_chunker,
+        "database": build_database,
+        "embedder": build_embedder,
+        "llm": build_llm,
+        "answer_cache": build_answer_cache,
+    }
+    with ThreadPoolExecutor(max_workers=len(builders)) as executor:
+        futures = {
+            name: executor.submit(timed, build) for name, build in builders.items()
+        }
+        results = {name: future.result() for name, future in futures.items()}
+
+    pdf_reader, chunker, database, embedder, llm, answer_cache = (
+        results[name][0] for name in builders
+    )
+    pipeline = build_pipeline(
+        CONFIG, pdf_reader, chunker, embedder, database, build_manifest(CONFIG)
     )
-    database = ChromaDB(
-        path=CONFIG.vectorstore["path"], name=CONFIG.vectorstore["name"]
+    ingestion_jobs = IngestionJobQueue(
+        pipeline,
+        max_workers=CONFIG.ingestion["max_workers"],
+        upload_dir=CONFIG.ingestion["upload_dir"],
     )
-    embedder = OllamaEmbedding(
-        model=CONFIG.embedding["model"], base_url=CONFIG.embedding["api_url"]
+
+    # Report which models stay loaded, as unloaded models delay the first token
+    llm.helper.monitor(interval=CONFIG.llm["monitor_interval"])
+
+    # Startup times (in seconds) are recorded as spans, so they are exported with
+    # the other metrics and can be tracked across releases
+    startup_times = {name: results[name][1] for name in builders}
+    startup_times["total"] = time.perf_counter() - start
+    for name, seconds in startup_times.items():
+        METRICS.record(f"startup.{name}", seconds)
+    return (
+        pdf_reader,
+        chunker,
+        database,
+        embedder,
+        llm,
+        answer_cache,
+        pipeline,
+        ingestion_jobs,
+        startup_times,
     )
-    llm = OllamaLLM(model=CONFIG.llm["model"], base_url=CONFIG.llm["api_url"])
-    return pdf_reader, chunker, database, embedder, llm
 
 
-pdf_reader, chunker, database, embedder, llm = load_models()
+(
+    pdf_reader,
+    chunker,
+    database,
+    embedder,
+    llm,
+    answer_cache,
+    pipeline,
+    ingestion_jobs,
+    startup_times,
+) = load_models()
+
+# Collections built from embeddings of another model or endpoint would rank the
+# chunks silently wrong, so they are only used once they are cleared
+try:
+    database.check_embedding_space(embedder.space)
+except ValueError as e:
+    st.error(str(e))
+    if st.button("Clear database"):
+        database.remove()
+        pipeline.manifest.clear()
+        ingestion_jobs.clear_finished()
+        st.rerun()
+    st.stop()
 
 ###########################################################################################
 ############################## Side Graphical Interface ###################################
 ###########################################################################################
 st.sidebar.title("📁 Upload your data")
 st.sidebar.write("Upload your PDFs files to populate the database.")
-num_chunks = database.num_documents
+st.sidebar.caption(f"Models loaded in {startup_times['total']:.2f}s")
+st.sidebar.caption(f"Answer cache hit rate: {answer_cache.stats['hit_rate']:.0%}")
+resident_models = [model["name"] for model in llm.helper.resident_models]
+st.sidebar.caption(f"Models in memory: {', '.join(resident_models) or 'none'}")
 st_num_chunks = st.sidebar.empty()
-st_num_chunks.write(f"Number of chunks in the database: {num_chunks}")
-# if the number of chunks is greater than 0, show a button to clear the database
-if num_chunks > 0:
+# if the database has chunks and nothing is loading, show a button to clear it
+if database.num_documents > 0 and not ingestion_jobs.active:
     if st.sidebar.button("Clear database"):
         database.remove()
-        num_chunks = database.num_documents
-        st_num_chunks.empty()
-        st_num_chunks.write(f"Number of chunks in the database: {num_chunks}")
-uploaded_file = st.sidebar.file_uploader("Upload a PDF file", type=["pdf"])
-
-if uploaded_file is not None:
-    pdf_path = "tmp/uploaded_file.pdf"
-    # write the uploaded file to disk
-    with open(pdf_path, "wb") as f:
-        f.write(uploaded_file.read())
-
-    # read the uploaded file
-    reader_placeholder = st.sidebar.empty()
-    reader_placeholder.write("📖 Reading the uploaded file...")
-    pdf_info = pdf_reader.get_text(pdf_path)
-    reader_placeholder.empty()
-
-    # create a list of chunks
-    chunks = chunker.get_chunks(pdf_info)
-
-    # Iterate over the chunks, extract the embeddings and insert them into the database
-    chunks_bar = st.sidebar.progress(0, text="Processing chunks...")
-    for chunk_index, chunk in enumerate(chunks):
-        embedding = embedder.get_embedding(chunk.text)
-        document = CollectionItem(
-            embedding=embedding,
-            document_path=pdf_path,
-            location=chunk.location,
-            text=chunk.text,
-        )
-        database.insert(document)
-        chunks_bar.progress(
-            (chunk_index + 1) / len(chunks),
-            text=f"Processing chunk {chunk_index + 1}/{len(chunks)}",
-        )
+        pipeline.manifest.clear()
+        ingestion_jobs.clear_finished()
+uploaded_files = st.sidebar.file_uploader(
+    "Upload PDF files", type=["pdf"], accept_multiple_files=True
+)
+
+# Files are ingested in the background, so the chat keeps working meanwhile.
+# Streamlit reruns this script on every interaction while the files are still
+# uploaded, but the queue returns the existing job for an already submitted file,
+# so a file that failed is only ingested again with its retry button.
+for uploaded_file in uploaded_files:
+    ingestion_jobs.submit(uploaded_file.name, uploaded_file.getvalue())
 
-    chunks_bar.empty()
+JOB_ICONS = {
+    IngestionJob.QUEUED: "⏳",
+    IngestionJob.RUNNING: "📖",
+    IngestionJob.DONE: "✅",
+    IngestionJob.SKIPPED: "✅",
+    IngestionJob.FAILED: "❌",
+}
 
-    st.sidebar.write("✅ File uploaded successfully!")
-    st.sidebar.write("Uploaded file has been processed and added to the database.")
-    num_chunks = database.num_documents
-    st_num_chunks.empty()
-    st_num_chunks.write(f"Number of chunks in the database: {num_chunks}")
+
+# Only this part of the sidebar is refreshed while the files are loading
+@st.experimental_fragment(run_every=2 if ingestion_jobs.active else None)
+def show_ingestion_jobs() -> None:
+    st_num_chunks.write(f"Number of chunks in the database: {database.num_documents}")
+    for job in reversed(ingestion_jobs.jobs):
+        if job.status == IngestionJob.RUNNING:
+            st.progress(
+                job.fraction,
+                text=f"{JOB_ICONS[job.status]} {job.name}: "
+                f"{job.progress.get('read', 0)}/{job.total_pages} pages, "
+                f"{job.progress.get('insert', 0)} chunks processed",
+            )
+        elif job.status == IngestionJob.DONE:
+            st.write(f"{JOB_ICONS[job.status]} {job.name}: {job.chunks} chunks added")
+        elif job.status == IngestionJob.SKIPPED:
+            st.write(f"{JOB_ICONS[job.status]} {job.name} is already in the database")
+        elif job.status == IngestionJob.FAILED:
+            st.write(f"{JOB_ICONS[job.status]} {job.name}: {job.error}")
+            if st.button("Retry", key=f"retry-{job.document_hash}"):
+                ingestion_jobs.retry(job)
+                st.rerun()  # Refresh the whole sidebar while the job runs
+        else:
+            st.write(f"{JOB_ICONS[job.status]} {job.name} is waiting to be loaded")
+
+
+with st.sidebar:
+    show_ingestion_jobs()
+
+# Scope the questions to a single document, searching only its chunks
+ALL_DOCUMENTS = "All documents"
+search_scope = st.sidebar.selectbox(
+    "Search in", [ALL_DOCUMENTS, *pipeline.manifest.document_paths]
+)
+search_filter = (
+    None if search_scope == ALL_DOCUMENTS else {"document_path": search_scope}
+)
+
+# Timings of the stages of the previous queries and ingestions
+with st.sidebar.expander("⏱️ Stage timings"):
+    metrics = METRICS.to_dict()
+    if metrics["stages"]:
+        st.dataframe(
+            [
+                {"stage": stage, **values}
+                for stage, values in sorted(metrics["stages"].items())
+            ],
+            hide_index=True,
+        )
+        st.write("Latest spans")
+        st.dataframe(
+            [
+                {"stage": span["stage"], "ms": span["ms"], "error": span["error"]}
+                for span in METRICS.recent()
+            ],
+            hide_index=True,
+        )
+        st.write("Ollama endpoints")
+        st.dataframe(
+            [
+                {"endpoint": path, **values}
+                for path, values in llm.helper.client.metrics.items()
+            ],
+            hide_index=True,
+        )
+        st.download_button(
+            "Export (Prometheus)", METRICS.to_prometheus(), file_name="metrics.txt"
+        )
+        st.download_button(
+            "Export (JSON)", json.dumps(metrics, indent=2), file_name="metrics.json"
+        )
+    else:
+        st.write("Nothing measured yet.")
 
 
 ###########################################################################################
@@ -118,7 +247,26 @@ for msg in st.session_state.messages:
 
 if query := st.chat_input():
     query_embedding = embedder.get_embedding(query)
-    query_context = database.search(query_embedding, top_k=CONFIG.embedding["top_k"])
+    # Near-identical questions over the same collection reuse the cached answer.
+    # Answers scoped to a single document or following previous questions,
+    # which are part of the prompt, are not cached.
+    cacheable = search_filter is None and not any(
+        msg["role"] == "user" for msg in st.session_state.messages
+    )
+    database_version = database.version
+    cached_answer = None
+    if cacheable:
+        cached_answer = answer_cache.lookup(query_embedding, database_version)
+    if cached_answer is not None:
+        query_context = cached_answer.query_context
+    else:
+        with METRICS.span("database.search"):
+            query_context = database.search(
+                query_embedding,
+                top_k=CONFIG.embedding["top_k"],
+                where=search_filter,
+                query_text=query,
+            )
 
     # print the query context
     with st.expander("Query context"):
@@ -129,7 +277,27 @@ if query := st.chat_input():
     st.session_state.messages.append({"role": "user", "content": query})
     st.chat_message("user").write(query)
 
-    msg = llm.ask(st.session_state.messages, query_context=query_context)
+    # Render the answer as it is generated and keep the full text in the history
+    with st.chat_message("assistant"):
+        if cached_answer is not None:
+            msg = cached_answer.answer
+            st.write(msg)
+            st.caption("Answer served from the cache")
+        else:
+            stream = llm.ask_stream(
+                st.session_state.messages, query_context=query_context
+            )
+            msg = st.write_stream(stream)
+            if cacheable:
+                answer_cache.store(
+                    query_embedding, database_version, msg, query_context
+                )
+            if stream.time_to_first_token is not None:
+                tokens_per_second = stream.tokens_per_second or 0.0
+                prompt_tokens = stream.stats["prompt_tokens"]
+                st.caption(
+                    f"Prompt of ~{prompt_tokens} tokens, "
+                    f"first token after {stream.time_to_first_token:.2f}s, "
+                    f"{tokens_per_second:.1f} tokens/s"
+                )
     st.session_state.messages.append({"role": "assistant", "content": msg})
-
-    st.chat_message("assistant").write(msg)
@@ -0,0 +1,64 @@
+"""
+Benchmark of SymbolChunker on pages of increasing size.
+The time per MB should stay flat as the pages grow (linear scaling).
+
+Usage:
+```bash
+python -m benchmarks.chunking --sizes 1 2 4 8
+```
+"""
+
+import json
+import time
+import random
+import argparse
+
+from src.processing.readers import Extraction
+from src.processing.chunking import SymbolChunker
+
+
+def synthetic_page(size_mb: float, seed: int = 0) -> str:
+    """Build a page of random words and lines of about `size_mb` megabytes."""
+    rng = random.Random(seed)
+    words = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing"]
+    target = int(size_mb * 2**20)
+    lines, length = [], 0
+    while length < target:
+        line = " ".join(rng.choices(words, k=rng.randint(2, 20)))
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--chunk-size", type=int, default=1024)
+    parser.add_argument("--chunk-overlap", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    chunker = SymbolChunker(chars_limit=args.chunk_size, overlap=args.chunk_overlap)
+    for size_mb in args.sizes:
+        page = [Extraction(text=synthetic_page(size_mb), location="Page 1")]
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            chunks = chunker.get_chunks(page)
+            timings.append(time.perf_counter() - start)
+
+        best = min(timings)
+        print(
+            json.dumps(
+                {
+                    "size_mb": size_mb,
+                    "chunks": len(chunks),
+                    "seconds": round(best, 6),
+                    "seconds_per_mb": round(best / size_mb, 6),
+                }
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Offline benchmark of the components on the hot path: PDF text extraction,
+chunking, embedding, ChromaDB insert and search, and the LLM. Ollama is
+replaced by the stub server with fixed latencies and the PDFs are generated,
+so the results only change with the code.
+
+Each result is printed as a JSON line with the p50/p99 latency and the
+throughput. With `--output`, the report is also saved, and a report saved
+from a previous version is compared with `--baseline`.
+
+Usage:
+```bash
+python -m benchmarks.components --output report.json
+python -m benchmarks.components --baseline report.json
+```
+"""
+
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+from typing import Any, Callable
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from src.database.chromadb import ChromaDB
+from src.database.types import CollectionItem
+from src.embeddings.ollama import OllamaEmbedding
+from src.helpers.ollama_stub import OllamaStub
+from src.llm.ollama import OllamaLLM
+from src.processing.chunking import SymbolChunker
+from src.processing.readers import PDFReader
+
+WORDS = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing"]
+
+
+def synthetic_pdf(path: str, num_pages: int, seed: int = 0) -> None:
+    """Write a digital PDF whose pages are filled with lines of random words."""
+    rng = random.Random(seed)
+    with fitz.open() as doc:
+        for _ in range(num_pages):
+            page = doc.new_page()
+            lines = [" ".join(rng.choices(WORDS, k=12)) for _ in range(50)]
+            text = "\n".join(lines)  # About 4 KB, which fits the page at 9 pt
+            page.insert_textbox(page.rect + (36, 36, -36, -36), text, fontsize=9)
+        doc.save(path)
+
+
+def summary(timings: list[float], items: int, unit: str) -> dict:
+    """Summarize latencies in seconds, with the throughput in `unit` per second."""
+    milliseconds = np.asarray(timings) * 1000
+    return {
+        "calls": len(timings),
+        "p50_ms": round(float(np.percentile(milliseconds, 50)), 3),
+        "p99_ms": round(float(np.percentile(milliseconds, 99)), 3),
+        f"{unit}_per_second": round(items / sum(timings), 1),
+    }
+
+
+def timed(function: Callable[[Any], Any], inputs: list) -> tuple[list[float], list]:
+    """Call `function` on each input, returning the durations and the outputs."""
+    timings, outputs = [], []
+    for value in inputs:
+        start = time.perf_counter()
+        outputs.append(function(value))
+        timings.append(time.perf_counter() - start)
+    return timings, outputs
+
+
+def run(args: argparse.Namespace, folder: str, stub: OllamaStub) -> dict:
+    """Run every benchmark and return the results by name."""
+    results = {}
+
+    paths = []
+    for num_pages in args.pages:
+        paths.append(f"{folder}/{num_pages}.pdf")
+        synthetic_pdf(paths[-1], num_pages)
+    reader = PDFReader()
+    try:
+        for path, num_pages in zip(paths, args.pages):
+            timings, outputs = timed(reader.get_text, [path] * args.repeat)
+            results[f"pdf_reader.get_text.{num_pages}_pages"] = summary(
+                timings, num_pages * args.repeat, "pages"
+            )
+    finally:
+        reader.close()  # Stops the worker processes of the extraction
+    extractions = outputs[-1]  # Of the largest PDF
+
+    chunker = SymbolChunker(chars_limit=args.chunk_size, overlap=args.chunk_overlap)
+    timings, outputs = timed(chunker.get_chunks, [extractions] * args.repeat)
+    chunks = outputs[-1]
+    results["symbol_chunker.get_chunks"] = summary(
+        timings, len(chunks) * args.repeat, "chunks"
+    )
+
+    embedder = OllamaEmbedding(model="nomic-embed-text", base_url=stub.url)
+    texts = [chunk.text for chunk in chunks][: args.queries]
+    timings, _ = timed(embedder.get_embedding, texts)
+    results["ollama_embedding.get_embedding"] = summary(timings, len(texts), "texts")
+    start = time.perf_counter()
+    embeddings = embedder.get_embeddings([chunk.text for chunk in chunks])
+    results["ollama_embedding.get_embeddings"] = summary(
+        [time.perf_counter() - start], len(chunks), "texts"
+    )
+
+    database = ChromaDB(path=f"{folder}/chromadb", name="benchmark")
+    documents = [
+        CollectionItem(
+            id=str(index),
+            text=chunk.text,
+            embedding=embedding,
+            document_path=paths[-1],
+            location=chunk.location,
+        )
+        for index, (chunk, embedding) in enumerate(zip(chunks, embeddings))
+    ]
+    timings, _ = timed(database.insert, documents)
+    results["chromadb.insert"] = summary(timings, len(documents), "documents")
+    queries = embeddings[: args.queries]
+    timings, _ = timed(lambda query: database.search(query, top_k=3), queries)
+    results["chromadb.search"] = summary(timings, len(queries), "queries")
+
+    llm = OllamaLLM(model="phi3", base_url=stub.url)
+    questions = [f"Question {index}" for index in range(args.questions)]
+    timings, _ = timed(llm.ask, questions)
+    results["ollama_llm.ask"] = summary(timings, len(questions), "answers")
+    streams = []
+    for question in questions:
+        stream = llm.ask_stream(question)
+        "".join(stream)
+        streams.append(stream)
+    results["ollama_llm.ask_stream"] = {
+        **summary([stream.total_time for stream in streams], len(streams), "answers"),
+        "time_to_first_token_p50_ms": round(
+            float(np.median([stream.time_to_first_token for stream in streams]))
+            * 1000,
+            3,
+        ),
+    }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=1024)
+    parser.add_argument("--chunk-overlap", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--embed-latency", type=float, default=0.005)
+    parser.add_argument("--first-token-latency", type=float, default=0.05)
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    parser.add_argument("--output", help="save the report to this JSON file")
+    parser.add_argument("--baseline", help="compare with a report saved before")
+    args = parser.parse_args()
+
+    stub = OllamaStub(
+        embed_latency=args.embed_latency,
+        first_token_latency=args.first_token_latency,
+        token_latency=args.token_latency,
+    )
+    with stub, tempfile.TemporaryDirectory() as folder:
+        results = run(args, folder, stub)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+    for name, result in results.items():
+        if name in baseline:
+            # Ratio of the p50 latencies: above 1 is slower than the baseline
+            result["p50_vs_baseline"] = round(
+                result["p50_ms"] / max(baseline[name]["p50_ms"], 1e-6), 3
+            )
+        print(json.dumps({"benchmark": name, **result}))
+
+    if args.output:
+        report = {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "arguments": {
+                key: value
+                for key, value in vars(args).items()
+                if key not in ("output", "baseline")
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Latency and throughput of concurrent single-text embedding calls (e.g. the
+queries of many sessions), sent directly or coalesced by the micro-batching
+scheduler. Ollama is replaced by the stub server, which evaluates a limited
+number of requests at the same time like a real server.
+
+Usage:
+```bash
+python -m benchmarks.embedding_batching --threads 32 --num-parallel 1
+```
+"""
+
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from src.helpers.ollama_stub import OllamaStub
+from src.embeddings.ollama import OllamaEmbedding
+from src.embeddings.batching import BatchingEmbedding
+from src.embeddings.types import EmbeddingModel
+from benchmarks.components import summary
+
+
+def concurrent_calls(embedder: EmbeddingModel, threads: int, calls: int) -> dict:
+    """Embed `calls` texts from `threads` threads, one text per call."""
+
+    def call(index: int) -> float:
+        start = time.perf_counter()
+        embedder.get_embedding(f"Query number {index}")
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        timings = list(executor.map(call, range(calls)))
+    elapsed = time.perf_counter() - start
+    result = summary(timings, calls, "texts")
+    # The calls overlap, so the throughput is over the wall-clock time
+    result["texts_per_second"] = round(calls / elapsed, 1)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-concurrency", type=int, default=2)
+    parser.add_argument("--embed-latency", type=float, default=0.01)
+    parser.add_argument("--embed-latency-per-text", type=float, default=0.0005)
+    parser.add_argument("--num-parallel", type=int, default=1)
+    args = parser.parse_args()
+
+    with OllamaStub(
+        embed_latency=args.embed_latency,
+        embed_latency_per_text=args.embed_latency_per_text,
+        num_parallel=args.num_parallel,
+    ) as stub:
+        embedder = OllamaEmbedding(model="nomic-embed-text", base_url=stub.url)
+        embedder.get_embedding("Warm up")
+        batcher = BatchingEmbedding(
+            embedder,
+            window_ms=args.window_ms,
+            max_batch_size=args.max_batch_size,
+            max_concurrency=args.max_concurrency,
+        )
+        results = {
+            "direct": concurrent_calls(embedder, args.threads, args.calls),
+            "batching": concurrent_calls(batcher, args.threads, args.calls),
+        }
+        results["batching"].update(batcher.stats)
+        batcher.close()
+
+    for name, result in results.items():
+        print(
+            json.dumps(
+                {
+                    "benchmark": f"embedding.{name}",
+                    "threads": args.threads,
+                    **result,
+                }
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Latency of the hybrid search, where only the vectors of the BM25 matches of
+selective keywords are scored, against the vector search alone, for keyword
+queries on a synthetic collection.
+
+Usage:
+```bash
+python -m benchmarks.lexical --documents 100000 --database numpy
+```
+"""
+
+import json
+import argparse
+import tempfile
+
+import numpy as np
+
+from src.helpers.metrics import METRICS
+from src.database import load_vector_database
+from src.database.types import CollectionItem
+from src.database.lexical import LexicalIndex
+from src.database.hybrid import HybridDatabase
+from benchmarks.vector_search import latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--documents", type=int, default=100_000)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--database", default="numpy", help="chromadb or numpy")
+    parser.add_argument("--vocabulary", type=int, default=50_000)
+    parser.add_argument("--words", type=int, default=150, help="words per chunk")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--candidates", type=int, default=200)
+    args = parser.parse_args()
+
+    # Zipf-distributed words, so that most terms are rare as in real text
+    rng = np.random.default_rng(0)
+    words = rng.zipf(1.2, size=(args.documents, args.words)) % args.vocabulary
+    texts = [" ".join(f"w{word}" for word in row) for row in words]
+    vectors = rng.standard_normal((args.documents, args.dimension)).astype(np.float32)
+    picked = rng.integers(args.documents, size=args.queries)
+    # Keyword queries: a few of the rarest words of a chunk
+    queries = [
+        " ".join(f"w{word}" for word in sorted(set(words[index]), reverse=True)[:3])
+        for index in picked
+    ]
+
+    with tempfile.TemporaryDirectory() as folder:
+        database = load_vector_database(
+            args.database, path=folder, name="documents", batch_size=5000
+        )
+        hybrid = HybridDatabase(
+            database,
+            LexicalIndex(f"{folder}/documents.lexical.sqlite"),
+            candidates=args.candidates,
+        )
+        documents = [
+            CollectionItem(
+                id=str(index),
+                text=text,
+                embedding=vector.tolist(),
+                document_path="benchmark.pdf",
+                location=f"Page {index}",
+            )
+            for index, (text, vector) in enumerate(zip(texts, vectors))
+        ]
+        for start in range(0, len(documents), 5000):
+            hybrid.insert_many(documents[start : start + 5000])
+
+        candidates = [
+            len(hybrid.index.search(query, args.candidates)) for query in queries
+        ]
+        positions = list(range(args.queries))
+        METRICS.reset()
+        results = {
+            "vector": latencies(
+                lambda index: database.search(
+                    vectors[picked[index]].tolist(), top_k=args.top_k
+                ),
+                positions,
+            ),
+            "hybrid": latencies(
+                lambda index: hybrid.search(
+                    vectors[picked[index]].tolist(),
+                    top_k=args.top_k,
+                    query_text=queries[index],
+                ),
+                positions,
+            ),
+        }
+        results["hybrid"]["lexical_matches"] = round(float(np.mean(candidates)), 1)
+        # Share of the searches that scored only the lexical matches
+        pruned = METRICS.to_dict()["counters"].get("database.pruned_searches", 0)
+        results["hybrid"]["pruned_share"] = round(pruned / args.queries, 3)
+
+    for name, result in results.items():
+        print(
+            json.dumps(
+                {
+                    "benchmark": f"{args.database}.{name}",
+                    "documents": args.documents,
+                    **result,
+                }
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
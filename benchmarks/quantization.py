@@ -0,0 +1,95 @@
+"""
+Recall and latency of the NumpyDB precisions: the float16 and int8 candidate
+searches, with their full-precision rerank, against the exact float32 search.
+
+Usage:
+```bash
+python -m benchmarks.quantization --documents 50000 --dimension 768
+```
+"""
+
+import json
+import argparse
+import tempfile
+
+import numpy as np
+
+from src.database.numpydb import NumpyDB
+from benchmarks.vector_search import fill, latencies
+
+
+def clustered(
+    rng: np.random.Generator, count: int, centers: np.ndarray, noise: float
+) -> np.ndarray:
+    """Sample vectors around random centers, closer to real embeddings than noise."""
+    labels = rng.integers(len(centers), size=count)
+    noise = noise * rng.standard_normal((count, centers.shape[1]))
+    return (centers[labels] + noise).astype(np.float32)
+
+
+def recall(database: NumpyDB, queries: np.ndarray, exact: list, top_k: int) -> float:
+    """Fraction of the exact top k found by the database."""
+    found = database.search_many(queries.tolist(), top_k=top_k)
+    hits = sum(
+        len({item.id for item in items} & expected)
+        for items, expected in zip(found, exact)
+    )
+    return hits / sum(len(expected) for expected in exact)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--documents", type=int, default=50_000)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--rerank-factors", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((64, args.dimension))
+    vectors = clustered(rng, args.documents, centers, noise=0.5)
+    queries = clustered(rng, args.queries, centers, noise=0.5)
+
+    with tempfile.TemporaryDirectory() as folder:
+        exact_db = NumpyDB(path=folder, batch_size=5000)
+        fill(exact_db, vectors)
+        exact = [
+            {item.id for item in items}
+            for items in exact_db.search_many(queries.tolist(), top_k=args.top_k)
+        ]
+        configurations = [("float32", 1)] + [
+            (precision, factor)
+            for precision in ("float16", "int8")
+            for factor in args.rerank_factors
+        ]
+        for precision, factor in configurations:
+            # Reopening the same files builds the compact copy from the float32 matrix
+            database = NumpyDB(
+                path=folder, batch_size=5000, precision=precision, rerank_factor=factor
+            )
+            result = latencies(
+                lambda query: database.search(query.tolist(), top_k=args.top_k),
+                queries,
+            )
+            bytes_per_vector = 4 * args.dimension
+            if database.compact:  # Compact rows and their scale, scanned by a search
+                bytes_per_vector = database.codes.itemsize * args.dimension + 4
+            print(
+                json.dumps(
+                    {
+                        "precision": precision,
+                        "rerank_factor": factor,
+                        "documents": args.documents,
+                        f"recall@{args.top_k}": round(
+                            recall(database, queries, exact, args.top_k), 4
+                        ),
+                        "scanned_bytes_per_vector": bytes_per_vector,
+                        **result,
+                    }
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
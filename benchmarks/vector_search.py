@@ -0,0 +1,108 @@
+"""
+Latency comparison of the vector databases: ChromaDB against NumpyDB, with
+single and batched queries, on the same random collection. The cost of
+fetching the embeddings with the results is measured on ChromaDB.
+
+Usage:
+```bash
+python -m benchmarks.vector_search --documents 20000 --dimension 768
+```
+"""
+
+import json
+import time
+import argparse
+import tempfile
+from typing import Any, Callable
+
+import numpy as np
+
+from src.database.types import CollectionItem, VectorDatabase
+from src.database.chromadb import ChromaDB
+from src.database.numpydb import NumpyDB
+
+
+def fill(database: VectorDatabase, vectors: np.ndarray) -> None:
+    """Insert one document per vector."""
+    database.insert_many(
+        [
+            CollectionItem(
+                id=str(index),
+                text=f"Document {index}",
+                embedding=vector.tolist(),
+                document_path="benchmark.pdf",
+                location=f"Page {index}",
+            )
+            for index, vector in enumerate(vectors)
+        ]
+    )
+
+
+def latencies(search: Callable[[np.ndarray], Any], queries: np.ndarray) -> dict:
+    """Time `search` on each query and summarize the latencies in milliseconds."""
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(float(np.percentile(timings, 50)), 3),
+        "p99_ms": round(float(np.percentile(timings, 99)), 3),
+        "queries_per_second": round(1000 * len(timings) / sum(timings), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--documents", type=int, default=20_000)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--batch", type=int, default=32, help="queries per search_many")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.documents, args.dimension)).astype(np.float32)
+    queries = rng.standard_normal((args.queries, args.dimension)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as folder:
+        chroma = ChromaDB(path=f"{folder}/chromadb", batch_size=5000)
+        numpy_db = NumpyDB(path=f"{folder}/numpydb", batch_size=5000)
+        fill(chroma, vectors)
+        fill(numpy_db, vectors)
+
+        results = {
+            "chromadb.search[embeddings]": latencies(
+                lambda query: chroma.search(
+                    query.tolist(), top_k=args.top_k, include_embeddings=True
+                ),
+                queries,
+            ),
+            "chromadb.search": latencies(
+                lambda query: chroma.search(query.tolist(), top_k=args.top_k), queries
+            ),
+            "numpy.search": latencies(
+                lambda query: numpy_db.search(query.tolist(), top_k=args.top_k),
+                queries,
+            ),
+        }
+
+        batches = queries[: len(queries) // args.batch * args.batch].reshape(
+            -1, args.batch, args.dimension
+        )
+        for name, database in (("chromadb", chroma), ("numpy", numpy_db)):
+            batched = latencies(
+                lambda batch: database.search_many(batch.tolist(), top_k=args.top_k),
+                batches,
+            )
+            batched["queries_per_second"] = round(
+                batched["queries_per_second"] * args.batch, 1
+            )
+            results[f"{name}.search_many[{args.batch}]"] = batched
+
+    for name, result in results.items():
+        print(json.dumps({"benchmark": name, "documents": args.documents, **result}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Headless bulk ingestion of a directory tree of PDFs into the vector store,
+with the same components and configuration as the web app.
+
+Progress is checkpointed next to the vector store, so an interrupted run
+(Ctrl-C, crash, reboot) resumes where it stopped when it is run again:
+files already ingested are skipped without being read.
+
+Usage:
+```bash
+python ingest.py data/ --workers 4
+python ingest.py data/ --retry-failed
+```
+"""
+
+import os
+import sys
+import json
+import argparse
+
+from src.helpers.config import Config
+from src.helpers.metrics import METRICS
+from src.builders import (
+    build_chunker,
+    build_database,
+    build_embedder,
+    build_manifest,
+    build_pipeline,
+    build_reader,
+    store_file_path,
+)
+from src.processing.bulk import BulkIngestion, IngestionCheckpoint, find_files
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("directory", help="directory tree of the files to ingest")
+    parser.add_argument("--config", default="configs/settings-ollama.yaml")
+    parser.add_argument("--pattern", default="*.pdf", help="glob of the file names")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="files ingested at the same time (default: ingestion.max_workers)",
+    )
+    parser.add_argument(
+        "--checkpoint", help="checkpoint file (default: next to the vector store)"
+    )
+    parser.add_argument(
+        "--save-interval",
+        type=float,
+        default=30.0,
+        help="seconds between two saves of the manifest and the checkpoint",
+    )
+    parser.add_argument(
+        "--retry-failed", action="store_true", help="retry the files that failed"
+    )
+    args = parser.parse_args()
+
+    config = Config(args.config)
+    files = [os.path.abspath(path) for path in find_files(args.directory, args.pattern)]
+    print(f"Found {len(files)} files in {args.directory}", file=sys.stderr)
+
+    embedder, database = build_embedder(config), build_database(config)
+    try:
+        database.check_embedding_space(embedder.space)
+    except ValueError as e:
+        sys.exit(str(e))
+
+    # The whole manifest is written on each save, so it is saved periodically
+    # with the checkpoint instead of after every file
+    pipeline = build_pipeline(
+        config,
+        build_reader(config),
+        build_chunker(config),
+        embedder,
+        database,
+        build_manifest(config, autosave=False),
+    )
+    checkpoint = IngestionCheckpoint(
+        args.checkpoint or store_file_path(config, "ingest-checkpoint.jsonl")
+    )
+    ingestion = BulkIngestion(
+        pipeline,
+        checkpoint,
+        root=os.path.abspath(args.directory),
+        max_workers=args.workers or config.ingestion["max_workers"],
+        save_interval=args.save_interval,
+        retry_failed=args.retry_failed,
+    )
+
+    processed = 0
+
+    def report(record: dict) -> None:
+        nonlocal processed
+        processed += 1
+        outcome = (
+            f"{record['chunks']} chunks"
+            if record["status"] == "done"
+            else record["error"]
+        )
+        print(
+            f"[{processed}] {record['status']} {record['document_path']}: "
+            f"{outcome} ({record['seconds']:.1f}s)",
+            file=sys.stderr,
+        )
+
+    try:
+        summary = ingestion.run(files, on_result=report)
+    except KeyboardInterrupt:
+        print("Interrupted, run again to resume.", file=sys.stderr)
+        sys.exit(130)
+    finally:
+        pipeline.reader.close()
+
+    # Machine-readable summary with the time spent in each stage
+    summary["stages"] = METRICS.to_dict()["stages"]
+    print(json.dumps(summary))
+    sys.exit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+HTTP service answering questions over the vector store, with the same
+components and configuration as the web app.
+
+Endpoints:
+- POST /retrieve {"query", "top_k", "document_path"}: chunks closest to the query.
+- POST /ask {"query", "history", "top_k", "document_path", "stream"}: answer with
+  its context, streamed as JSON lines (context, tokens, then stats) unless
+  "stream" is false.
+- GET /health and GET /metrics (Prometheus).
+
+Usage:
+```bash
+python serve.py --port 8000
+python -m src.helpers.ollama_stub --port 11435 &  # Without Ollama, for testing
+python serve.py --ollama-url http://127.0.0.1:11435
+```
+"""
+
+import sys
+import argparse
+
+import uvicorn
+
+from src.helpers.config import Config
+from src.builders import build_answer_cache, build_database, build_embedder, build_llm
+from src.service import create_app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--config", default="configs/settings-ollama.yaml")
+    parser.add_argument("--host", help="default: service.host")
+    parser.add_argument("--port", type=int, help="default: service.port")
+    parser.add_argument("--ollama-url", help="Ollama server of both models")
+    args = parser.parse_args()
+
+    config = Config(args.config)
+    if args.ollama_url:
+        config.llm["api_url"] = config.embedding["api_url"] = args.ollama_url
+
+    embedder, database = build_embedder(config), build_database(config)
+    try:
+        database.check_embedding_space(embedder.space)
+    except ValueError as e:
+        sys.exit(str(e))
+
+    app = create_app(
+        embedder=embedder,
+        database=database,
+        llm=build_llm(config),
+        answer_cache=build_answer_cache(config),
+        top_k=config.embedding["top_k"],
+        max_concurrency=config.service["max_concurrency"],
+        max_queue=config.service["max_queue"],
+    )
+    uvicorn.run(
+        app,
+        host=args.host or config.service["host"],
+        port=args.port or config.service["port"],
+    )
+
+
+if __name__ == "__main__":
+    main()
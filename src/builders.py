@@ -0,0 +1,147 @@
+"""
+Builders of the components from the configuration, shared by the web app and
+the command-line tools so that both read, chunk, embed and store the same way.
+"""
+
+import os
+
+from src.helpers.config import Config
+from src.processing.readers import PDFReader
+from src.processing.chunking import SymbolChunker
+from src.processing.manifest import IngestionManifest
+from src.processing.pipeline import IngestionPipeline
+from src.database import load_vector_database
+from src.database.types import VectorDatabase
+from src.database.lexical import LexicalIndex
+from src.database.hybrid import HybridDatabase
+from src.embeddings.ollama import OllamaEmbedding
+from src.embeddings.cache import CachedEmbedding
+from src.embeddings.batching import BatchingEmbedding
+from src.embeddings.types import EmbeddingModel
+from src.llm.ollama import OllamaLLM
+from src.llm.cache import SemanticAnswerCache
+from src.llm.prompt import PromptBuilder
+
+
+def build_reader(config: Config) -> PDFReader:
+    return PDFReader(
+        enable_ocr=config.readers["enable_ocr"],
+        num_workers=config.readers["num_workers"],
+        pages_per_task=config.readers["pages_per_task"],
+        ocr_batch_size=config.readers["ocr_batch_size"],
+        ocr_dpi=config.readers["ocr_dpi"],
+    )
+
+
+def build_chunker(config: Config) -> SymbolChunker:
+    return SymbolChunker(
+        chars_limit=config.readers["chunk_size"],
+        overlap=config.readers["chunk_overlap"],
+    )
+
+
+def build_database(config: Config) -> VectorDatabase:
+    database = load_vector_database(
+        database=config.vectorstore["database"],
+        path=config.vectorstore["path"],
+        name=config.vectorstore["name"],
+        batch_size=config.vectorstore["batch_size"],
+        precision=config.vectorstore["precision"],
+        rerank_factor=config.vectorstore["rerank_factor"],
+    )
+    lexical = config.vectorstore["lexical"]
+    if not lexical["enabled"]:
+        return database
+    # The index lives next to the vector store and follows its writes
+    index = LexicalIndex(
+        os.path.join(database.path, f"{database.name}.lexical.sqlite")
+    )
+    return HybridDatabase(
+        database,
+        index,
+        candidates=lexical["candidates"],
+        rrf_k=lexical["rrf_k"],
+        max_candidate_share=lexical["max_candidate_share"],
+    )
+
+
+def build_embedder(config: Config) -> CachedEmbedding:
+    embedder = OllamaEmbedding(
+        model=config.embedding["model"],
+        base_url=config.embedding["api_url"],
+        batch_size=config.embedding["batch_size"],
+        max_concurrency=config.embedding["max_concurrency"],
+        keep_alive=config.embedding["keep_alive"],
+        options=config.embedding["options"],
+    )
+    batching = config.embedding["batching"]
+    if batching["enabled"]:
+        # Under the cache, so only the texts missing from it are batched
+        embedder = BatchingEmbedding(
+            embedder,
+            window_ms=batching["window_ms"],
+            max_batch_size=batching["max_batch_size"],
+            max_concurrency=config.embedding["max_concurrency"],
+        )
+    return CachedEmbedding(
+        embedder,
+        path=config.embedding["cache"]["path"],
+        max_memory_items=config.embedding["cache"]["max_memory_items"],
+        max_disk_items=config.embedding["cache"]["max_disk_items"],
+    )
+
+
+def build_llm(config: Config) -> OllamaLLM:
+    return OllamaLLM(
+        model=config.llm["model"],
+        base_url=config.llm["api_url"],
+        prompt_builder=PromptBuilder(
+            max_prompt_tokens=config.llm["max_prompt_tokens"],
+            max_context_tokens=config.llm["max_context_tokens"],
+        ),
+        keep_alive=config.llm["keep_alive"],
+        options=config.llm["options"],
+    )
+
+
+def build_answer_cache(config: Config) -> SemanticAnswerCache:
+    return SemanticAnswerCache(
+        similarity_threshold=config.llm["answer_cache"]["similarity_threshold"],
+        ttl_seconds=config.llm["answer_cache"]["ttl_seconds"],
+        max_entries=config.llm["answer_cache"]["max_entries"],
+    )
+
+
+def store_file_path(config: Config, suffix: str) -> str:
+    # Files describing the content of the vector store live next to it. The
+    # backends share the folder, so the files are named after the collection
+    # and the backend, and switching backend does not reuse another's records.
+    vectorstore = config.vectorstore
+    return os.path.join(
+        vectorstore["path"], f"{vectorstore['name']}.{vectorstore['database']}.{suffix}"
+    )
+
+
+def build_manifest(config: Config, autosave: bool = True) -> IngestionManifest:
+    return IngestionManifest(
+        store_file_path(config, "manifest.json"), autosave=autosave
+    )
+
+
+def build_pipeline(
+    config: Config,
+    reader: PDFReader,
+    chunker: SymbolChunker,
+    embedder: EmbeddingModel,
+    database: VectorDatabase,
+    manifest: IngestionManifest,
+) -> IngestionPipeline:
+    return IngestionPipeline(
+        reader=reader,
+        chunker=chunker,
+        embedder=embedder,
+        database=database,
+        batch_size=config.ingestion["batch_size"],
+        queue_size=config.ingestion["queue_size"],
+        manifest=manifest,
+    )
@@ -0,0 +1,43 @@
+from src.database.types import VectorDatabase
+
+
+def load_vector_database(
+    database: str,
+    path: str,
+    name: str,
+    batch_size: int = 256,
+    precision: str = "float32",
+    rerank_factor: int = 4,
+) -> VectorDatabase:
+    """Create the vector database selected in the configuration.
+
+    Args:
+        database (str): Type of database, "chromadb" or "numpy".
+        path (str): Path to the database.
+        name (str): Name of the database.
+        batch_size (int, optional): Number of documents written per call on bulk inserts. Defaults to 256.
+        precision (str, optional): Precision of the candidate search, NumpyDB only. Defaults to "float32".
+        rerank_factor (int, optional): Shortlist size reranked at full precision, NumpyDB only. Defaults to 4.
+
+    Raises:
+        ValueError: If the type of database is not supported.
+
+    Returns:
+        VectorDatabase: The vector database.
+    """
+    # Backends are imported on demand, so only the selected one has to be installed
+    if database == "chromadb":
+        from src.database.chromadb import ChromaDB
+
+        return ChromaDB(path=path, name=name, batch_size=batch_size)
+    if database == "numpy":
+        from src.database.numpydb import NumpyDB
+
+        return NumpyDB(
+            path=path,
+            name=name,
+            batch_size=batch_size,
+            precision=precision,
+            rerank_factor=rerank_factor,
+        )
+    raise ValueError(f"Unknown vector database: {database}")
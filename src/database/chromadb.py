@@ -1,18 +1,25 @@
+from typing import Iterator
+
 import chromadb
+import numpy as np
 
 from src.embeddings.types import Embedding
 from src.database.types import CollectionItem, VectorDatabase
 
 
 class ChromaDB(VectorDatabase):
-    def __init__(self, path: str = "chromadb", name: str = "documents") -> None:
+    def __init__(
+        self, path: str = "chromadb", name: str = "documents", batch_size: int = 256
+    ) -> None:
         """Initialize the ChromaDB class.
 
         Args:
             path (str): Path to the database.
             name (str): Name of the database.
+            batch_size (int, optional): Number of documents written per call on bulk inserts. Defaults to 256.
         """
         super().__init__(path=path, name=name)
+        self.batch_size: int = batch_size
         self.load_or_create()
 
     @property
@@ -27,10 +34,30 @@ class ChromaDB(VectorDatabase):
         # If it doesn't exist, create it.
         self.collection = self.db_client.get_or_create_collection(name=self.name)
 
+    def _get_embedding_space(self) -> str | None:
+        return (self.collection.metadata or {}).get("embedding_space")
+
+    def _set_embedding_space(self, space: str) -> None:
+        # The distance function is set at creation and cannot be modified
+        metadata = {
+            key: value
+            for key, value in (self.collection.metadata or {}).items()
+            if not key.startswith("hnsw:")
+        }
+        self.collection.modify(metadata={**metadata, "embedding_space": space})
+
+    def _has_normalized_embeddings(self, sample_size: int = 32) -> bool:
+        embeddings = self.collection.peek(limit=sample_size)["embeddings"]
+        if embeddings is None or not len(embeddings):
+            return True
+        norms = np.linalg.norm(np.asarray(embeddings, dtype=np.float32), axis=1)
+        return bool(np.allclose(norms, 1.0, atol=1e-2))
+
     def remove(self) -> None:
         """Remove the database collection."""
         self.db_client.delete_collection(name=self.name)
         self.load_or_create()  # Recreate empty the collection
+        self.version += 1
 
     def insert(self, document: CollectionItem) -> None:
         """
@@ -39,43 +66,190 @@ class ChromaDB(VectorDatabase):
         Args:
             document (CollectionItem): Document to insert.
         """
-        self.collection.add(
-            embeddings=document.embedding,
-            metadatas={
-                "document_path": document.document_path,
-                "location": document.location,
-                "text": document.text,
-            },
-            ids=[document.id],
-        )
+        self.insert_many([document])
 
-    def search(self, query_embedding: Embedding, top_k: int) -> list[CollectionItem]:
+    def insert_many(self, documents: list[CollectionItem]) -> None:
         """
-        Search for the top k similar documents.
+        Insert several documents into the database, writing them in batches
+        of `batch_size`. Documents whose ID already exists are overwritten.
 
         Args:
-            query (Embedding): Query embedding to search for.
-            top_k (int): Number of similar documents to return.
+            documents (list[CollectionItem]): Documents to insert.
+        """
+        for start in range(0, len(documents), self.batch_size):
+            batch = documents[start : start + self.batch_size]
+            self.collection.upsert(
+                embeddings=[document.embedding for document in batch],
+                metadatas=[
+                    {
+                        "document_path": document.document_path,
+                        "location": document.location,
+                        "text": document.text,
+                    }
+                    for document in batch
+                ],
+                ids=[document.id for document in batch],
+            )
+            self.version += 1
+
+    def delete(self, ids: list[str]) -> None:
+        """
+        Delete documents from the database, in batches of `batch_size`.
+
+        Args:
+            ids (list[str]): IDs of the documents to delete.
+        """
+        for start in range(0, len(ids), self.batch_size):
+            self.collection.delete(ids=ids[start : start + self.batch_size])
+            self.version += 1
+
+    def get(
+        self, ids: list[str], include_embeddings: bool = False
+    ) -> list[CollectionItem]:
+        """
+        Get documents by ID, in batches of `batch_size`.
+
+        Args:
+            ids (list[str]): IDs of the documents to get.
+            include_embeddings (bool, optional): Whether to return the embeddings. Defaults to False.
 
         Returns:
-            List[CollectionItem]: List of similar documents.
+            list[CollectionItem]: Documents found, the missing IDs are skipped.
         """
-        results = self.collection.query(
-            query_embedding, n_results=top_k, include=["metadatas", "embeddings"]
-        )
+        include = ["metadatas", "embeddings"] if include_embeddings else ["metadatas"]
+        found = {}
+        for start in range(0, len(ids), self.batch_size):
+            results = self.collection.get(
+                ids=ids[start : start + self.batch_size], include=include
+            )
+            for index, (id, metadata) in enumerate(
+                zip(results["ids"], results["metadatas"])
+            ):
+                found[id] = CollectionItem(
+                    id=id,
+                    text=metadata["text"],
+                    embedding=(
+                        Embedding(results["embeddings"][index])
+                        if include_embeddings
+                        else None
+                    ),
+                    document_path=metadata["document_path"],
+                    location=metadata["location"],
+                )
+        return [found[id] for id in ids if id in found]
 
-        items = []
-        for id, metadata, embedding in zip(
-            results["ids"][0], results["metadatas"][0], results["embeddings"][0]
-        ):
-            items.append(
+    def iter_documents(self, batch_size: int = 1000) -> Iterator[list[CollectionItem]]:
+        """
+        Iterate over every document, without the embeddings.
+
+        Args:
+            batch_size (int, optional): Number of documents read at a time. Defaults to 1000.
+
+        Returns:
+            Iterator[list[CollectionItem]]: Batches of documents.
+        """
+        for offset in range(0, self.collection.count(), batch_size):
+            results = self.collection.get(
+                offset=offset, limit=batch_size, include=["metadatas"]
+            )
+            yield [
                 CollectionItem(
                     id=id,
                     text=metadata["text"],
-                    embedding=Embedding(embedding),
+                    embedding=None,
                     document_path=metadata["document_path"],
                     location=metadata["location"],
                 )
-            )
+                for id, metadata in zip(results["ids"], results["metadatas"])
+            ]
+
+    def search(
+        self,
+        query_embedding: Embedding,
+        top_k: int,
+        where: dict = None,
+        include_embeddings: bool = False,
+        include_distances: bool = False,
+        query_text: str = None,
+    ) -> list[CollectionItem]:
+        """
+        Search for the top k similar documents.
+
+        Args:
+            query_embedding (Embedding): Query embedding to search for.
+            top_k (int): Number of similar documents to return.
+            where (dict, optional): Metadata filter, in the Chroma `where` syntax. Defaults to None.
+            include_embeddings (bool, optional): Whether to return the embeddings. Defaults to False.
+            include_distances (bool, optional): Whether to return the distances. Defaults to False.
+            query_text (str, optional): Text of the query, not used. Defaults to None.
+
+        Returns:
+            List[CollectionItem]: List of similar documents.
+        """
+        return self.search_many(
+            [query_embedding],
+            top_k=top_k,
+            where=where,
+            include_embeddings=include_embeddings,
+            include_distances=include_distances,
+        )[0]
+
+    def search_many(
+        self,
+        query_embeddings: list[Embedding],
+        top_k: int,
+        where: dict = None,
+        include_embeddings: bool = False,
+        include_distances: bool = False,
+    ) -> list[list[CollectionItem]]:
+        """
+        Search for the top k similar documents of several queries in a single
+        call. Only the requested fields are fetched, the embeddings are not
+        by default.
+
+        Args:
+            query_embeddings (list[Embedding]): Query embeddings to search for.
+            top_k (int): Number of similar documents to return per query.
+            where (dict, optional): Metadata filter, in the Chroma `where` syntax. Defaults to None.
+            include_embeddings (bool, optional): Whether to return the embeddings. Defaults to False.
+            include_distances (bool, optional): Whether to return the distances. Defaults to False.
 
-        return items
+        Returns:
+            list[list[CollectionItem]]: List of similar documents of each query.
+        """
+        if not query_embeddings:
+            return []
+        include = ["metadatas"]  # The text is stored in the metadata
+        if include_embeddings:
+            include.append("embeddings")
+        if include_distances:
+            include.append("distances")
+        results = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=top_k,
+            where=where,
+            include=include,
+        )
+
+        found = []
+        for index, (ids, metadatas) in enumerate(
+            zip(results["ids"], results["metadatas"])
+        ):
+            embeddings = results["embeddings"][index] if include_embeddings else None
+            distances = results["distances"][index] if include_distances else None
+            found.append(
+                [
+                    CollectionItem(
+                        id=id,
+                        text=metadata["text"],
+                        embedding=(
+                            Embedding(embeddings[rank]) if include_embeddings else None
+                        ),
+                        document_path=metadata["document_path"],
+                        location=metadata["location"],
+                        distance=distances[rank] if include_distances else None,
+                    )
+                    for rank, (id, metadata) in enumerate(zip(ids, metadatas))
+                ]
+            )
+        return found
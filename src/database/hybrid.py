@@ -0,0 +1,244 @@
+from typing import Iterator
+
+from src.helpers.metrics import METRICS
+from src.embeddings.types import Embedding
+from src.database.lexical import LexicalIndex
+from src.database.types import CollectionItem, VectorDatabase
+
+
+class HybridDatabase(VectorDatabase):
+    """
+    Vector database paired with a lexical index of the same documents.
+
+    Every write goes to both, so the index stays in sync with the collection.
+    When a search has the text of the query and its keywords are selective,
+    i.e. they match at least `top_k` documents but no more than `candidates`
+    nor `max_candidate_share` of the collection, only the vectors of these
+    matches are scored instead of the whole collection. Otherwise the full
+    vector search runs and the lexical matches are added to its results. In
+    both cases the lexical and vector rankings are fused with Reciprocal Rank
+    Fusion.
+    """
+
+    def __init__(
+        self,
+        database: VectorDatabase,
+        index: LexicalIndex,
+        candidates: int = 200,
+        rrf_k: int = 60,
+        max_candidate_share: float = 0.1,
+    ) -> None:
+        """Initialize the HybridDatabase class.
+
+        Args:
+            database (VectorDatabase): Vector database storing the documents.
+            index (LexicalIndex): Lexical index of the documents.
+            candidates (int, optional): Maximum number of lexical candidates scored by vector. Defaults to 200.
+            rrf_k (int, optional): Rank offset of the Reciprocal Rank Fusion. Defaults to 60.
+            max_candidate_share (float, optional): Largest fraction of the collection scored as the only
+                candidates, beyond which the full vector search is cheap enough. Defaults to 0.1.
+        """
+        super().__init__(path=database.path, name=database.name)
+        self.database: VectorDatabase = database
+        self.index: LexicalIndex = index
+        self.candidates: int = candidates
+        self.rrf_k: int = rrf_k
+        self.max_candidate_share: float = max_candidate_share
+        if index.num_documents != database.num_documents:
+            # Documents inserted while the index was disabled or missing
+            self.reindex()
+
+    @property
+    def num_documents(self) -> int:
+        """Get the number of documents in the database."""
+        return self.database.num_documents
+
+    def check_embedding_space(self, space: str) -> None:
+        """
+        Check the space of the embeddings of the vector database, see
+        `VectorDatabase.check_embedding_space`.
+
+        Args:
+            space (str): Space of the embeddings of the queries and new documents.
+        """
+        self.database.check_embedding_space(space)
+
+    def reindex(self) -> None:
+        """Rebuild the lexical index from the documents of the database."""
+        self.index.clear()
+        for documents in self.database.iter_documents():
+            self.index.add(documents)
+
+    def iter_documents(self, batch_size: int = 1000) -> Iterator[list[CollectionItem]]:
+        """
+        Iterate over every document of the database, without the embeddings.
+
+        Args:
+            batch_size (int, optional): Number of documents read at a time. Defaults to 1000.
+
+        Returns:
+            Iterator[list[CollectionItem]]: Batches of documents.
+        """
+        return self.database.iter_documents(batch_size=batch_size)
+
+    def remove(self) -> None:
+        """Remove the database and the index, and recreate them empty."""
+        self.database.remove()
+        self.index.clear()
+        self.version += 1
+
+    def insert(self, document: CollectionItem) -> None:
+        """
+        Insert a document into the database and the index.
+
+        Args:
+            document (CollectionItem): Document to insert.
+        """
+        self.insert_many([document])
+
+    def insert_many(self, documents: list[CollectionItem]) -> None:
+        """
+        Insert several documents into the database and the index.
+
+        Args:
+            documents (list[CollectionItem]): Documents to insert.
+        """
+        self.database.insert_many(documents)
+        self.index.add(documents)
+        self.version += 1
+
+    def delete(self, ids: list[str]) -> None:
+        """
+        Delete documents from the database and the index.
+
+        Args:
+            ids (list[str]): IDs of the documents to delete.
+        """
+        self.database.delete(ids)
+        self.index.remove(ids)
+        self.version += 1
+
+    def get(
+        self, ids: list[str], include_embeddings: bool = False
+    ) -> list[CollectionItem]:
+        """
+        Get documents by ID.
+
+        Args:
+            ids (list[str]): IDs of the documents to get.
+            include_embeddings (bool, optional): Whether to return the embeddings. Defaults to False.
+
+        Returns:
+            list[CollectionItem]: Documents found, the missing IDs are skipped.
+        """
+        return self.database.get(ids, include_embeddings=include_embeddings)
+
+    def search_many(
+        self,
+        query_embeddings: list[Embedding],
+        top_k: int,
+        where: dict = None,
+        include_embeddings: bool = False,
+        include_distances: bool = False,
+    ) -> list[list[CollectionItem]]:
+        """
+        Search for the top k similar documents of several queries, with the
+        batched vector search of the database only.
+
+        Args:
+            query_embeddings (list[Embedding]): Query embeddings to search for.
+            top_k (int): Number of similar documents to return per query.
+            where (dict, optional): Metadata filter, see `search`. Defaults to None.
+            include_embeddings (bool, optional): Whether to return the embeddings. Defaults to False.
+            include_distances (bool, optional): Whether to return the distances. Defaults to False.
+
+        Returns:
+            list[list[CollectionItem]]: List of similar documents of each query.
+        """
+        return self.database.search_many(
+            query_embeddings,
+            top_k=top_k,
+            where=where,
+            include_embeddings=include_embeddings,
+            include_distances=include_distances,
+        )
+
+    def search(
+        self,
+        query_embedding: Embedding,
+        top_k: int,
+        where: dict = None,
+        include_embeddings: bool = False,
+        include_distances: bool = False,
+        query_text: str = None,
+    ) -> list[CollectionItem]:
+        """
+        Search for the top k documents, fusing the lexical and vector rankings
+        when the text of the query is given.
+
+        Args:
+            query_embedding (Embedding): Query embedding to search for.
+            top_k (int): Number of similar documents to return.
+            where (dict, optional): Filter on the document path, see `filtered_document_paths`.
+                Defaults to None.
+            include_embeddings (bool, optional): Whether to return the embeddings. Defaults to False.
+            include_distances (bool, optional): Whether to return the cosine distances. Defaults to False.
+            query_text (str, optional): Text of the query. Defaults to None, vector search only.
+
+        Returns:
+            List[CollectionItem]: List of similar documents.
+        """
+        if not query_text:
+            return self.database.search(
+                query_embedding,
+                top_k=top_k,
+                where=where,
+                include_embeddings=include_embeddings,
+                include_distances=include_distances,
+            )
+
+        with METRICS.span("database.lexical"):
+            # One more match than the candidates tells if some were left out
+            lexical = self.index.search(query_text, self.candidates + 1, where)
+        lexical_ids = [id for id, _ in lexical]
+        max_candidates = min(
+            self.candidates, self.max_candidate_share * self.index.num_documents
+        )
+        if top_k <= len(lexical_ids) <= max_candidates:
+            # Selective keywords: only the vectors of their matches are scored
+            METRICS.increment("database.pruned_searches")
+            items = self.database.score(
+                query_embedding, lexical_ids, include_embeddings=include_embeddings
+            )
+        else:
+            # Too few or too common matches: they are added to the vector search
+            lexical_ids = lexical_ids[: self.candidates]
+            vector_ids = [
+                item.id
+                for item in self.database.search(query_embedding, top_k, where=where)
+            ]
+            found = set(vector_ids)
+            # The distances of the search depend on the database, all the
+            # candidates are ranked with the cosine distance of `score`
+            items = self.database.score(
+                query_embedding,
+                vector_ids + [id for id in lexical_ids if id not in found],
+                include_embeddings=include_embeddings,
+            )
+
+        # Reciprocal Rank Fusion of the vector and lexical rankings
+        fused = {item.id: 0.0 for item in items}
+        for rank, item in enumerate(sorted(items, key=lambda item: item.distance)):
+            fused[item.id] += 1 / (self.rrf_k + rank + 1)
+        for rank, id in enumerate(lexical_ids):
+            if id in fused:
+                fused[id] += 1 / (self.rrf_k + rank + 1)
+
+        positions = {item.id: index for index, item in enumerate(items)}
+        results = []
+        for id in sorted(fused, key=fused.get, reverse=True)[:top_k]:
+            item = items[positions[id]]
+            if not include_distances:
+                item.distance = None
+            results.append(item)
+        return results
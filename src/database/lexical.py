@@ -0,0 +1,204 @@
+import re
+import math
+import sqlite3
+import threading
+from collections import Counter
+
+import numpy as np
+
+from src.database.types import CollectionItem, filtered_document_paths
+
+
+def tokenize(text: str) -> list[str]:
+    """Split a text into lowercase word tokens, dropping single characters.
+
+    Args:
+        text (str): Text to split.
+
+    Returns:
+        list[str]: Tokens of the text, in order.
+    """
+    return [token for token in re.findall(r"\w+", text.lower()) if len(token) > 1]
+
+
+class LexicalIndex:
+    """
+    Inverted index over the text of the chunks, ranked with BM25.
+
+    The postings (term, document, term frequency) and the length of each
+    document are stored in SQLite, clustered by term, so a query only reads
+    the postings of its own terms. The index is updated incrementally and
+    persisted, so it is never rebuilt at startup.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        k1: float = 1.2,
+        b: float = 0.75,
+        max_document_frequency: float = 0.5,
+    ) -> None:
+        """Initialize the LexicalIndex class.
+
+        Args:
+            path (str): Path to the SQLite file of the index.
+            k1 (float, optional): BM25 term frequency saturation. Defaults to 1.2.
+            b (float, optional): BM25 document length normalization. Defaults to 0.75.
+            max_document_frequency (float, optional): Terms found in a larger fraction of the documents
+                are too common to select candidates and are ignored. Defaults to 0.5.
+        """
+        self.path: str = path
+        self.k1: float = k1
+        self.b: float = b
+        self.max_document_frequency: float = max_document_frequency
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS documents (doc INTEGER PRIMARY KEY, "
+                "id TEXT UNIQUE, document_path TEXT, length INTEGER)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS postings (term TEXT, doc INTEGER, "
+                "tf INTEGER, PRIMARY KEY (term, doc)) WITHOUT ROWID"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS documents_document_path "
+                "ON documents (document_path)"
+            )
+        self.num_documents, self.total_length = self.connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM documents"
+        ).fetchone()
+
+    def add(self, documents: list[CollectionItem]) -> None:
+        """
+        Index the text of documents. Documents whose ID is already indexed are
+        indexed again.
+
+        Args:
+            documents (list[CollectionItem]): Documents to index.
+        """
+        with self._lock, self.connection:
+            self._remove([document.id for document in documents])
+            for document in documents:
+                terms = Counter(tokenize(document.text))
+                length = sum(terms.values())
+                doc = self.connection.execute(
+                    "INSERT INTO documents (id, document_path, length) "
+                    "VALUES (?, ?, ?)",
+                    (document.id, document.document_path, length),
+                ).lastrowid
+                self.connection.executemany(
+                    "INSERT INTO postings (term, doc, tf) VALUES (?, ?, ?)",
+                    [(term, doc, tf) for term, tf in terms.items()],
+                )
+                self.num_documents += 1
+                self.total_length += length
+
+    def remove(self, ids: list[str]) -> None:
+        """
+        Remove documents from the index.
+
+        Args:
+            ids (list[str]): IDs of the documents to remove.
+        """
+        with self._lock, self.connection:
+            self._remove(ids)
+
+    def clear(self) -> None:
+        """Remove every document from the index."""
+        with self._lock, self.connection:
+            self.connection.execute("DELETE FROM postings")
+            self.connection.execute("DELETE FROM documents")
+            self.num_documents, self.total_length = 0, 0
+
+    def _remove(self, ids: list[str]) -> None:
+        for start in range(0, len(ids), 500):  # SQLite variable limit
+            batch = ids[start : start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.connection.execute(
+                f"SELECT doc, length FROM documents WHERE id IN ({placeholders})",
+                batch,
+            ).fetchall()
+            if not rows:
+                continue
+            docs = [(doc,) for doc, _ in rows]
+            self.connection.executemany("DELETE FROM postings WHERE doc = ?", docs)
+            self.connection.executemany("DELETE FROM documents WHERE doc = ?", docs)
+            self.num_documents -= len(rows)
+            self.total_length -= sum(length for _, length in rows)
+
+    def search(
+        self, query: str, limit: int, where: dict = None
+    ) -> list[tuple[str, float]]:
+        """
+        Rank the documents containing the terms of a query with BM25.
+
+        Args:
+            query (str): Text of the query.
+            limit (int): Maximum number of documents to return.
+            where (dict, optional): Filter on the document path, see `filtered_document_paths`.
+                Defaults to None.
+
+        Returns:
+            list[tuple[str, float]]: IDs and scores of the best documents, best first.
+        """
+        terms = list(set(tokenize(query)))
+        with self._lock:
+            if not terms or not self.num_documents:
+                return []
+            frequencies = dict(
+                self.connection.execute(
+                    "SELECT term, COUNT(*) FROM postings "
+                    f"WHERE term IN ({','.join('?' * len(terms))}) GROUP BY term",
+                    terms,
+                ).fetchall()
+            )
+            # Common terms match most of the collection, they barely rank and
+            # would make the candidate set as large as the collection. Queries
+            # with only common terms are left to the vector search.
+            frequencies = {
+                term: frequency
+                for term, frequency in frequencies.items()
+                if frequency <= self.max_document_frequency * self.num_documents
+            }
+            if not frequencies:
+                return []
+
+            sql = (
+                "SELECT p.term, d.id, p.tf, d.length FROM postings p "
+                "JOIN documents d ON d.doc = p.doc "
+                f"WHERE p.term IN ({','.join('?' * len(frequencies))})"
+            )
+            parameters = list(frequencies)
+            if where is not None:
+                paths = filtered_document_paths(where)
+                sql += f" AND d.document_path IN ({','.join('?' * len(paths))})"
+                parameters += paths
+            postings = self.connection.execute(sql, parameters).fetchall()
+            num_documents, total_length = self.num_documents, self.total_length
+
+        if not postings:
+            return []
+        idf = {
+            term: math.log(1 + (num_documents - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in frequencies.items()
+        }
+        terms, ids, tfs, lengths = zip(*postings)
+        tfs = np.asarray(tfs, dtype=np.float32)
+        lengths = np.asarray(lengths, dtype=np.float32)
+        weights = np.asarray([idf[term] for term in terms], dtype=np.float32)
+        average_length = total_length / num_documents
+        weights *= (tfs * (self.k1 + 1)) / (
+            tfs + self.k1 * (1 - self.b + self.b * lengths / average_length)
+        )
+
+        unique_ids, inverse = np.unique(
+            np.asarray(ids, dtype=object), return_inverse=True
+        )
+        scores = np.bincount(inverse, weights=weights)
+        best = np.argsort(-scores, kind="stable")[:limit]
+        return [(unique_ids[index], float(scores[index])) for index in best]
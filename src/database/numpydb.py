@@ -0,0 +1,696 @@
+import os
+import sqlite3
+import threading
+from typing import Iterator, NamedTuple
+
+import numpy as np
+
+from src.embeddings.types import Embedding
+from src.database.types import (
+    CollectionItem,
+    VectorDatabase,
+    filtered_document_paths,
+)
+
+
+# Storage types of the compact copy of the embeddings used for the candidate search
+PRECISIONS = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+
+class _Snapshot(NamedTuple):
+    """Arrays and live rows of a NumpyDB, taken to search outside its lock."""
+
+    matrix: np.ndarray
+    codes: np.ndarray
+    scales: np.ndarray
+    num_rows: int
+    valid: np.ndarray
+    layout: int
+
+
+class NumpyDB(VectorDatabase):
+    """
+    In-process vector database with exact search.
+
+    Embeddings are normalized and stored as the rows of a contiguous float32
+    matrix in a memory-mapped file, and their metadata lives in a SQLite side
+    table. A search is a single matrix product followed by `argpartition`, so
+    there is no client/server round-trip. Results are ranked by cosine similarity.
+
+    With a float16 or int8 precision, a compact copy of the embeddings (int8 with
+    a scale per vector) is kept next to the float32 matrix. The candidate search
+    scans only the compact copy, and a shortlist of `rerank_factor * top_k`
+    candidates is reranked with their float32 vectors, which are read lazily
+    from the memory-mapped file.
+
+    Deleted and overwritten documents leave dead rows, which are masked out
+    until they reach `max_dead_share` of the rows. The live rows are then
+    moved to the start of the matrix (see `vacuum`).
+    """
+
+    def __init__(
+        self,
+        path: str = "numpydb",
+        name: str = "documents",
+        batch_size: int = 256,
+        precision: str = "float32",
+        rerank_factor: int = 4,
+        block_size: int = 2048,
+        max_dead_share: float = 0.25,
+    ) -> None:
+        """Initialize the NumpyDB class.
+
+        Args:
+            path (str): Path to the folder of the database.
+            name (str): Name of the database.
+            batch_size (int, optional): Number of rows read per metadata query. Defaults to 256.
+            precision (str, optional): Precision of the candidate search: float32, float16 or int8. Defaults to "float32".
+            rerank_factor (int, optional): Shortlist size, as a multiple of top_k, reranked at full precision. Defaults to 4.
+            block_size (int, optional): Number of compact rows converted at a time while searching. Defaults to 2048.
+            max_dead_share (float, optional): Share of dead rows that triggers a `vacuum`. Defaults to 0.25.
+        """
+        if precision not in PRECISIONS:
+            raise ValueError(
+                f"Unknown precision: {precision}. Use one of {list(PRECISIONS)}."
+            )
+        super().__init__(path=path, name=name)
+        self.batch_size: int = batch_size
+        self.precision: str = precision
+        self.rerank_factor: int = rerank_factor
+        self.block_size: int = block_size
+        self.max_dead_share: float = max_dead_share
+        self._lock = threading.RLock()
+        self._layout: int = 0  # Changes when documents move to other rows
+        self.load_or_create()
+
+    @property
+    def num_documents(self) -> int:
+        """Get the number of documents in the database."""
+        return int(self.valid[: self.num_rows].sum())
+
+    @property
+    def vectors_path(self) -> str:
+        return os.path.join(self.path, f"{self.name}.f32")
+
+    @property
+    def metadata_path(self) -> str:
+        return os.path.join(self.path, f"{self.name}.sqlite")
+
+    @property
+    def compact_path(self) -> str:
+        return os.path.join(self.path, f"{self.name}.{self.precision}")
+
+    @property
+    def scales_path(self) -> str:
+        return os.path.join(self.path, f"{self.name}.{self.precision}.scales")
+
+    @property
+    def compact(self) -> bool:
+        """Whether the candidate search runs on a compact copy of the embeddings."""
+        return self.precision != "float32"
+
+    def load_or_create(self) -> None:
+        """Load the database, creating it if it doesn't exist."""
+        os.makedirs(self.path, exist_ok=True)
+        self.connection = sqlite3.connect(self.metadata_path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS items (row INTEGER PRIMARY KEY, "
+                "id TEXT UNIQUE, document_path TEXT, location TEXT, text TEXT)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS items_document_path "
+                "ON items (document_path)"
+            )
+        meta = dict(self.connection.execute("SELECT key, value FROM meta").fetchall())
+        self.embedding_space: str = meta.get("embedding_space")
+        self.dimension: int = meta.get("dimension")
+        self.capacity: int = meta.get("capacity", 0)
+        self.num_rows: int = meta.get("num_rows", 0)
+
+        self.matrix: np.ndarray = None
+        self.codes: np.ndarray = None  # Compact copy of the matrix
+        self.scales: np.ndarray = None  # Scale of each int8 row
+        if self.dimension and self.capacity:
+            # Quantize the rows added while the database used another precision
+            quantized = meta.get(f"{self.precision}_rows", 0)
+            if not os.path.exists(self.compact_path) or quantized > self.num_rows:
+                quantized = 0
+            self._open_arrays()
+            if self.compact:
+                for start in range(quantized, self.num_rows, self.block_size):
+                    end = min(start + self.block_size, self.num_rows)
+                    self._store_codes(start, np.asarray(self.matrix[start:end]))
+                with self.connection:
+                    self._save_meta()
+
+        # Rows of deleted (or overwritten) documents stay in the matrix, masked out
+        self.valid = np.zeros(self.capacity, dtype=bool)
+        rows = [row for (row,) in self.connection.execute("SELECT row FROM items")]
+        self.valid[rows] = True
+        self.ids: dict[str, int] = dict(
+            self.connection.execute("SELECT id, row FROM items").fetchall()
+        )
+
+    def remove(self) -> None:
+        """Remove the database and recreate it empty."""
+        with self._lock:
+            self.connection.close()
+            self.matrix, self.codes, self.scales = None, None, None
+            paths = [self.vectors_path, self.metadata_path]
+            if self.compact:
+                paths += [self.compact_path, self.scales_path]
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            self.load_or_create()
+            self._layout += 1
+            self.version += 1
+
+    def _get_embedding_space(self) -> str | None:
+        return self.embedding_space
+
+    def _set_embedding_space(self, space: str) -> None:
+        # The vectors are normalized when they are stored, whatever the model
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                ("embedding_space", space),
+            )
+            self.embedding_space = space
+
+    def _save_meta(self) -> None:
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [
+                ("dimension", self.dimension),
+                ("capacity", self.capacity),
+                ("num_rows", self.num_rows),
+            ]
+            + ([(f"{self.precision}_rows", self.num_rows)] if self.compact else []),
+        )
+
+    @staticmethod
+    def _memmap(path: str, dtype: type, shape: tuple) -> np.memmap:
+        """Open a memory-mapped array, growing its file to fit the shape."""
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        if not os.path.exists(path) or os.path.getsize(path) < size:
+            with open(path, "ab") as file:
+                file.truncate(size)
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+    def _open_arrays(self) -> None:
+        """Open the memory-mapped arrays with the current capacity."""
+        shape = (self.capacity, self.dimension)
+        self.matrix = self._memmap(self.vectors_path, np.float32, shape)
+        if self.compact:
+            self.codes = self._memmap(
+                self.compact_path, PRECISIONS[self.precision], shape
+            )
+            self.scales = self._memmap(self.scales_path, np.float32, (self.capacity,))
+
+    def _store_codes(self, start: int, vectors: np.ndarray) -> None:
+        """Quantize normalized vectors into the compact copy, from row `start`."""
+        end = start + len(vectors)
+        if self.precision == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127
+            scales[scales == 0] = 1
+            self.codes[start:end] = np.round(vectors / scales[:, None])
+            self.scales[start:end] = scales
+        else:
+            self.codes[start:end] = vectors
+            self.scales[start:end] = 1
+        self.codes.flush()
+        self.scales.flush()
+
+    def _reserve(self, num_rows: int) -> None:
+        """Grow the memory-mapped matrix so that it fits `num_rows` rows."""
+        if num_rows <= self.capacity:
+            return
+        capacity = max(2 * self.capacity, num_rows, 1024)
+        for array in (self.matrix, self.codes, self.scales):
+            if array is not None:
+                array.flush()
+        self.valid = np.concatenate(
+            [self.valid, np.zeros(capacity - self.capacity, dtype=bool)]
+        )
+        self.capacity = capacity
+        self._open_arrays()
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1)
+
+    def insert(self, document: CollectionItem) -> None:
+        """
+        Insert a document into the database.
+
+        Args:
+            document (CollectionItem): Document to insert.
+        """
+        self.insert_many([document])
+
+    def insert_many(self, documents: list[CollectionItem]) -> None:
+        """
+        Insert several documents into the database. Documents whose ID already
+        exists are overwritten.
+
+        Args:
+            documents (list[CollectionItem]): Documents to insert.
+        """
+        if not documents:
+            return
+        # An ID repeated in the batch is overwritten by its last document
+        documents = list({document.id: document for document in documents}.values())
+        vectors = self._normalize(
+            np.asarray([document.embedding for document in documents], np.float32)
+        )
+        with self._lock, self.connection:
+            if self.dimension is None:
+                self.dimension = vectors.shape[1]
+            elif vectors.shape[1] != self.dimension:
+                raise ValueError(
+                    f"Embeddings of dimension {vectors.shape[1]} cannot be inserted "
+                    f"into a database of dimension {self.dimension}."
+                )
+
+            # Overwritten documents get a new row, their old row is masked out
+            old_rows = [self.ids[doc.id] for doc in documents if doc.id in self.ids]
+            self.valid[old_rows] = False
+
+            start = self.num_rows
+            self._reserve(start + len(documents))
+            self.matrix[start : start + len(documents)] = vectors
+            self.matrix.flush()
+            if self.compact:
+                self._store_codes(start, vectors)
+
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO items "
+                "(row, id, document_path, location, text) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        start + index,
+                        document.id,
+                        document.document_path,
+                        document.location,
+                        document.text,
+                    )
+                    for index, document in enumerate(documents)
+                ],
+            )
+            for index, document in enumerate(documents):
+                self.ids[document.id] = start + index
+            self.valid[start : start + len(documents)] = True
+            self.num_rows = start + len(documents)
+            self._save_meta()
+            self.version += 1
+            self._vacuum_if_needed()
+
+    def delete(self, ids: list[str]) -> None:
+        """
+        Delete documents from the database.
+
+        Args:
+            ids (list[str]): IDs of the documents to delete.
+        """
+        with self._lock, self.connection:
+            rows = [self.ids.pop(id) for id in ids if id in self.ids]
+            self.valid[rows] = False
+            self.connection.executemany(
+                "DELETE FROM items WHERE row = ?", [(row,) for row in rows]
+            )
+            self.version += 1
+            self._vacuum_if_needed()
+
+    def _vacuum_if_needed(self) -> None:
+        """Vacuum once the dead rows reach `max_dead_share` of the rows."""
+        if self.num_rows - self.num_documents > self.max_dead_share * self.num_rows:
+            self.vacuum()
+
+    def vacuum(self) -> None:
+        """
+        Move the rows of the live documents to the start of the matrix and its
+        compact copy, so that the rows of deleted and overwritten documents
+        are not scored anymore and their space is reused by the next inserts.
+        """
+        with self._lock, self.connection:
+            live = np.flatnonzero(self.valid[: self.num_rows])
+            if len(live) == self.num_rows:
+                return
+            # Rows only move down, so a block never overwrites the rows of the
+            # next blocks before they are moved
+            for start in range(0, len(live), self.block_size):
+                rows = live[start : start + self.block_size]
+                end = start + len(rows)
+                self.matrix[start:end] = self.matrix[rows]
+                if self.compact:
+                    self.codes[start:end] = self.codes[rows]
+                    self.scales[start:end] = self.scales[rows]
+            for array in (self.matrix, self.codes, self.scales):
+                if array is not None:
+                    array.flush()
+
+            # In increasing order, the new row of a document is always free
+            self.connection.executemany(
+                "UPDATE items SET row = ? WHERE row = ?",
+                [
+                    (new_row, int(row))
+                    for new_row, row in enumerate(live.tolist())
+                    if new_row != row
+                ],
+            )
+            new_rows = np.empty(self.num_rows, dtype=np.int64)
+            new_rows[live] = np.arange(len(live))
+            self.ids = {id: int(new_rows[row]) for id, row in self.ids.items()}
+            self.valid[:] = False
+            self.valid[: len(live)] = True
+            self.num_rows = len(live)
+            self._save_meta()
+            self._layout += 1
+            self.version += 1
+
+    def _get_metadata(self, rows: list[int]) -> dict[int, tuple[str, str, str, str]]:
+        """Get the ID, document path, location and text stored in the given rows."""
+        metadata = {}
+        for start in range(0, len(rows), self.batch_size):
+            batch = [int(row) for row in rows[start : start + self.batch_size]]
+            placeholders = ",".join("?" * len(batch))
+            for row, *fields in self.connection.execute(
+                "SELECT row, id, document_path, location, text FROM items "
+                f"WHERE row IN ({placeholders})",
+                batch,
+            ):
+                metadata[row] = tuple(fields)
+        return metadata
+
+    def _filter_rows(self, where: dict) -> np.ndarray:
+        """
+        Get the rows of the documents matching a metadata filter, using the
+        index on the document path instead of scanning the collection.
+
+        Args:
+            where (dict): Filter on the document path, see `filtered_document_paths`.
+
+        Returns:
+            np.ndarray: Sorted rows of the matching documents.
+        """
+        paths = filtered_document_paths(where)
+        rows = []
+        for start in range(0, len(paths), self.batch_size):
+            batch = paths[start : start + self.batch_size]
+            placeholders = ",".join("?" * len(batch))
+            rows += [
+                row
+                for (row,) in self.connection.execute(
+                    f"SELECT row FROM items WHERE document_path IN ({placeholders})",
+                    batch,
+                )
+            ]
+        return np.array(sorted(rows), dtype=np.int64)
+
+    def _make_item(
+        self, row: int, metadata: tuple, include_embeddings: bool
+    ) -> CollectionItem:
+        """Build the document stored in a row from its metadata."""
+        id, document_path, location, text = metadata
+        return CollectionItem(
+            id=id,
+            text=text,
+            embedding=(
+                Embedding(self.matrix[row].tolist()) if include_embeddings else None
+            ),
+            document_path=document_path,
+            location=location,
+        )
+
+    def get(
+        self, ids: list[str], include_embeddings: bool = False
+    ) -> list[CollectionItem]:
+        """
+        Get documents by ID.
+
+        Args:
+            ids (list[str]): IDs of the documents to get.
+            include_embeddings (bool, optional): Whether to return the embeddings. Defaults to False.
+
+        Returns:
+            list[CollectionItem]: Documents found, the missing IDs are skipped.
+        """
+        with self._lock:
+            rows = [self.ids[id] for id in ids if id in self.ids]
+            metadata = self._get_metadata(rows)
+            return [
+                self._make_item(row, metadata[row], include_embeddings) for row in rows
+            ]
+
+    def iter_documents(self, batch_size: int = 1000) -> Iterator[list[CollectionItem]]:
+        """
+        Iterate over every document, without the embeddings.
+
+        Args:
+            batch_size (int, optional): Number of documents read at a time. Defaults to 1000.
+
+        Returns:
+            Iterator[list[CollectionItem]]: Batches of documents.
+        """
+        last_row = -1
+        while True:
+            with self._lock:
+                rows = self.connection.execute(
+                    "SELECT row, id, document_path, location, text FROM items "
+                    "WHERE row > ? ORDER BY row LIMIT ?",
+                    (last_row, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            last_row = rows[-1][0]
+            yield [self._make_item(row, fields, False) for row, *fields in rows]
+
+    def score(
+        self,
+        query_embedding: Embedding,
+        ids: list[str],
+        include_embeddings: bool = False,
+    ) -> list[CollectionItem]:
+        """
+        Get documents by ID with the cosine distance of their embedding to the
+        query. Only the rows of the documents are read and scored.
+
+        Args:
+            query_embedding (Embedding): Query embedding to score the documents with.
+            ids (list[str]): IDs of the documents to score.
+            include_embeddings (bool, optional): Whether to return the embeddings. Defaults to False.
+
+        Returns:
+            list[CollectionItem]: Documents found with their distance, the missing IDs are skipped.
+        """
+        query = self._normalize(np.asarray(query_embedding, dtype=np.float32))
+        with self._lock:
+            rows = [self.ids[id] for id in ids if id in self.ids]
+            if not rows:
+                return []
+            similarities = self.matrix[rows] @ query
+            metadata = self._get_metadata(rows)
+            items = []
+            for row, similarity in zip(rows, similarities.tolist()):
+                items.append(self._make_item(row, metadata[row], include_embeddings))
+                items[-1].distance = 1 - similarity
+            return items
+
+    def search(
+        self,
+        query_embedding: Embedding,
+        top_k: int,
+        where: dict = None,
+        include_embeddings: bool = False,
+        include_distances: bool = False,
+        query_text: str = None,
+    ) -> list[CollectionItem]:
+        """
+        Search for the top k similar documents.
+
+        Args:
+            query_embedding (Embedding): Query embedding to search for.
+            top_k (int): Number of similar documents to return.
+            where (dict, optional): Filter on the document path, see `_filter_rows`. Defaults to None.
+            include_embeddings (bool, optional): Whether to return the embeddings. Defaults to False.
+            include_distances (bool, optional): Whether to return the cosine distances. Defaults to False.
+            query_text (str, optional): Text of the query, not used. Defaults to None.
+
+        Returns:
+            List[CollectionItem]: List of similar documents.
+        """
+        return self.search_many(
+            [query_embedding],
+            top_k=top_k,
+            where=where,
+            include_embeddings=include_embeddings,
+            include_distances=include_distances,
+        )[0]
+
+    def _snapshot(self) -> _Snapshot:
+        """
+        Take the arrays and the live rows of the database, under the lock.
+        Inserts only write the rows after `num_rows` and deletes only clear
+        `valid`, so the rows of the snapshot can be scored without the lock.
+        """
+        return _Snapshot(
+            matrix=self.matrix,
+            codes=self.codes,
+            scales=self.scales,
+            num_rows=self.num_rows,
+            valid=self.valid[: self.num_rows].copy(),
+            layout=self._layout,
+        )
+
+    def _scores(
+        self, queries: np.ndarray, snapshot: _Snapshot, rows: np.ndarray = None
+    ) -> np.ndarray:
+        """
+        Score the rows against the queries. With a compact precision the
+        scores are approximate and the compact rows are converted to float32
+        one small block at a time into the same buffer, which stays in the CPU
+        cache and keeps the transient memory bounded.
+
+        Args:
+            queries (np.ndarray): Normalized queries, one per row.
+            snapshot (_Snapshot): Arrays of the database to score.
+            rows (np.ndarray, optional): Rows to score. Defaults to None, every row.
+
+        Returns:
+            np.ndarray: Scores of shape (number of queries, number of rows).
+        """
+        if not self.compact:
+            if rows is None:
+                return queries @ snapshot.matrix[: snapshot.num_rows].T
+            return queries @ snapshot.matrix[rows].T
+
+        count = snapshot.num_rows if rows is None else len(rows)
+        scores = np.empty((len(queries), count), dtype=np.float32)
+        buffer = np.empty((self.block_size, self.dimension), dtype=np.float32)
+        for start in range(0, count, self.block_size):
+            end = min(start + self.block_size, count)
+            block_rows = slice(start, end) if rows is None else rows[start:end]
+            block = buffer[: end - start]
+            np.copyto(block, snapshot.codes[block_rows])
+            scores[:, start:end] = (queries @ block.T) * snapshot.scales[block_rows]
+        return scores
+
+    @staticmethod
+    def _top(scores: np.ndarray, k: int) -> np.ndarray:
+        """Get the columns of the k highest scores of each row, sorted."""
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1)
+        return np.take_along_axis(candidates, order, axis=1)
+
+    def search_many(
+        self,
+        query_embeddings: list[Embedding],
+        top_k: int,
+        where: dict = None,
+        include_embeddings: bool = False,
+        include_distances: bool = False,
+    ) -> list[list[CollectionItem]]:
+        """
+        Search for the top k similar documents of several queries at once,
+        with a single matrix product for all of them. With a filter, only the
+        rows of the matching documents are scored. The rows are scored outside
+        the lock, so concurrent searches run in parallel; documents deleted
+        meanwhile are left out of the results.
+
+        Args:
+            query_embeddings (list[Embedding]): Query embeddings to search for.
+            top_k (int): Number of similar documents to return per query.
+            where (dict, optional): Filter on the document path, see `_filter_rows`. Defaults to None.
+            include_embeddings (bool, optional): Whether to return the embeddings. Defaults to False.
+            include_distances (bool, optional): Whether to return the cosine distances. Defaults to False.
+
+        Returns:
+            list[list[CollectionItem]]: List of similar documents of each query.
+        """
+        if not query_embeddings:
+            return []
+        queries = self._normalize(np.asarray(query_embeddings, dtype=np.float32))
+        while True:
+            with self._lock:
+                if self.matrix is None:
+                    return [[] for _ in query_embeddings]
+                snapshot = self._snapshot()
+                # Only valid rows are in the table
+                rows = None if where is None else self._filter_rows(where)
+
+            top_rows, top_scores = self._rank(queries, top_k, snapshot, rows)
+
+            with self._lock:
+                if self._layout != snapshot.layout:
+                    continue  # The rows were moved by a vacuum meanwhile
+                # The rows of documents deleted meanwhile have no metadata
+                metadata = self._get_metadata(np.unique(top_rows).tolist())
+                results = []
+                for query_rows, query_scores in zip(top_rows, top_scores):
+                    items = []
+                    for row, score in zip(query_rows.tolist(), query_scores.tolist()):
+                        if row not in metadata:
+                            continue
+                        item = self._make_item(row, metadata[row], include_embeddings)
+                        if include_distances:
+                            item.distance = 1 - score
+                        items.append(item)
+                    results.append(items)
+                return results
+
+    def _rank(
+        self,
+        queries: np.ndarray,
+        top_k: int,
+        snapshot: _Snapshot,
+        rows: np.ndarray = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get the rows of the top k documents of each query with their scores.
+
+        Args:
+            queries (np.ndarray): Normalized queries, one per row.
+            top_k (int): Number of rows to return per query.
+            snapshot (_Snapshot): Arrays and live rows of the database.
+            rows (np.ndarray, optional): Rows to score. Defaults to None, every live row.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Rows and scores, of shape (number of queries, k).
+        """
+        if rows is None:
+            scores = self._scores(queries, snapshot)
+            count = int(snapshot.valid.sum())
+            if count < snapshot.num_rows:  # Mask out deleted rows
+                scores[:, ~snapshot.valid] = -np.inf
+        else:
+            scores = self._scores(queries, snapshot, rows)
+            count = len(rows)
+
+        top_k = min(top_k, count)
+        if top_k <= 0:
+            empty = np.empty((len(queries), 0))
+            return empty.astype(np.int64), empty
+
+        if not self.compact:
+            columns = self._top(scores, top_k)
+            top_rows = columns if rows is None else rows[columns]
+            return top_rows, np.take_along_axis(scores, columns, axis=1)
+
+        # Rerank the shortlist with the float32 vectors of its rows only
+        shortlist = self._top(scores, min(top_k * self.rerank_factor, count))
+        if rows is not None:
+            shortlist = rows[shortlist]
+        vectors = snapshot.matrix[shortlist.ravel()].reshape(
+            *shortlist.shape, self.dimension
+        )
+        exact = np.einsum("qsd,qd->qs", vectors, queries)
+        order = self._top(exact, top_k)
+        top_rows = np.take_along_axis(shortlist, order, axis=1)
+        return top_rows, np.take_along_axis(exact, order, axis=1)
@@ -1,44 +1,82 @@
 import uuid
 from abc import abstractmethod
+from typing import Iterator
+
+import numpy as np
+
 from src.embeddings.types import Embedding
 
 
 class CollectionItem:
-    _used_ids = set()  # Set to store used IDs
-
     def __init__(
         self,
         text: str,
-        embedding: Embedding,
+        embedding: Embedding | None,
         document_path: str,
         location: str,
         id: str = None,
+        distance: float = None,
     ) -> None:
         """Initialize the CollectionItem class.
 
         Args:
             text (str): Text of the item.
-            embedding (Embedding): Embedding of the item.
+            embedding (Embedding | None): Embedding of the item, None if it was not retrieved.
             document_path (str): Path to the document.
             location (str): Location of the item.
-            id (str, optional): ID of the item. Defaults to None.
+            id (str, optional): ID of the item. Defaults to None, a random ID.
+            distance (float, optional): Distance to the query, lower is closer. Defaults to None,
+                set only by searches that include distances.
         """
         if id:
             self.id: str = id
         else:
-            self.id: str = self._generate_unique_id()  # Generate a unique ID
-        self.embedding: Embedding = embedding
+            self.id: str = str(uuid.uuid4())  # Random IDs do not collide in practice
+        self.embedding: Embedding | None = embedding
         self.document_path: str = document_path
         self.location: str = location
         self.text: str = text
+        self.distance: float | None = distance
+
+    @staticmethod
+    def make_id(document_hash: str, offset: int | str) -> str:
+        """
+        Build a deterministic ID for an item, so that inserting the same
+        chunk of the same document twice overwrites it instead of duplicating it.
+
+        Args:
+            document_hash (str): Hash of the document content.
+            offset (int | str): Position of the chunk inside the document.
+
+        Returns:
+            str: ID of the item.
+        """
+        return f"{document_hash}:{offset}"
+
 
-    def _generate_unique_id(self) -> str:
-        """Generate a unique ID for the CollectionItem."""
-        while True:
-            new_id = str(uuid.uuid4())
-            if new_id not in self._used_ids:
-                self._used_ids.add(new_id)
-                return new_id
+def filtered_document_paths(where: dict) -> list[str]:
+    """
+    Get the document paths selected by a metadata filter, for the databases
+    that only support filtering on the document path.
+
+    Args:
+        where (dict): Filter on the document path, {"document_path": path}
+            or {"document_path": {"$eq": path}} or {"document_path": {"$in": paths}}.
+
+    Raises:
+        ValueError: If the filter is not supported.
+
+    Returns:
+        list[str]: Document paths selected by the filter.
+    """
+    condition = where.get("document_path") if len(where) == 1 else None
+    if isinstance(condition, str):
+        return [condition]
+    if isinstance(condition, dict) and list(condition) == ["$eq"]:
+        return [condition["$eq"]]
+    if isinstance(condition, dict) and list(condition) == ["$in"]:
+        return list(condition["$in"])
+    raise ValueError(f"Unsupported filter: {where}. Filter on document_path.")
 
 
 class VectorDatabase:
@@ -56,6 +94,47 @@ class VectorDatabase:
         self.path: str = path
         self.name: str = name
         self.db: any = None
+        # Changes every time the collection is modified, so that data derived
+        # from the collection (e.g. cached answers) can be invalidated
+        self.version: int = 0
+
+    def check_embedding_space(self, space: str) -> None:
+        """
+        Check that the collection was built with embeddings of the given space
+        (see `EmbeddingModel.space`), as comparing vectors of two spaces ranks
+        the results silently wrong. The space is recorded in the collection the
+        first time. Collections built before it was recorded are accepted only
+        if their vectors are normalized, as those of the current models.
+
+        Args:
+            space (str): Space of the embeddings of the queries and new documents.
+
+        Raises:
+            ValueError: If the collection was built with embeddings of another space.
+        """
+        stored = self._get_embedding_space()
+        if stored == space:
+            return
+        if stored is None and self._has_normalized_embeddings():
+            self._set_embedding_space(space)
+            return
+        built_with = stored or "unnormalized vectors of an older version"
+        raise ValueError(
+            f"The collection {self.name} in {self.path} was built with {built_with}, "
+            f"but the embeddings are now from {space}. Clear the database and load "
+            "the files again."
+        )
+
+    def _get_embedding_space(self) -> str | None:
+        """Get the space recorded in the collection, None if there is none."""
+        return None
+
+    def _set_embedding_space(self, space: str) -> None:
+        """Record the space of the embeddings in the collection."""
+
+    def _has_normalized_embeddings(self) -> bool:
+        """Whether the stored embeddings are normalized, True if there are none."""
+        return True
 
     @abstractmethod
     def create(self) -> None:
@@ -84,14 +163,144 @@ class VectorDatabase:
             document (CollectionItem): Document to insert.
         """
 
+    def insert_many(self, documents: list[CollectionItem]) -> None:
+        """
+        Insert several documents into the database. Databases that support
+        bulk writes should override this method, by default the documents
+        are inserted one by one.
+
+        Args:
+            documents (list[CollectionItem]): Documents to insert.
+        """
+        for document in documents:
+            self.insert(document)
+
     @abstractmethod
-    def search(self, query: dict) -> list[CollectionItem]:
+    def delete(self, ids: list[str]) -> None:
+        """
+        Abstract method to delete documents from the database.
+
+        Args:
+            ids (list[str]): IDs of the documents to delete.
+        """
+
+    @abstractmethod
+    def get(
+        self, ids: list[str], include_embeddings: bool = False
+    ) -> list[CollectionItem]:
+        """
+        Abstract method to get documents by ID.
+
+        Args:
+            ids (list[str]): IDs of the documents to get.
+            include_embeddings (bool, optional): Whether to return the embeddings. Defaults to False.
+
+        Returns:
+            list[CollectionItem]: Documents found, the missing IDs are skipped.
+        """
+
+    @abstractmethod
+    def iter_documents(self, batch_size: int = 1000) -> Iterator[list[CollectionItem]]:
+        """
+        Abstract method to iterate over every document, without the embeddings.
+
+        Args:
+            batch_size (int, optional): Number of documents read at a time. Defaults to 1000.
+
+        Returns:
+            Iterator[list[CollectionItem]]: Batches of documents.
+        """
+
+    def score(
+        self,
+        query_embedding: Embedding,
+        ids: list[str],
+        include_embeddings: bool = False,
+    ) -> list[CollectionItem]:
+        """
+        Get documents by ID with the cosine distance of their embedding to the
+        query, e.g. to rank candidates selected by other means. Databases that
+        can score their stored vectors directly should override this method,
+        by default the embeddings are fetched with `get`.
+
+        Args:
+            query_embedding (Embedding): Query embedding to score the documents with.
+            ids (list[str]): IDs of the documents to score.
+            include_embeddings (bool, optional): Whether to return the embeddings. Defaults to False.
+
+        Returns:
+            list[CollectionItem]: Documents found with their distance, the missing IDs are skipped.
+        """
+        items = self.get(ids, include_embeddings=True)
+        if not items:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32)
+        vectors = np.asarray([item.embedding for item in items], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query)
+        similarities = (vectors @ query) / np.where(norms > 0, norms, 1)
+        for item, similarity in zip(items, similarities.tolist()):
+            item.distance = 1 - similarity
+            if not include_embeddings:
+                item.embedding = None
+        return items
+
+    @abstractmethod
+    def search(
+        self,
+        query_embedding: Embedding,
+        top_k: int,
+        where: dict = None,
+        include_embeddings: bool = False,
+        include_distances: bool = False,
+        query_text: str = None,
+    ) -> list[CollectionItem]:
+        """
+        Abstract method to search for the top k similar documents.
+
+        Args:
+            query_embedding (Embedding): Query embedding to search for.
+            top_k (int): Number of similar documents to return.
+            where (dict, optional): Metadata filter, e.g. {"document_path": "report.pdf"}
+                or {"document_path": {"$in": [...]}}. Defaults to None, the whole collection.
+            include_embeddings (bool, optional): Whether to return the embeddings. Defaults to False.
+            include_distances (bool, optional): Whether to return the distances. Defaults to False.
+            query_text (str, optional): Text of the query, used by databases with a lexical index
+                and ignored by the others. Defaults to None.
+
+        Returns:
+            List[CollectionItem]: List of similar documents.
+        """
+
+    def search_many(
+        self,
+        query_embeddings: list[Embedding],
+        top_k: int,
+        where: dict = None,
+        include_embeddings: bool = False,
+        include_distances: bool = False,
+    ) -> list[list[CollectionItem]]:
         """
-        Abstract method to search for documents in the database.
+        Search for the top k similar documents of several queries. Databases
+        that support batched queries should override this method, by default
+        the queries are searched one by one.
 
         Args:
-            query (dict): Query to search for.
+            query_embeddings (list[Embedding]): Query embeddings to search for.
+            top_k (int): Number of similar documents to return per query.
+            where (dict, optional): Metadata filter, see `search`. Defaults to None.
+            include_embeddings (bool, optional): Whether to return the embeddings. Defaults to False.
+            include_distances (bool, optional): Whether to return the distances. Defaults to False.
 
         Returns:
-            List[CollectionItem]: List of documents that match the query.
+            list[list[CollectionItem]]: List of similar documents of each query.
         """
+        return [
+            self.search(
+                query,
+                top_k=top_k,
+                where=where,
+                include_embeddings=include_embeddings,
+                include_distances=include_distances,
+            )
+            for query in query_embeddings
+        ]
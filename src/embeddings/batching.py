@@ -0,0 +1,234 @@
+import time
+import queue
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from src.helpers.metrics import METRICS
+from src.embeddings.types import EmbeddingModel, Embedding
+
+
+class _Request:
+    """Texts of a call waiting to be embedded, with the future of its result."""
+
+    __slots__ = ("texts", "future", "enqueued_at")
+
+    def __init__(self, texts: list[str]) -> None:
+        self.texts: list[str] = texts
+        self.future: Future = Future()
+        self.enqueued_at: float = time.monotonic()
+
+
+_CLOSE = object()  # Sentinel that stops the dispatcher
+
+
+class BatchingEmbedding(EmbeddingModel):
+    """
+    Embedding model that coalesces concurrent calls into batched requests.
+
+    Small calls (e.g. the query of each session) are queued. A dispatcher
+    thread collects the calls arriving within `window_ms` of the first one,
+    or until `max_batch_size` texts, sends them to the wrapped model as a
+    single batch and hands each caller its own vectors. While every batch
+    slot is busy, the calls keep accumulating, so batches grow with the load.
+    Calls that are already large enough are sent directly.
+    """
+
+    def __init__(
+        self,
+        embedder: EmbeddingModel,
+        window_ms: float = 5.0,
+        max_batch_size: int = 32,
+        max_concurrency: int = 2,
+        max_samples: int = 1024,
+    ) -> None:
+        """Initialize the BatchingEmbedding class.
+
+        Args:
+            embedder (EmbeddingModel): Model computing the embeddings, which should support batches.
+            window_ms (float, optional): Longest wait for other calls after the first one of a batch,
+                in milliseconds. Defaults to 5.0.
+            max_batch_size (int, optional): Maximum number of texts per batch. Defaults to 32.
+            max_concurrency (int, optional): Maximum number of batches sent at the same time. Defaults to 2.
+            max_samples (int, optional): Number of batch sizes and queueing delays kept for `stats`.
+                Defaults to 1024.
+        """
+        super().__init__(model=embedder.model, base_url=embedder.base_url)
+        self.embedder: EmbeddingModel = embedder
+        self.window: float = window_ms / 1000
+        self.max_batch_size: int = max_batch_size
+
+        self._queue: queue.Queue = queue.Queue()
+        self._slots = threading.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="embedding-batch"
+        )
+        self._stats_lock = threading.Lock()
+        self._batch_sizes: deque = deque(maxlen=max_samples)
+        self._delays: deque = deque(maxlen=max_samples)
+        self.batches: int = 0
+        self.requests: int = 0
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+
+    @property
+    def stats(self) -> dict:
+        """Get the batch sizes (in texts) and queueing delays (in ms) of the latest batches."""
+        with self._stats_lock:
+            sizes = sorted(self._batch_sizes)
+            delays = sorted(self._delays)
+            batches, requests = self.batches, self.requests
+        if not sizes:
+            return {"batches": 0, "requests": 0}
+        return {
+            "batches": batches,
+            "requests": requests,
+            "mean_batch_size": round(sum(sizes) / len(sizes), 2),
+            "max_batch_size": sizes[-1],
+            "queue_delay_p50_ms": round(1000 * delays[len(delays) // 2], 3),
+            "queue_delay_p99_ms": round(1000 * delays[int(len(delays) * 0.99)], 3),
+        }
+
+    def close(self) -> None:
+        """Stop the dispatcher once the queued calls are sent."""
+        self._queue.put(_CLOSE)
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+    @property
+    def space(self) -> str:
+        """Identifier of the space of the embeddings, the one of the wrapped model."""
+        return self.embedder.space
+
+    def get_embedding(self, text: str) -> Embedding:
+        """
+        Implementation of get_embedding method for BatchingEmbedding.
+
+        Args:
+            text (str): Input text to generate the embedding from.
+
+        Returns:
+            Embedding: Embedding of the input text.
+        """
+        return self.get_embeddings([text])[0]
+
+    def get_embeddings(self, texts: list[str]) -> list[Embedding]:
+        """
+        Implementation of get_embeddings method for BatchingEmbedding.
+
+        Args:
+            texts (list[str]): Input texts to generate the embeddings from.
+
+        Returns:
+            list[Embedding]: Embeddings of the input texts, in the same order.
+        """
+        if not texts:
+            return []
+        if len(texts) >= self.max_batch_size:
+            return self.embedder.get_embeddings(texts)
+        return self._submit(texts).result()
+
+    async def aget_embedding(self, text: str) -> Embedding:
+        """
+        Implementation of aget_embedding method for BatchingEmbedding.
+
+        Args:
+            text (str): Input text to generate the embedding from.
+
+        Returns:
+            Embedding: Embedding of the input text.
+        """
+        return (await self.aget_embeddings([text]))[0]
+
+    async def aget_embeddings(self, texts: list[str]) -> list[Embedding]:
+        """
+        Implementation of aget_embeddings method for BatchingEmbedding. The
+        calls of the event loop are batched with the calls of the threads.
+
+        Args:
+            texts (list[str]): Input texts to generate the embeddings from.
+
+        Returns:
+            list[Embedding]: Embeddings of the input texts, in the same order.
+        """
+        if not texts:
+            return []
+        if len(texts) >= self.max_batch_size:
+            return await self.embedder.aget_embeddings(texts)
+        return await asyncio.wrap_future(self._submit(texts))
+
+    def _submit(self, texts: list[str]) -> Future:
+        request = _Request(list(texts))
+        self._queue.put(request)
+        return request.future
+
+    def _dispatch(self) -> None:
+        """Form the batches and send them, while a batch slot is free."""
+        pending = None  # Call that did not fit in the previous batch
+        while True:
+            # Waiting for a slot first lets the calls accumulate meanwhile
+            self._slots.acquire()
+            first = pending or self._queue.get()
+            pending = None
+            if first is _CLOSE:
+                return
+
+            batch, size = [first], len(first.texts)
+            deadline = first.enqueued_at + self.window
+            while size < self.max_batch_size:
+                try:
+                    # Past the window, only the calls already queued are taken
+                    timeout = deadline - time.monotonic()
+                    if timeout > 0:
+                        request = self._queue.get(timeout=timeout)
+                    else:
+                        request = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is _CLOSE or size + len(request.texts) > self.max_batch_size:
+                    pending = request
+                    break
+                batch.append(request)
+                size += len(request.texts)
+
+            self._executor.submit(self._send, batch)
+
+    def _send(self, batch: list[_Request]) -> None:
+        """Embed the texts of a batch and give each call its vectors."""
+        try:
+            # Calls cancelled while waiting (e.g. by a client gone) are dropped
+            batch = [
+                request
+                for request in batch
+                if request.future.set_running_or_notify_cancel()
+            ]
+            if not batch:
+                return
+            now = time.monotonic()
+            delays = [now - request.enqueued_at for request in batch]
+            texts = [text for request in batch for text in request.texts]
+            with self._stats_lock:
+                self.batches += 1
+                self.requests += len(batch)
+                self._batch_sizes.append(len(texts))
+                self._delays.extend(delays)
+            for delay in delays:
+                METRICS.record("embedder.queue_delay", delay)
+            METRICS.increment("embedder.batches")
+            METRICS.increment("embedder.batched_texts", len(texts))
+
+            try:
+                embeddings = self.embedder.get_embeddings(texts)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                return
+            offset = 0
+            for request in batch:
+                request.future.set_result(
+                    embeddings[offset : offset + len(request.texts)]
+                )
+                offset += len(request.texts)
+        finally:
+            self._slots.release()
@@ -0,0 +1,283 @@
+import os
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+
+from src.embeddings.types import EmbeddingModel, Embedding
+
+
+class CachedEmbedding(EmbeddingModel):
+    """
+    Content-addressed cache in front of any EmbeddingModel.
+
+    Vectors are keyed on the hash of (model name, text) and kept in two tiers:
+    a bounded in-memory LRU and a SQLite file on disk, both with eviction.
+    The disk cache is cleared automatically when the wrapped model changes.
+    """
+
+    def __init__(
+        self,
+        embedder: EmbeddingModel,
+        path: str = "cache/embeddings.sqlite",
+        max_memory_items: int = 4096,
+        max_disk_items: int = 200_000,
+    ) -> None:
+        """Initialize the CachedEmbedding class.
+
+        Args:
+            embedder (EmbeddingModel): Embedding model to cache.
+            path (str, optional): Path to the SQLite cache file. Defaults to "cache/embeddings.sqlite".
+            max_memory_items (int, optional): Maximum number of vectors kept in memory. Defaults to 4096.
+            max_disk_items (int, optional): Maximum number of vectors kept on disk. Defaults to 200_000.
+        """
+        super().__init__(model=embedder.model, base_url=embedder.base_url)
+        self.embedder: EmbeddingModel = embedder
+        self.path: str = path
+        self.max_memory_items: int = max_memory_items
+        self.max_disk_items: int = max_disk_items
+
+        self._memory: OrderedDict[str, Embedding] = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits: int = 0
+        self.disk_hits: int = 0
+        self.misses: int = 0
+        self.memory_evictions: int = 0
+        self.disk_evictions: int = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self._create_tables()
+
+    @property
+    def stats(self) -> dict:
+        """Get the hit/miss counters of the cache."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_evictions": self.memory_evictions,
+            "disk_evictions": self.disk_evictions,
+            "hit_rate": (lookups - self.misses) / lookups if lookups else 0.0,
+            "memory_items": len(self._memory),
+        }
+
+    def _create_tables(self) -> None:
+        """Create the cache tables and drop the vectors of a different model."""
+        with self._lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, vector BLOB, last_access REAL)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_access "
+                "ON embeddings (last_access)"
+            )
+            row = self.connection.execute(
+                "SELECT value FROM meta WHERE key = 'model'"
+            ).fetchone()
+            if row is None or row[0] != self.model:
+                # The embedding model changed, cached vectors are no longer valid
+                self.connection.execute("DELETE FROM embeddings")
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('model', ?)",
+                    (self.model,),
+                )
+            # Counting the rows scans the table, so the count is kept up to date
+            # by the writes instead of being queried on every store
+            self.disk_items: int = self.connection.execute(
+                "SELECT COUNT(*) FROM embeddings"
+            ).fetchone()[0]
+
+    def _key(self, text: str) -> str:
+        """Get the cache key of a text for the current model."""
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).hexdigest()
+
+    def clear(self) -> None:
+        """Remove every cached vector."""
+        with self._lock, self.connection:
+            self._memory.clear()
+            self.connection.execute("DELETE FROM embeddings")
+            self.disk_items = 0
+
+    @property
+    def space(self) -> str:
+        """Identifier of the space of the embeddings, the one of the wrapped model."""
+        return self.embedder.space
+
+    def get_embedding(self, text: str) -> Embedding:
+        """
+        Get the embedding of a text, computing it only on a cache miss.
+
+        Args:
+            text (str): Input text to generate the embedding from.
+
+        Returns:
+            Embedding: Embedding of the input text.
+        """
+        return self.get_embeddings([text])[0]
+
+    def get_embeddings(self, texts: list[str]) -> list[Embedding]:
+        """
+        Get the embeddings of several texts. Only the texts missing from
+        both cache tiers are sent to the wrapped model, in a single call.
+
+        Args:
+            texts (list[str]): Input texts to generate the embeddings from.
+
+        Returns:
+            list[Embedding]: Embeddings of the input texts, in the same order.
+        """
+        keys = [self._key(text) for text in texts]
+        found = self._lookup(keys)
+        missing = self._missing(keys, texts, found)
+        if missing:
+            embeddings = self.embedder.get_embeddings(list(missing.values()))
+            computed = dict(zip(missing.keys(), embeddings))
+            self._store(computed)
+            found.update(computed)
+
+        return [found[key] for key in keys]
+
+    async def aget_embedding(self, text: str) -> Embedding:
+        """
+        Get the embedding of a text in an event loop, computing it only on a
+        cache miss.
+
+        Args:
+            text (str): Input text to generate the embedding from.
+
+        Returns:
+            Embedding: Embedding of the input text.
+        """
+        return (await self.aget_embeddings([text]))[0]
+
+    async def aget_embeddings(self, texts: list[str]) -> list[Embedding]:
+        """
+        Get the embeddings of several texts in an event loop. The SQLite
+        reads and writes, and the wait for the lock shared with the ingestion
+        threads, run in a worker thread so they never block the event loop.
+
+        Args:
+            texts (list[str]): Input texts to generate the embeddings from.
+
+        Returns:
+            list[Embedding]: Embeddings of the input texts, in the same order.
+        """
+        keys = [self._key(text) for text in texts]
+        found = await asyncio.to_thread(self._lookup, keys)
+        missing = self._missing(keys, texts, found)
+        if missing:
+            embeddings = await self.embedder.aget_embeddings(list(missing.values()))
+            computed = dict(zip(missing.keys(), embeddings))
+            await asyncio.to_thread(self._store, computed)
+            found.update(computed)
+
+        return [found[key] for key in keys]
+
+    @staticmethod
+    def _missing(
+        keys: list[str], texts: list[str], found: dict[str, Embedding]
+    ) -> dict[str, str]:
+        """Get the texts to embed by key, each missing text only once even if
+        it is repeated."""
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        return missing
+
+    def _lookup(self, keys: list[str]) -> dict[str, Embedding]:
+        """
+        Look up the keys in memory first and then on disk.
+
+        Args:
+            keys (list[str]): Cache keys to look up.
+
+        Returns:
+            dict[str, Embedding]: Vectors found, by key.
+        """
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self.memory_hits += 1
+
+            pending = list({key for key in keys if key not in found})
+            for start in range(0, len(pending), 500):  # SQLite variable limit
+                batch = pending[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+                    self._remember(key, found[key])
+
+            disk_keys = {key for key in pending if key in found}
+            self.disk_hits += sum(1 for key in keys if key in disk_keys)
+            self.misses += sum(1 for key in keys if key not in found)
+
+            if disk_keys:
+                with self.connection:
+                    self.connection.executemany(
+                        "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                        [(time.time(), key) for key in disk_keys],
+                    )
+        return found
+
+    def _store(self, vectors: dict[str, Embedding]) -> None:
+        """
+        Store new vectors in both tiers and evict the least recently used
+        vectors on disk when the disk bound is exceeded.
+
+        Args:
+            vectors (dict[str, Embedding]): Vectors to store, by key.
+        """
+        now = time.time()
+        with self._lock, self.connection:
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+            added = self.connection.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_access) "
+                "VALUES (?, ?, ?)",
+                [
+                    (key, array("f", vector).tobytes(), now)
+                    for key, vector in vectors.items()
+                ],
+            ).rowcount
+            if added < len(vectors):
+                # Stored meanwhile by another call, with the same vector
+                self.connection.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in vectors],
+                )
+            self.disk_items += added
+
+            if self.disk_items > self.max_disk_items:
+                evicted = self.connection.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_access LIMIT ?)",
+                    (self.disk_items - self.max_disk_items,),
+                ).rowcount
+                self.disk_items -= evicted
+                self.disk_evictions += evicted
+
+    def _remember(self, key: str, vector: Embedding) -> None:
+        """Add a vector to the in-memory LRU, evicting the oldest entries."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+            self.memory_evictions += 1
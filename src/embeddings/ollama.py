@@ -1,5 +1,8 @@
-import requests
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 
+from src.helpers.http import AsyncHTTPClient
+from src.helpers.metrics import METRICS
 from src.helpers.ollama import OllamaHelper
 from src.embeddings.types import EmbeddingModel, Embedding
 
@@ -7,10 +10,46 @@ from src.embeddings.types import EmbeddingModel, Embedding
 class OllamaEmbedding(EmbeddingModel):
     """Class for Ollama embeddings."""
 
-    def __init__(self, model: str, base_url: str = "http://localhost:11434") -> None:
+    def __init__(
+        self,
+        model: str,
+        base_url: str = "http://localhost:11434",
+        batch_size: int = 32,
+        max_concurrency: int = 4,
+        keep_alive: str | int = None,
+        options: dict = None,
+        warmup: bool = True,
+    ) -> None:
+        """Initialize the OllamaEmbedding class.
+
+        Args:
+            model (str): Name of the embedding model.
+            base_url (str, optional): Base url of the Ollama server. Defaults to "http://localhost:11434".
+            batch_size (int, optional): Number of texts sent per request. Defaults to 32.
+            max_concurrency (int, optional): Maximum number of batches in flight. Defaults to 4.
+            keep_alive (str | int, optional): How long the model stays loaded after a request, e.g. "30m".
+                Defaults to None, the server default.
+            options (dict, optional): Model options sent with every request. Defaults to None.
+            warmup (bool, optional): Whether to load the model in memory now. Defaults to True.
+        """
         super().__init__(model=model, base_url=base_url)
-        self.helper = OllamaHelper(base_url=base_url, verbose=True)
+        self.batch_size: int = batch_size
+        self.max_concurrency: int = max_concurrency
+        self.keep_alive: str | int = keep_alive
+        self.options: dict = options
+        self.helper = OllamaHelper.shared(base_url=base_url, verbose=True)
         self.helper.pull_model(model)
+        if warmup:
+            self.helper.warmup(
+                model, embedding=True, keep_alive=keep_alive, options=options
+            )
+
+    @property
+    def space(self) -> str:
+        """Identifier of the space of the embeddings, see `EmbeddingModel.space`."""
+        # The batch endpoint returns normalized vectors, unlike the legacy
+        # /api/embeddings endpoint used by older versions
+        return f"ollama:{self.model}:/api/embed"
 
     def get_embedding(self, text: str) -> Embedding:
         """
@@ -22,13 +61,131 @@ class OllamaEmbedding(EmbeddingModel):
         Returns:
             Embedding: Embedding of the input text.
         """
-        ollama_request_body = {"prompt": text, "model": self.model}
+        # Use the same endpoint as the batches so that queries and documents
+        # are embedded (and normalized) exactly the same way
+        return self._embed_batch([text])[0]
+
+    def get_embeddings(self, texts: list[str]) -> list[Embedding]:
+        """
+        Implementation of get_embeddings method for OllamaEmbedding.
+        The texts are split in batches of `batch_size` and up to
+        `max_concurrency` batches are sent to Ollama at the same time.
+
+        Args:
+            texts (list[str]): Input texts to generate the embeddings from.
+
+        Returns:
+            list[Embedding]: Embeddings of the input texts, in the same order.
+        """
+        batches = [
+            texts[start : start + self.batch_size]
+            for start in range(0, len(texts), self.batch_size)
+        ]
+        if len(batches) <= 1 or self.max_concurrency <= 1:
+            results = [self._embed_batch(batch) for batch in batches]
+        else:
+            workers = min(self.max_concurrency, len(batches))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(self._embed_batch, batches))
+
+        return [embedding for batch in results for embedding in batch]
+
+    def _embed_batch(self, texts: list[str]) -> list[Embedding]:
+        """
+        Send a single batch of texts to the Ollama batch embed endpoint.
 
-        response = requests.post(
-            url=f"{self.base_url}/api/embeddings",
-            headers={"Content-Type": "application/json"},
-            json=ollama_request_body,
+        Args:
+            texts (list[str]): Input texts to generate the embeddings from.
+
+        Returns:
+            list[Embedding]: Embeddings of the input texts.
+        """
+        with METRICS.span("embedder.embed"):
+            response = self.helper.client.post(
+                "/api/embed", json=self._request_body(texts)
+            )
+            embeddings = self._parse_response(response, texts)
+        METRICS.increment("embedder.texts", len(texts))
+        return embeddings
+
+    async def aget_embedding(self, text: str) -> Embedding:
+        """
+        Implementation of aget_embedding method for OllamaEmbedding.
+
+        Args:
+            text (str): Input text to generate the embedding from.
+
+        Returns:
+            Embedding: Embedding of the input text.
+        """
+        return (await self._aembed_batch([text]))[0]
+
+    async def aget_embeddings(self, texts: list[str]) -> list[Embedding]:
+        """
+        Implementation of aget_embeddings method for OllamaEmbedding.
+        The texts are split in batches of `batch_size` and up to
+        `max_concurrency` batches are sent to Ollama at the same time.
+
+        Args:
+            texts (list[str]): Input texts to generate the embeddings from.
+
+        Returns:
+            list[Embedding]: Embeddings of the input texts, in the same order.
+        """
+        semaphore = asyncio.Semaphore(max(self.max_concurrency, 1))
+
+        async def embed(batch: list[str]) -> list[Embedding]:
+            async with semaphore:
+                return await self._aembed_batch(batch)
+
+        results = await asyncio.gather(
+            *(
+                embed(texts[start : start + self.batch_size])
+                for start in range(0, len(texts), self.batch_size)
+            )
         )
+        return [embedding for batch in results for embedding in batch]
+
+    async def _aembed_batch(self, texts: list[str]) -> list[Embedding]:
+        """
+        Send a single batch of texts to the Ollama batch embed endpoint,
+        with the asyncio client of the running event loop.
+
+        Args:
+            texts (list[str]): Input texts to generate the embeddings from.
+
+        Returns:
+            list[Embedding]: Embeddings of the input texts.
+        """
+        client = AsyncHTTPClient.shared(self.base_url)
+        with METRICS.span("embedder.embed"):
+            response = await client.post("/api/embed", json=self._request_body(texts))
+            embeddings = self._parse_response(response, texts)
+        METRICS.increment("embedder.texts", len(texts))
+        return embeddings
+
+    def _request_body(self, texts: list[str]) -> dict:
+        """Build the body of a request to the embed endpoint."""
+        ollama_request_body = {"input": texts, "model": self.model}
+        if self.keep_alive is not None:
+            ollama_request_body["keep_alive"] = self.keep_alive
+        if self.options:
+            ollama_request_body["options"] = self.options
+        return ollama_request_body
+
+    @staticmethod
+    def _parse_response(response, texts: list[str]) -> list[Embedding]:
+        """
+        Check and decode a response of the embed endpoint, from the requests
+        or the httpx client.
+
+        Args:
+            response (requests.Response | httpx.Response): Response of the server.
+            texts (list[str]): Input texts of the request.
+
+        Returns:
+            list[Embedding]: Embeddings of the input texts.
+        """
         response.encoding = "utf-8"
 
         if response.status_code != 200:
@@ -39,9 +196,15 @@ class OllamaEmbedding(EmbeddingModel):
             )
 
         try:
-            return response.json()["embedding"]
+            embeddings = response.json()["embeddings"]
 
-        except requests.exceptions.JSONDecodeError as e:
+        except ValueError as e:  # Invalid JSON, for both clients
             raise ValueError(
                 f"Error raised for Ollama Call: {e}.\nResponse: {response.text}"
             )
+
+        if len(embeddings) != len(texts):
+            raise ValueError(
+                f"Ollama returned {len(embeddings)} embeddings for {len(texts)} texts."
+            )
+        return embeddings
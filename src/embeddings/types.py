@@ -1,3 +1,4 @@
+import asyncio
 from abc import abstractmethod
 
 
@@ -19,6 +20,16 @@ class EmbeddingModel:
         self.model: str = model
         self.base_url: str = base_url
 
+    @property
+    def space(self) -> str:
+        """
+        Identifier of the space of the embeddings. Vectors from two spaces (e.g.
+        other models, or normalized and unnormalized vectors) are not comparable,
+        so a collection is only searched with embeddings of the space it was
+        built with. Models whose endpoint changes the vectors should override it.
+        """
+        return self.model
+
     @abstractmethod
     def get_embedding(self, text: str) -> Embedding:
         """
@@ -30,3 +41,45 @@ class EmbeddingModel:
         Returns:
             Embedding: Embedding of the input text.
         """
+
+    def get_embeddings(self, texts: list[str]) -> list[Embedding]:
+        """
+        Get the embeddings of several texts. Models that support batched
+        requests should override this method, by default the texts are
+        embedded one by one.
+
+        Args:
+            texts (list[str]): Input texts to generate the embeddings from.
+
+        Returns:
+            list[Embedding]: Embeddings of the input texts, in the same order.
+        """
+        return [self.get_embedding(text) for text in texts]
+
+    async def aget_embedding(self, text: str) -> Embedding:
+        """
+        Get the embedding of a text without blocking the event loop. Models
+        with an asyncio client should override this method, by default the
+        synchronous method runs in a worker thread.
+
+        Args:
+            text (str): Input text to generate the embedding from.
+
+        Returns:
+            Embedding: Embedding of the input text.
+        """
+        return await asyncio.to_thread(self.get_embedding, text)
+
+    async def aget_embeddings(self, texts: list[str]) -> list[Embedding]:
+        """
+        Get the embeddings of several texts without blocking the event loop.
+        Models with an asyncio client should override this method, by default
+        the synchronous method runs in a worker thread.
+
+        Args:
+            texts (list[str]): Input texts to generate the embeddings from.
+
+        Returns:
+            list[Embedding]: Embeddings of the input texts, in the same order.
+        """
+        return await asyncio.to_thread(self.get_embeddings, texts)
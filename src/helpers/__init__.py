@@ -1,17 +1,41 @@
+import hashlib
+
 import requests
 
+from src.helpers.http import HTTPClient
+
 
-def web_healthcheck(url: str) -> bool:
-    """Check if the given URL is reachable.
+def web_healthcheck(url: str, timeout: float = 2.0) -> bool:
+    """Check if the given URL is reachable, through the client shared by the
+    components using this server. The check is not retried, so it fails
+    after a single timeout when the server is down.
 
     Args:
         url (str): The URL to check.
+        timeout (float, optional): Seconds to wait for the server. Defaults to 2.0.
 
     Returns:
         bool: True if the URL is reachable, False otherwise.
     """
     try:
-        response = requests.head(url)
+        response = HTTPClient.shared(url).head("/", timeout=timeout, retry=False)
         return response.status_code == 200
     except requests.RequestException:
         return False
+
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    """Compute the SHA-256 hash of a file content.
+
+    Args:
+        path (str): Path to the file.
+        block_size (int, optional): Number of bytes read at a time. Defaults to 1 MiB.
+
+    Returns:
+        str: Hexadecimal digest of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while block := file.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
@@ -14,3 +14,5 @@ class Config:
         self.embedding = config_data.get("embedding", {})
         self.vectorstore = config_data.get("vectorstore", {})
         self.readers = config_data.get("readers", {})
+        self.ingestion = config_data.get("ingestion", {})
+        self.service = config_data.get("service", {})
@@ -0,0 +1,415 @@
+import json
+import time
+import asyncio
+import weakref
+import threading
+from collections import deque
+from typing import AsyncIterator, Iterator
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# (connect, read) timeouts in seconds. The read timeout is the longest wait for
+# the next bytes, e.g. while a model is loaded before its first token.
+DEFAULT_TIMEOUT = (3.05, 120)
+
+# Responses of an overloaded server, worth retrying after a backoff
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+class EndpointMetrics:
+    """Request count, errors and latencies of each endpoint of a server."""
+
+    def __init__(self, max_samples: int = 1024) -> None:
+        """Initialize the EndpointMetrics class.
+
+        Args:
+            max_samples (int, optional): Number of latencies kept per endpoint. Defaults to 1024.
+        """
+        self.max_samples: int = max_samples
+        self._metrics_lock = threading.Lock()
+        self._latencies: dict[str, deque] = {}
+        self._requests: dict[str, int] = {}
+        self._errors: dict[str, int] = {}
+
+    def _record(self, path: str, seconds: float, error: bool) -> None:
+        with self._metrics_lock:
+            if path not in self._latencies:
+                self._latencies[path] = deque(maxlen=self.max_samples)
+                self._requests[path] = 0
+                self._errors[path] = 0
+            self._latencies[path].append(seconds)
+            self._requests[path] += 1
+            self._errors[path] += error
+
+    @property
+    def metrics(self) -> dict[str, dict]:
+        """Get the request count, errors and latencies (in ms) of each endpoint."""
+        with self._metrics_lock:
+            metrics = {}
+            for path, samples in self._latencies.items():
+                latencies = sorted(samples)
+                metrics[path] = {
+                    "requests": self._requests[path],
+                    "errors": self._errors[path],
+                    "p50_ms": round(1000 * latencies[len(latencies) // 2], 3),
+                    "p99_ms": round(1000 * latencies[int(len(latencies) * 0.99)], 3),
+                    "mean_ms": round(1000 * sum(latencies) / len(latencies), 3),
+                }
+            return metrics
+
+
+class HTTPClient(EndpointMetrics):
+    """
+    HTTP client shared by every component talking to the same server.
+
+    It keeps a pool of keep-alive connections, applies a timeout to every
+    call, retries failed connections and overloaded responses (429, 502,
+    503, 504) with exponential backoff, and records the latency of the
+    requests of each endpoint.
+    """
+
+    _shared: dict[str, "HTTPClient"] = {}  # Shared clients, by base URL
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = 16,
+        timeout: tuple[float, float] = DEFAULT_TIMEOUT,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        max_samples: int = 1024,
+    ) -> None:
+        """Initialize the HTTPClient class.
+
+        Args:
+            base_url (str): Base URL of the server.
+            pool_size (int, optional): Maximum number of connections kept open. Defaults to 16.
+            timeout (tuple[float, float], optional): Default (connect, read) timeouts in seconds.
+                Defaults to DEFAULT_TIMEOUT.
+            retries (int, optional): Maximum number of retries of a request. Defaults to 3.
+            backoff_factor (float, optional): Retries wait backoff_factor * 2 ** (retry - 1) seconds.
+                Defaults to 0.5.
+            max_samples (int, optional): Number of latencies kept per endpoint. Defaults to 1024.
+        """
+        super().__init__(max_samples=max_samples)
+        self.base_url: str = base_url.rstrip("/")
+        self.timeout: tuple[float, float] = timeout
+
+        # Requests are not retried once the server read them, so a slow
+        # generation is never sent twice
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=None,  # Ollama requests have no side effects
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Requests that must fail fast, e.g. health checks, are sent once
+        self._session_without_retries = requests.Session()
+
+    @classmethod
+    def shared(cls, base_url: str) -> "HTTPClient":
+        """Get the client shared by every component using the same server.
+
+        Args:
+            base_url (str): Base URL of the server.
+
+        Returns:
+            HTTPClient: The shared client.
+        """
+        with cls._shared_lock:
+            if base_url not in cls._shared:
+                cls._shared[base_url] = cls(base_url)
+            return cls._shared[base_url]
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        json: dict = None,
+        timeout: tuple[float, float] | float = None,
+        stream: bool = False,
+        retry: bool = True,
+    ) -> requests.Response:
+        """
+        Send a request to the server.
+
+        Args:
+            method (str): HTTP method.
+            path (str): Path of the endpoint, e.g. "/api/embed".
+            json (dict, optional): JSON body. Defaults to None.
+            timeout (tuple[float, float] | float, optional): Timeout of this call. Defaults to None,
+                the client timeout.
+            stream (bool, optional): Whether to read the body lazily. Defaults to False.
+            retry (bool, optional): Whether failed connections and overloaded responses are retried.
+                Defaults to True.
+
+        Returns:
+            requests.Response: Response of the server, after the retries.
+        """
+        session = self.session if retry else self._session_without_retries
+        start = time.perf_counter()
+        try:
+            response = session.request(
+                method,
+                f"{self.base_url}{path}",
+                json=json,
+                timeout=timeout or self.timeout,
+                stream=stream,
+            )
+        except requests.RequestException:
+            self._record(path, time.perf_counter() - start, error=True)
+            raise
+        # Streamed responses are measured until the headers are received
+        self._record(
+            path, time.perf_counter() - start, error=response.status_code >= 400
+        )
+        return response
+
+    def head(self, path: str, **kwargs) -> requests.Response:
+        """Send a HEAD request, see `request`."""
+        return self.request("HEAD", path, **kwargs)
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        """Send a GET request, see `request`."""
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, json: dict = None, **kwargs) -> requests.Response:
+        """Send a POST request, see `request`."""
+        return self.request("POST", path, json=json, **kwargs)
+
+    def delete(self, path: str, json: dict = None, **kwargs) -> requests.Response:
+        """Send a DELETE request, see `request`."""
+        return self.request("DELETE", path, json=json, **kwargs)
+
+    def stream(
+        self, path: str, json: dict = None, timeout: tuple[float, float] = None
+    ) -> Iterator[dict]:
+        """
+        Send a POST request and iterate over the objects of a JSON lines
+        response, as they are received.
+
+        Args:
+            path (str): Path of the endpoint, e.g. "/api/chat".
+            json (dict, optional): JSON body. Defaults to None.
+            timeout (tuple[float, float], optional): Timeout of this call. Defaults to None.
+
+        Raises:
+            requests.HTTPError: If the server answered with an error.
+
+        Returns:
+            Iterator[dict]: Objects of the response.
+        """
+        with self.post(path, json=json, timeout=timeout, stream=True) as response:
+            if response.status_code != 200:
+                raise requests.HTTPError(
+                    f"{response.status_code} error from {path}: {response.text}",
+                    response=response,
+                )
+            for line in response.iter_lines():
+                if line:
+                    yield _decode(line)
+
+
+class AsyncHTTPClient(EndpointMetrics):
+    """
+    Asyncio counterpart of HTTPClient, built on httpx.AsyncClient, with the
+    same pooling, timeouts, retries and metrics. A semaphore bounds the
+    number of requests in flight, so many sessions can share one event loop
+    without overloading the server.
+
+    An httpx client belongs to the event loop it was created in, so the
+    shared clients are kept per event loop.
+    """
+
+    _shared: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()  # By loop
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        base_url: str,
+        max_concurrency: int = 16,
+        timeout: tuple[float, float] = DEFAULT_TIMEOUT,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        max_samples: int = 1024,
+    ) -> None:
+        """Initialize the AsyncHTTPClient class.
+
+        Args:
+            base_url (str): Base URL of the server.
+            max_concurrency (int, optional): Maximum number of requests in flight, which is also
+                the size of the connection pool. Defaults to 16.
+            timeout (tuple[float, float], optional): Default (connect, read) timeouts in seconds.
+                Defaults to DEFAULT_TIMEOUT.
+            retries (int, optional): Maximum number of retries of a request. Defaults to 3.
+            backoff_factor (float, optional): Retries wait backoff_factor * 2 ** (retry - 1) seconds.
+                Defaults to 0.5.
+            max_samples (int, optional): Number of latencies kept per endpoint. Defaults to 1024.
+        """
+        super().__init__(max_samples=max_samples)
+        self.base_url: str = base_url.rstrip("/")
+        self.timeout: tuple[float, float] = timeout
+        self.retries: int = retries
+        self.backoff_factor: float = backoff_factor
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+            transport=httpx.AsyncHTTPTransport(retries=retries),  # Connect errors
+        )
+
+    @classmethod
+    def shared(cls, base_url: str) -> "AsyncHTTPClient":
+        """Get the client shared by every component using the same server in
+        the running event loop.
+
+        Args:
+            base_url (str): Base URL of the server.
+
+        Returns:
+            AsyncHTTPClient: The shared client.
+        """
+        loop = asyncio.get_running_loop()
+        with cls._shared_lock:
+            clients = cls._shared.setdefault(loop, {})
+            if base_url not in clients:
+                clients[base_url] = cls(base_url)
+            return clients[base_url]
+
+    def _timeout(self, timeout: tuple[float, float] | float = None) -> httpx.Timeout:
+        """Convert a requests-style timeout into an httpx.Timeout."""
+        timeout = timeout or self.timeout
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        # Waiting for a concurrency slot is bounded by the semaphore, not here
+        return httpx.Timeout(connect=connect, read=read, write=read, pool=None)
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        json: dict = None,
+        timeout: tuple[float, float] | float = None,
+    ) -> httpx.Response:
+        """
+        Send a request to the server, retrying the overloaded responses.
+
+        Args:
+            method (str): HTTP method.
+            path (str): Path of the endpoint, e.g. "/api/embed".
+            json (dict, optional): JSON body. Defaults to None.
+            timeout (tuple[float, float], optional): Timeout of this call. Defaults to None,
+                the client timeout.
+
+        Returns:
+            httpx.Response: Response of the server, after the retries.
+        """
+        async with self.semaphore:
+            for retry in range(self.retries + 1):
+                start = time.perf_counter()
+                try:
+                    response = await self.client.request(
+                        method, path, json=json, timeout=self._timeout(timeout)
+                    )
+                except Exception:
+                    self._record(path, time.perf_counter() - start, error=True)
+                    raise
+                self._record(
+                    path,
+                    time.perf_counter() - start,
+                    error=response.status_code >= 400,
+                )
+                if response.status_code not in RETRY_STATUSES or retry == self.retries:
+                    return response
+                await asyncio.sleep(self.backoff_factor * 2**retry)
+
+    async def get(self, path: str, **kwargs) -> httpx.Response:
+        """Send a GET request, see `request`."""
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, json: dict = None, **kwargs) -> httpx.Response:
+        """Send a POST request, see `request`."""
+        return await self.request("POST", path, json=json, **kwargs)
+
+    async def stream(
+        self, path: str, json: dict = None, timeout: tuple[float, float] = None
+    ) -> AsyncIterator[dict]:
+        """
+        Send a POST request and iterate over the objects of a JSON lines
+        response, as they are received. The request holds its concurrency slot
+        until the response is consumed.
+
+        Args:
+            path (str): Path of the endpoint, e.g. "/api/chat".
+            json (dict, optional): JSON body. Defaults to None.
+            timeout (tuple[float, float], optional): Timeout of this call. Defaults to None.
+
+        Raises:
+            requests.HTTPError: If the server answered with an error.
+
+        Returns:
+            AsyncIterator[dict]: Objects of the response.
+        """
+        async with self.semaphore:
+            start = time.perf_counter()
+            recorded = False  # Whether the status line was recorded
+            try:
+                async with self.client.stream(
+                    "POST", path, json=json, timeout=self._timeout(timeout)
+                ) as response:
+                    self._record(
+                        path,
+                        time.perf_counter() - start,
+                        error=response.status_code >= 400,
+                    )
+                    recorded = True
+                    if response.status_code != 200:
+                        text = (await response.aread()).decode(errors="replace")
+                        raise requests.HTTPError(
+                            f"{response.status_code} error from {path}: {text}"
+                        )
+                    async for line in response.aiter_lines():
+                        if line:
+                            yield _decode(line)
+            except Exception:
+                # Errors after the headers (e.g. a read timeout mid-stream)
+                # belong to a request that was already recorded
+                if not recorded:
+                    self._record(path, time.perf_counter() - start, error=True)
+                raise
+
+    async def aclose(self) -> None:
+        """Close the connections of the client."""
+        await self.client.aclose()
+
+    @classmethod
+    async def aclose_shared(cls) -> None:
+        """Close the clients shared in the running event loop, e.g. when the
+        application serving them shuts down."""
+        loop = asyncio.get_running_loop()
+        with cls._shared_lock:
+            clients = cls._shared.pop(loop, {})
+        for client in clients.values():
+            await client.aclose()
+
+
+def _decode(line: bytes) -> dict:
+    """Decode a line of a JSON lines response."""
+    return json.loads(line)
@@ -0,0 +1,181 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class Metrics:
+    """
+    Timing spans and counters of the stages of the application.
+
+    A span times one run of a stage (reading a page, embedding a batch,
+    searching the database...). The latest durations of each stage are kept
+    to compute percentiles, and the totals since startup are kept for the
+    Prometheus counters. Recording a span or a counter only takes a lock and
+    an append, so the stages can be instrumented on their hot path.
+    """
+
+    def __init__(self, max_samples: int = 1024, max_recent: int = 50) -> None:
+        """Initialize the Metrics class.
+
+        Args:
+            max_samples (int, optional): Number of durations kept per stage for the percentiles. Defaults to 1024.
+            max_recent (int, optional): Number of spans kept, all stages together, see `recent`. Defaults to 50.
+        """
+        self.max_samples: int = max_samples
+        self._lock = threading.Lock()
+        self._samples: dict[str, deque] = {}
+        self._count: dict[str, int] = {}
+        self._errors: dict[str, int] = {}
+        self._total: dict[str, float] = {}
+        self._counters: dict[str, float] = {}
+        self._recent: deque = deque(maxlen=max_recent)
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """
+        Time the code run in the context as one run of a stage. Exceptions are
+        counted as errors of the stage and raised again.
+
+        Args:
+            stage (str): Name of the stage, e.g. "database.search".
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.record(stage, time.perf_counter() - start, error=True)
+            raise
+        self.record(stage, time.perf_counter() - start)
+
+    def record(self, stage: str, seconds: float, error: bool = False) -> None:
+        """
+        Record a run of a stage timed by the caller.
+
+        Args:
+            stage (str): Name of the stage.
+            seconds (float): Duration of the run.
+            error (bool, optional): Whether the run failed. Defaults to False.
+        """
+        with self._lock:
+            if stage not in self._samples:
+                self._samples[stage] = deque(maxlen=self.max_samples)
+                self._count[stage] = 0
+                self._errors[stage] = 0
+                self._total[stage] = 0.0
+            self._samples[stage].append(seconds)
+            self._count[stage] += 1
+            self._errors[stage] += error
+            self._total[stage] += seconds
+            self._recent.append((time.time(), stage, seconds, error))
+
+    def increment(self, counter: str, value: float = 1) -> None:
+        """
+        Add to a counter, e.g. the number of pages read.
+
+        Args:
+            counter (str): Name of the counter, e.g. "reader.pages".
+            value (float, optional): Amount to add. Defaults to 1.
+        """
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + value
+
+    def reset(self) -> None:
+        """Forget every span and counter."""
+        with self._lock:
+            for values in (self._samples, self._count, self._errors, self._total):
+                values.clear()
+            self._counters.clear()
+            self._recent.clear()
+
+    def to_dict(self) -> dict:
+        """
+        Get the spans and counters as a JSON-serializable dictionary.
+
+        Returns:
+            dict: For each stage, its count, errors, total seconds and p50/p99/max
+                of the latest durations in ms, and the value of each counter.
+        """
+        with self._lock:
+            stages = {}
+            for stage, samples in self._samples.items():
+                durations = sorted(samples)
+                stages[stage] = {
+                    "count": self._count[stage],
+                    "errors": self._errors[stage],
+                    "total_seconds": round(self._total[stage], 6),
+                    "p50_ms": round(1000 * durations[len(durations) // 2], 3),
+                    "p99_ms": round(1000 * durations[int(len(durations) * 0.99)], 3),
+                    "max_ms": round(1000 * durations[-1], 3),
+                }
+            return {"stages": stages, "counters": dict(self._counters)}
+
+    def to_prometheus(self, prefix: str = "rag") -> str:
+        """
+        Get the spans and counters in the Prometheus text exposition format:
+        a summary of the durations per stage and a counter per counter.
+
+        Args:
+            prefix (str, optional): Prefix of the metric names. Defaults to "rag".
+
+        Returns:
+            str: Metrics, one sample per line.
+        """
+        metrics = self.to_dict()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Duration of the runs of each stage.",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for stage, values in metrics["stages"].items():
+            label = f'stage="{stage}"'
+            for quantile, key in (("0.5", "p50_ms"), ("0.99", "p99_ms")):
+                lines.append(
+                    f'{prefix}_stage_seconds{{{label},quantile="{quantile}"}} '
+                    f"{values[key] / 1000:.6g}"
+                )
+            lines.append(
+                f"{prefix}_stage_seconds_sum{{{label}}} {values['total_seconds']}"
+            )
+            lines.append(f"{prefix}_stage_seconds_count{{{label}}} {values['count']}")
+        lines += [
+            f"# HELP {prefix}_stage_errors_total Failed runs of each stage.",
+            f"# TYPE {prefix}_stage_errors_total counter",
+        ]
+        for stage, values in metrics["stages"].items():
+            lines.append(
+                f'{prefix}_stage_errors_total{{stage="{stage}"}} {values["errors"]}'
+            )
+        lines += [
+            f"# HELP {prefix}_events_total Items processed by the stages.",
+            f"# TYPE {prefix}_events_total counter",
+        ]
+        for counter, value in metrics["counters"].items():
+            lines.append(f'{prefix}_events_total{{name="{counter}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def recent(self, limit: int = 20) -> list[dict]:
+        """
+        Get the latest spans, newest first.
+
+        Args:
+            limit (int, optional): Maximum number of spans. Defaults to 20.
+
+        Returns:
+            list[dict]: Time, stage, duration in ms and error flag of each span.
+        """
+        with self._lock:
+            spans = list(self._recent)[-limit:]
+        return [
+            {
+                "time": timestamp,
+                "stage": stage,
+                "ms": round(1000 * seconds, 3),
+                "error": error,
+            }
+            for timestamp, stage, seconds, error in reversed(spans)
+        ]
+
+
+# Registry shared by every component, as the stages run in different threads
+METRICS = Metrics()
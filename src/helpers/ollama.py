@@ -1,13 +1,18 @@
 import time
 import shutil
+import threading
 import subprocess
 
-import ollama
+import requests
 
 from src.helpers import web_healthcheck
+from src.helpers.http import HTTPClient
 
 
 class OllamaHelper:
+    _shared: dict[str, "OllamaHelper"] = {}  # Shared helpers, by base URL
+    _shared_lock = threading.Lock()
+
     def __init__(self, base_url: str = "http://localhost:11434", verbose: bool = True):
         """Initialize the OllamaHelper class.
 
@@ -16,16 +21,42 @@ class OllamaHelper:
             verbose (bool, optional): Whether to print the output of the commands. Defaults to True.
 
         Raises:
-            FileNotFoundError: If ollama is not installed.
+            FileNotFoundError: If ollama is not installed and the server is not reachable.
         """
         self.base_url = base_url
         self.verbose = verbose
-
-        if not self._is_installed():
+        self.client = HTTPClient.shared(base_url)  # Used by every Ollama component
+        self._available_models: list[str] = None  # Cached list of models
+        self._models_lock = threading.Lock()
+        self.resident_models: list[dict] = []  # Models loaded in memory, see `monitor`
+        self._monitor: threading.Thread = None
+        self._stop_monitor = threading.Event()
+
+        # A reachable server (e.g. remote, in a container or a stub) is enough
+        if not self._is_installed() and not web_healthcheck(self.base_url):
             raise FileNotFoundError("ollama is not installed. Please install it first.")
 
         self._wake_up()
 
+    @classmethod
+    def shared(
+        cls, base_url: str = "http://localhost:11434", verbose: bool = True
+    ) -> "OllamaHelper":
+        """Get the helper shared by every component using the same Ollama server,
+        so that the server healthcheck and the model listing only happen once.
+
+        Args:
+            base_url (str, optional): The base URL of the Ollama server. Defaults to "http://localhost:11434".
+            verbose (bool, optional): Whether to print the output of the commands. Defaults to True.
+
+        Returns:
+            OllamaHelper: The shared helper.
+        """
+        with cls._shared_lock:
+            if base_url not in cls._shared:
+                cls._shared[base_url] = cls(base_url=base_url, verbose=verbose)
+            return cls._shared[base_url]
+
     def _is_installed(self) -> bool:
         """Check if ollama is installed.
 
@@ -62,18 +93,28 @@ class OllamaHelper:
 
     @property
     def available_models(self) -> list[str]:
-        """List all the available ollama models.
+        """List all the available ollama models. The list is requested once
+        and cached until a model is pulled or removed.
+
+        Returns:
+            list[str]: List of available ollama models.
+        """
+        with self._models_lock:
+            if self._available_models is None:
+                self._available_models = self._list_models()
+            return self._available_models
+
+    def _list_models(self) -> list[str]:
+        """Request the list of available ollama models.
 
         Returns:
             list[str]: List of available ollama models.
         """
         try:
-            ollama_artifacts = ollama.list()
-            if "models" in ollama_artifacts:
-                models = ollama_artifacts["models"]
-                return [model["name"] for model in models]
-            return []
-        except subprocess.CalledProcessError as e:
+            response = self.client.get("/api/tags")
+            response.raise_for_status()
+            return [model["name"] for model in response.json().get("models", [])]
+        except requests.RequestException as e:
             raise ValueError(f"Error listing models: {e}")
 
     def model_exists(self, ollama_model: str) -> bool:
@@ -100,39 +141,27 @@ class OllamaHelper:
         Returns:
             None
         """
-        if not self._is_installed():
-            raise FileNotFoundError("ollama is not installed. Please install it first.")
-
         # check if the model is in the available models
         if not self.model_exists(ollama_model):
             print(f"Model {ollama_model} does not exist.")
             return
 
-        command = f"ollama rm {ollama_model}"
-
-        # Execute the command and wait for it to finish
+        if self.verbose:
+            print(f"Removing the model: {ollama_model}...")
         try:
-            if self.verbose:
-                print(f"Removing the model: {ollama_model}...")
-            result = subprocess.run(
-                command, shell=True, check=True, capture_output=True, text=True
+            response = self.client.delete(
+                "/api/delete", json={"name": ollama_model, "model": ollama_model}
             )
-
-            if (  # Check if the output contains "success"
-                "deleted" not in result.stdout.lower()
-                and "deleted" not in result.stderr.lower()
-            ):
-                raise ValueError(
-                    f"Error executing command: '{command}'\n"
-                    f"Command failed with output: {result.stderr}"
-                )
-
-        except subprocess.CalledProcessError as e:
+        except requests.RequestException as e:
+            raise ValueError(f"Error removing the model: {ollama_model}. {e}")
+        if response.status_code != 200:
             raise ValueError(
-                f"Error executing command: {e}\n"
-                "Make sure the model exists and ollama is up to date."
+                f"Error removing the model: {ollama_model}. Response: {response.text}"
             )
 
+        with self._models_lock:
+            self._available_models = None  # The list changed, refresh it
+
         if self.verbose:
             print(f"Successfully removed the model: {ollama_model}")
 
@@ -155,22 +184,129 @@ class OllamaHelper:
                     print(f"Model {ollama_model} is already available.")
                 return
 
-        # Try to pull the model
+        # Try to pull the model, which can take minutes
+        if self.verbose:
+            print(f"Pulling the model: {ollama_model}...")
         try:
-            if self.verbose:
-                print(f"Pulling the model: {ollama_model}...")
-
-            response = ollama.pull(ollama_model)
-            if response["status"] != "success":
-                raise ValueError(
-                    f"Error pulling the model: {ollama_model}. Response: {response}"
-                )
-
-        except subprocess.CalledProcessError as e:
+            response = self.client.post(
+                "/api/pull",
+                json={"name": ollama_model, "model": ollama_model, "stream": False},
+                timeout=(self.client.timeout[0], None),
+            )
+        except requests.RequestException as e:
             raise ValueError(
-                f"Error executing command: {e}\n"
+                f"Error pulling the model: {ollama_model}. {e}\n"
                 "Make sure the model exists and ollama is up to date."
             )
+        if response.status_code != 200 or response.json().get("status") != "success":
+            raise ValueError(
+                f"Error pulling the model: {ollama_model}. Response: {response.text}"
+            )
+
+        with self._models_lock:
+            self._available_models = None  # The list changed, refresh it
 
         if self.verbose:
             print(f"Successfully pulled the model: {ollama_model}")
+
+    def warmup(
+        self,
+        ollama_model: str,
+        embedding: bool = False,
+        keep_alive: str | int = None,
+        options: dict = None,
+    ) -> float:
+        """Load a model in memory, so that the first request does not pay for it.
+
+        Args:
+            ollama_model (str): The model to load.
+            embedding (bool, optional): Whether it is an embedding model, which cannot generate text.
+                Defaults to False.
+            keep_alive (str | int, optional): How long the model stays loaded after a request,
+                e.g. "30m", or -1 to keep it loaded. Defaults to None, the server default.
+            options (dict, optional): Model options, e.g. {"num_ctx": 4096}. Changing them reloads
+                the model, so they must match the options of the following requests. Defaults to None.
+
+        Raises:
+            ValueError: If the model could not be loaded.
+
+        Returns:
+            float: Seconds taken to load the model.
+        """
+        if embedding:  # A tiny embedding loads the model
+            path = "/api/embed"
+            body = {"model": ollama_model, "input": ["warmup"]}
+        else:  # A generation without prompt only loads the model
+            path = "/api/generate"
+            body = {"model": ollama_model}
+        if keep_alive is not None:
+            body["keep_alive"] = keep_alive
+        if options:
+            body["options"] = options
+
+        start = time.perf_counter()
+        response = self.client.post(path, json=body)
+        if response.status_code != 200:
+            raise ValueError(
+                f"Error loading the model: {ollama_model}. Response: {response.text}"
+            )
+        elapsed = time.perf_counter() - start
+        if self.verbose:
+            print(f"Model {ollama_model} loaded in {elapsed:.2f}s")
+        return elapsed
+
+    def running_models(self) -> list[dict]:
+        """List the models loaded in memory by the server.
+
+        Returns:
+            list[dict]: Name, size in memory, size in VRAM and expiration of each loaded model.
+        """
+        response = self.client.get("/api/ps", timeout=5)
+        response.raise_for_status()
+        return [
+            {
+                "name": model["name"],
+                "size": model.get("size"),
+                "size_vram": model.get("size_vram"),
+                "expires_at": model.get("expires_at"),
+            }
+            for model in response.json().get("models", [])
+        ]
+
+    def monitor(self, interval: float = 60) -> None:
+        """Start reporting the resident models every `interval` seconds in a
+        background thread. They are kept in `resident_models` and printed when
+        they change, e.g. when a model is unloaded after its keep_alive.
+
+        Args:
+            interval (float, optional): Seconds between two reports. Defaults to 60.
+        """
+        if self._monitor is not None:
+            return
+        self._monitor = threading.Thread(
+            target=self._monitor_loop, args=(interval,), daemon=True
+        )
+        self._monitor.start()
+
+    def stop_monitor(self) -> None:
+        """Stop reporting the resident models."""
+        self._stop_monitor.set()
+        if self._monitor is not None:
+            self._monitor.join()
+            self._monitor = None
+        self._stop_monitor.clear()
+
+    def _monitor_loop(self, interval: float) -> None:
+        reported = None
+        while not self._stop_monitor.is_set():
+            try:
+                self.resident_models = self.running_models()
+            except requests.exceptions.RequestException as e:
+                if self.verbose:
+                    print(f"Unable to list the resident models: {e}")
+            else:
+                names = sorted(model["name"] for model in self.resident_models)
+                if names != reported and self.verbose:
+                    print(f"Resident models: {', '.join(names) or 'none'}")
+                reported = names
+            self._stop_monitor.wait(interval)
@@ -0,0 +1,312 @@
+"""
+Stub of the Ollama HTTP API with configurable latencies, to run the
+application, tests and benchmarks without Ollama nor any model.
+
+Embeddings are deterministic: the same text always gets the same
+normalized random vector. Answers are a fixed text streamed word by word.
+
+Usage:
+```bash
+python -m src.helpers.ollama_stub --port 11434 --token-latency 0.02
+```
+"""
+
+import json
+import time
+import hashlib
+import argparse
+import threading
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+class OllamaStub:
+    """Ollama-compatible HTTP server answering from memory."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        models: tuple[str, ...] = ("phi3:latest", "nomic-embed-text:latest"),
+        dimension: int = 768,
+        load_latency: float = 0.0,
+        embed_latency: float = 0.0,
+        embed_latency_per_text: float = 0.0,
+        first_token_latency: float = 0.0,
+        token_latency: float = 0.0,
+        num_parallel: int = 0,
+        answer: str = "This is an answer from the Ollama stub server.",
+    ) -> None:
+        """Initialize the OllamaStub class.
+
+        Args:
+            host (str, optional): Host to listen on. Defaults to "127.0.0.1".
+            port (int, optional): Port to listen on. Defaults to 0, a free port.
+            models (tuple[str, ...], optional): Models available from the start. Defaults to a chat and an embedding model.
+            dimension (int, optional): Dimension of the embeddings. Defaults to 768.
+            load_latency (float, optional): Seconds to load a model in memory, on its first request. Defaults to 0.0.
+            embed_latency (float, optional): Seconds per embed request. Defaults to 0.0.
+            embed_latency_per_text (float, optional): Additional seconds per embedded text. Defaults to 0.0.
+            first_token_latency (float, optional): Seconds before the first token of an answer. Defaults to 0.0.
+            token_latency (float, optional): Seconds between two tokens of an answer. Defaults to 0.0.
+            num_parallel (int, optional): Embed requests evaluated at the same time, the others wait as
+                with OLLAMA_NUM_PARALLEL. Defaults to 0, no limit.
+            answer (str, optional): Text of every answer. Defaults to a fixed sentence.
+        """
+        self.models: set[str] = set(models)
+        self.loaded: set[str] = set()
+        self.dimension: int = dimension
+        self.load_latency: float = load_latency
+        self.embed_latency: float = embed_latency
+        self.embed_latency_per_text: float = embed_latency_per_text
+        self.first_token_latency: float = first_token_latency
+        self.token_latency: float = token_latency
+        self.answer: str = answer
+        self._embed_slots = (
+            threading.Semaphore(num_parallel) if num_parallel else nullcontext()
+        )
+        self.requests: dict[str, int] = {}  # Number of requests, by path
+        self._lock = threading.Lock()
+
+        self.server = _Server((host, port), _Handler)
+        self.server.stub = self
+        self._thread: threading.Thread = None
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "OllamaStub":
+        """Serve the requests in a background thread."""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server and close its socket."""
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "OllamaStub":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def _full_name(self, model: str) -> str:
+        return model if ":" in model else f"{model}:latest"
+
+    def _load(self, model: str) -> bool:
+        """Load a model in memory, waiting the first time. Returns False if
+        the model does not exist."""
+        model = self._full_name(model)
+        with self._lock:
+            if model not in self.models:
+                return False
+            loaded = model in self.loaded
+            self.loaded.add(model)
+        if not loaded:
+            time.sleep(self.load_latency)
+        return True
+
+    def _embedding(self, text: str) -> list[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        vector = np.random.default_rng(seed).standard_normal(self.dimension)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def _tokens(self) -> list[str]:
+        words = self.answer.split(" ")
+        return [words[0]] + [f" {word}" for word in words[1:]]
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # Concurrent clients would overflow the default of 5
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive connections, as Ollama
+    disable_nagle_algorithm = True  # Else small responses wait for delayed ACKs
+    MODEL_ENDPOINTS = ("/api/embed", "/api/embeddings", "/api/generate", "/api/chat")
+
+    def log_message(self, format: str, *args) -> None:
+        pass  # Silence the access log
+
+    @property
+    def stub(self) -> OllamaStub:
+        return self.server.stub
+
+    def _count(self) -> None:
+        with self.stub._lock:
+            self.stub.requests[self.path] = self.stub.requests.get(self.path, 0) + 1
+
+    def _send_json(self, body: dict, status: int = 200) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _model_not_found(self, model: str) -> None:
+        self._send_json({"error": f"model '{model}' not found"}, status=404)
+
+    def do_HEAD(self) -> None:
+        self._count()
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self) -> None:
+        self._count()
+        if self.path == "/":
+            data = b"Ollama is running"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        elif self.path == "/api/tags":
+            models = sorted(self.stub.models)
+            self._send_json({"models": [{"name": name} for name in models]})
+        elif self.path == "/api/ps":
+            models = [
+                {"name": name, "size": 0, "size_vram": 0}
+                for name in sorted(self.stub.loaded)
+            ]
+            self._send_json({"models": models})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_DELETE(self) -> None:
+        self._count()
+        body = self._read_json()
+        model = self.stub._full_name(body.get("model") or body.get("name", ""))
+        with self.stub._lock:
+            if model not in self.stub.models:
+                return self._model_not_found(model)
+            self.stub.models.discard(model)
+            self.stub.loaded.discard(model)
+        self._send_json({})
+
+    def do_POST(self) -> None:
+        self._count()
+        body = self._read_json()
+        model = body.get("model") or body.get("name", "")
+        if self.path == "/api/pull":
+            with self.stub._lock:
+                self.stub.models.add(self.stub._full_name(model))
+            return self._send_json({"status": "success"})
+        if self.path not in self.MODEL_ENDPOINTS:
+            return self._send_json({"error": "not found"}, status=404)
+        if not self.stub._load(model):
+            return self._model_not_found(model)
+
+        if self.path == "/api/embed":
+            texts = body.get("input", [])
+            texts = [texts] if isinstance(texts, str) else texts
+            with self.stub._embed_slots:
+                time.sleep(
+                    self.stub.embed_latency
+                    + self.stub.embed_latency_per_text * len(texts)
+                )
+            embeddings = [self.stub._embedding(text) for text in texts]
+            return self._send_json({"model": model, "embeddings": embeddings})
+        if self.path == "/api/embeddings":  # Legacy endpoint, one text per request
+            with self.stub._embed_slots:
+                time.sleep(self.stub.embed_latency + self.stub.embed_latency_per_text)
+            return self._send_json({"embedding": self.stub._embedding(body["prompt"])})
+        if self.path == "/api/generate":  # Only used to load models
+            return self._send_json({"model": model, "response": "", "done": True})
+        self._chat(model, stream=body.get("stream", True))
+
+    def _chat(self, model: str, stream: bool) -> None:
+        tokens = self.stub._tokens()
+        prompt_eval = {"prompt_eval_count": 0, "eval_count": len(tokens)}
+        if not stream:
+            time.sleep(
+                self.stub.first_token_latency
+                + self.stub.token_latency * (len(tokens) - 1)
+            )
+            return self._send_json(
+                {
+                    "model": model,
+                    "message": {"role": "assistant", "content": self.stub.answer},
+                    "done": True,
+                    **prompt_eval,
+                }
+            )
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        time.sleep(self.stub.first_token_latency)
+        for index, token in enumerate(tokens):
+            if index:
+                time.sleep(self.stub.token_latency)
+            self._write_chunk(
+                {
+                    "model": model,
+                    "message": {"role": "assistant", "content": token},
+                    "done": False,
+                }
+            )
+        self._write_chunk(
+            {
+                "model": model,
+                "message": {"role": "assistant", "content": ""},
+                "done": True,
+                **prompt_eval,
+            }
+        )
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, body: dict) -> None:
+        data = json.dumps(body).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--load-latency", type=float, default=0.0)
+    parser.add_argument("--embed-latency", type=float, default=0.0)
+    parser.add_argument("--embed-latency-per-text", type=float, default=0.0)
+    parser.add_argument("--first-token-latency", type=float, default=0.0)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    parser.add_argument("--num-parallel", type=int, default=0)
+    args = parser.parse_args()
+
+    stub = OllamaStub(
+        host=args.host,
+        port=args.port,
+        dimension=args.dimension,
+        load_latency=args.load_latency,
+        embed_latency=args.embed_latency,
+        embed_latency_per_text=args.embed_latency_per_text,
+        first_token_latency=args.first_token_latency,
+        token_latency=args.token_latency,
+        num_parallel=args.num_parallel,
+    )
+    print(f"Ollama stub listening on {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from src.embeddings.types import Embedding
+from src.database.types import CollectionItem
+from src.llm.types import LLMResponse
+
+
+class CachedAnswer:
+    def __init__(
+        self,
+        embedding: np.ndarray,
+        answer: LLMResponse,
+        query_context: list[CollectionItem],
+        version: int,
+    ) -> None:
+        """
+        Represents an answer stored in the SemanticAnswerCache.
+
+        Args:
+            embedding (np.ndarray): Normalized embedding of the query.
+            answer (LLMResponse): Answer generated for the query.
+            query_context (list[CollectionItem]): Context used to generate the answer.
+            version (int): Version of the collection the context was retrieved from.
+        """
+        self.embedding: np.ndarray = embedding
+        self.answer: LLMResponse = answer
+        self.query_context: list[CollectionItem] = query_context
+        self.version: int = version
+        self.created_at: float = time.monotonic()
+
+
+class SemanticAnswerCache:
+    """
+    Cache of answers keyed by query embedding. A query hits the cache when the
+    cosine similarity with a cached query is above a threshold and the answer
+    was generated from the same version of the collection.
+
+    The key does not include the chat history, so only the first question of a
+    conversation should be cached: follow-ups such as "tell me more" depend on
+    the previous messages.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.95,
+        ttl_seconds: float = 3600,
+        max_entries: int = 512,
+    ) -> None:
+        """Initialize the SemanticAnswerCache class.
+
+        Args:
+            similarity_threshold (float, optional): Minimum cosine similarity for a hit. Defaults to 0.95.
+            ttl_seconds (float, optional): Seconds an answer is served for. Defaults to 3600.
+            max_entries (int, optional): Maximum number of cached answers. Defaults to 512.
+        """
+        self.similarity_threshold: float = similarity_threshold
+        self.ttl_seconds: float = ttl_seconds
+        self.max_entries: int = max_entries
+
+        self._entries: OrderedDict[int, CachedAnswer] = OrderedDict()
+        self._next_key: int = 0
+        self._lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    @property
+    def stats(self) -> dict:
+        """Get the hit-rate metrics of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+    @staticmethod
+    def _normalize(embedding: Embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _purge(self, version: int) -> None:
+        """Drop the expired answers and the answers of other collection versions."""
+        now = time.monotonic()
+        stale = [
+            key
+            for key, entry in self._entries.items()
+            if entry.version != version or now - entry.created_at > self.ttl_seconds
+        ]
+        for key in stale:
+            del self._entries[key]
+
+    def lookup(self, query_embedding: Embedding, version: int) -> CachedAnswer | None:
+        """
+        Look up the answer of the most similar cached query.
+
+        Args:
+            query_embedding (Embedding): Embedding of the query.
+            version (int): Current version of the collection.
+
+        Returns:
+            CachedAnswer | None: The cached answer, or None on a miss.
+        """
+        query = self._normalize(query_embedding)
+        with self._lock:
+            self._purge(version)
+            if self._entries:
+                keys = list(self._entries.keys())
+                matrix = np.stack([entry.embedding for entry in self._entries.values()])
+                similarities = matrix @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    self._entries.move_to_end(keys[best])
+                    self.hits += 1
+                    return self._entries[keys[best]]
+
+            self.misses += 1
+            return None
+
+    def store(
+        self,
+        query_embedding: Embedding,
+        version: int,
+        answer: LLMResponse,
+        query_context: list[CollectionItem],
+    ) -> None:
+        """
+        Store the answer of a query, evicting the least recently used answers.
+
+        Args:
+            query_embedding (Embedding): Embedding of the query.
+            version (int): Version of the collection the context was retrieved from.
+            answer (LLMResponse): Answer generated for the query.
+            query_context (list[CollectionItem]): Context used to generate the answer.
+        """
+        entry = CachedAnswer(
+            self._normalize(query_embedding), answer, query_context, version
+        )
+        with self._lock:
+            self._entries[self._next_key] = entry
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove every cached answer."""
+        with self._lock:
+            self._entries.clear()
@@ -1,24 +1,82 @@
+from typing import AsyncIterator, Iterator
+
+import httpx
 import requests
-import ollama
 
 from src.database.types import CollectionItem
+from src.helpers.http import AsyncHTTPClient
+from src.helpers.metrics import METRICS
 from src.helpers.ollama import OllamaHelper
-from src.llm.types import LLMModel, LLMResponse
+from src.llm.types import AsyncLLMStream, LLMModel, LLMResponse, LLMStream
+from src.llm.prompt import PromptBuilder
 
 
 class OllamaLLM(LLMModel):
     """Class for Ollama LLMs."""
 
-    def __init__(self, model: str, base_url: str = "http://localhost:11434") -> None:
+    def __init__(
+        self,
+        model: str,
+        base_url: str = "http://localhost:11434",
+        prompt_builder: PromptBuilder = None,
+        keep_alive: str | int = None,
+        options: dict = None,
+        warmup: bool = True,
+    ) -> None:
+        """Initialize the OllamaLLM class.
+
+        Args:
+            model (str): Name of the model.
+            base_url (str, optional): Base url the model is hosted by Ollama. Defaults to "http://localhost:11434".
+            prompt_builder (PromptBuilder, optional): Builder of the prompts within a token budget.
+                Defaults to None, a PromptBuilder with the default budget.
+            keep_alive (str | int, optional): How long the model stays loaded after a request, e.g. "30m".
+                Defaults to None, the server default.
+            options (dict, optional): Model options sent with every request, e.g. {"num_ctx": 4096}.
+                Defaults to None.
+            warmup (bool, optional): Whether to load the model in memory now. Defaults to True.
+        """
         super().__init__(model=model, base_url=base_url)
-        self.helper = OllamaHelper(base_url=base_url, verbose=True)
+        self.prompt_builder: PromptBuilder = prompt_builder or PromptBuilder()
+        self.helper = OllamaHelper.shared(base_url=base_url, verbose=True)
         self.helper.pull_model(model)
+        self.keep_alive: str | int = keep_alive
+        self.options: dict = options
+        if warmup:
+            self.helper.warmup(model, keep_alive=keep_alive, options=options)
+
+    def _build_messages(
+        self, query: str | list[dict], query_context: list[CollectionItem] = None
+    ) -> tuple[list[dict], dict]:
+        """
+        Build the messages sent to the model, within the token budget of the
+        prompt builder. The given messages are not modified. The token counts
+        are returned with each prompt, as the model is shared by concurrent
+        sessions and requests.
+
+        Args:
+            query (str | list[dict]): Simple text or list of dictionaries with role and content.
+            query_context (list[CollectionItem], optional): Context of the query. Defaults to None.
+
+        Returns:
+            tuple[list[dict], dict]: Messages with role and content, and token counts of the prompt.
+        """
+        return self.prompt_builder.build(query, query_context)
+
+    def _chat_body(self, messages: list[dict], stream: bool) -> dict:
+        """Build the body of a request to the chat endpoint."""
+        body = {"model": self.model, "messages": messages, "stream": stream}
+        if self.keep_alive is not None:
+            body["keep_alive"] = self.keep_alive
+        if self.options:
+            body["options"] = self.options
+        return body
 
     def ask(
         self, query: str | list[dict], query_context: list[CollectionItem] = None
     ) -> LLMResponse:
         """
-        Implementation of get_embedding method for OllamaEmbedding.
+        Implementation of ask method for OllamaLLM.
 
         Args:
             query (str | list[dict]): Simple text or list of dictionaries with role and content.
@@ -28,18 +86,121 @@ class OllamaLLM(LLMModel):
             LLMResponse: Response from the model.
         """
         try:
-            if isinstance(query, str):
-                query = [{"role": "user", "content": query}]
+            messages, _ = self._build_messages(query, query_context)
+            with METRICS.span("llm.answer"):
+                response = self.helper.client.post(
+                    "/api/chat", json=self._chat_body(messages, stream=False)
+                )
+                response.raise_for_status()
+                return response.json()["message"]["content"]
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Error connecting to Ollama model: {e}") from e
+        except Exception as e:
+            raise Exception(f"Error getting response from Ollama model: {e}") from e
+
+    def ask_stream(
+        self, query: str | list[dict], query_context: list[CollectionItem] = None
+    ) -> LLMStream:
+        """
+        Implementation of ask_stream method for OllamaLLM.
+
+        Args:
+            query (str | list[dict]): Simple text or list of dictionaries with role and content.
+            query_context (list[CollectionItem], optional): Context of the query. Defaults to None.
+
+        Returns:
+            LLMStream: Stream of tokens of the response.
+        """
+        messages, prompt_stats = self._build_messages(query, query_context)
+        return LLMStream(self._stream_chat(messages), prompt_stats=prompt_stats)
 
-            if query_context is not None:
-                # Add the information to the last user query
-                context_info = "Next is the context information:\n\n"
-                context_info += "\n\n".join([item.text for item in query_context])
-                query[-1]["content"] += context_info
+    def _stream_chat(self, messages: list[dict]) -> Iterator[str]:
+        """
+        Stream the tokens of a chat completion.
+
+        Args:
+            messages (list[dict]): Messages with role and content.
 
-            response = ollama.chat(model=self.model, messages=query)
-            return response["message"]["content"]
+        Returns:
+            Iterator[str]: Tokens of the response.
+        """
+        try:
+            for chunk in self.helper.client.stream(
+                "/api/chat", json=self._chat_body(messages, stream=True)
+            ):
+                if "error" in chunk:
+                    raise ValueError(chunk["error"])
+                if chunk["message"]["content"]:
+                    yield chunk["message"]["content"]
         except requests.exceptions.RequestException as e:
             raise Exception(f"Error connecting to Ollama model: {e}") from e
         except Exception as e:
             raise Exception(f"Error getting response from Ollama model: {e}") from e
+
+    async def aask(
+        self, query: str | list[dict], query_context: list[CollectionItem] = None
+    ) -> LLMResponse:
+        """
+        Implementation of aask method for OllamaLLM.
+
+        Args:
+            query (str | list[dict]): Simple text or list of dictionaries with role and content.
+            query_context (list[CollectionItem], optional): Context of the query. Defaults to None.
+
+        Returns:
+            LLMResponse: Response from the model.
+        """
+        try:
+            messages, _ = self._build_messages(query, query_context)
+            client = AsyncHTTPClient.shared(self.base_url)
+            with METRICS.span("llm.answer"):
+                response = await client.post(
+                    "/api/chat", json=self._chat_body(messages, stream=False)
+                )
+                response.raise_for_status()
+                return response.json()["message"]["content"]
+        except httpx.TransportError as e:
+            raise Exception(f"Error connecting to Ollama model: {e}") from e
+        except Exception as e:
+            raise Exception(f"Error getting response from Ollama model: {e}") from e
+
+    def aask_stream(
+        self, query: str | list[dict], query_context: list[CollectionItem] = None
+    ) -> AsyncLLMStream:
+        """
+        Implementation of aask_stream method for OllamaLLM.
+
+        Args:
+            query (str | list[dict]): Simple text or list of dictionaries with role and content.
+            query_context (list[CollectionItem], optional): Context of the query. Defaults to None.
+
+        Returns:
+            AsyncLLMStream: Stream of tokens of the response.
+        """
+        messages, prompt_stats = self._build_messages(query, query_context)
+        return AsyncLLMStream(self._astream_chat(messages), prompt_stats=prompt_stats)
+
+    async def _astream_chat(self, messages: list[dict]) -> AsyncIterator[str]:
+        """
+        Stream the tokens of a chat completion, with the asyncio client of the
+        running event loop.
+
+        Args:
+            messages (list[dict]): Messages with role and content.
+
+        Returns:
+            AsyncIterator[str]: Tokens of the response.
+        """
+        try:
+            client = AsyncHTTPClient.shared(self.base_url)
+            async for chunk in client.stream(
+                "/api/chat", json=self._chat_body(messages, stream=True)
+            ):
+                if "error" in chunk:
+                    raise ValueError(chunk["error"])
+                if chunk["message"]["content"]:
+                    yield chunk["message"]["content"]
+        except httpx.TransportError as e:
+            raise Exception(f"Error connecting to Ollama model: {e}") from e
+        except Exception as e:
+            raise Exception(f"Error getting response from Ollama model: {e}") from e
@@ -0,0 +1,117 @@
+import math
+
+from src.database.types import CollectionItem
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens of a text, about 4 characters per token.
+
+    Args:
+        text (str): Text to measure.
+
+    Returns:
+        int: Estimated number of tokens.
+    """
+    return math.ceil(len(text) / 4)
+
+
+class PromptBuilder:
+    """
+    Builds the messages sent to a chat model within a token budget, without
+    modifying the chat history it is given.
+
+    The current question is always kept. The context chunks are packed by
+    relevance until the context budget is used, and the previous turns fill
+    the remaining budget from the newest to the oldest. The oldest turn that
+    does not fit is truncated and the older ones are dropped.
+    """
+
+    CONTEXT_HEADER = "Next is the context information:"
+
+    def __init__(
+        self, max_prompt_tokens: int = 1536, max_context_tokens: int = 1024
+    ) -> None:
+        """Initialize the PromptBuilder class.
+
+        Args:
+            max_prompt_tokens (int, optional): Maximum number of tokens of the whole prompt. Defaults to 1536.
+            max_context_tokens (int, optional): Maximum number of tokens of the context chunks. Defaults to 1024.
+        """
+        self.max_prompt_tokens: int = max_prompt_tokens
+        self.max_context_tokens: int = max_context_tokens
+
+    def build(
+        self, query: str | list[dict], query_context: list[CollectionItem] = None
+    ) -> tuple[list[dict], dict]:
+        """
+        Build the messages of a prompt.
+
+        Args:
+            query (str | list[dict]): Simple text or list of dictionaries with role and content,
+                the last one being the current question.
+            query_context (list[CollectionItem], optional): Context of the query, most relevant first
+                unless the items have distances. Defaults to None.
+
+        Returns:
+            tuple[list[dict], dict]: Messages with role and content, and the token counts of the
+                prompt with the number of context chunks and previous messages kept.
+        """
+        if isinstance(query, str):
+            query = [{"role": "user", "content": query}]
+        *history, question = query
+        budget = self.max_prompt_tokens
+
+        content = self._truncate(question["content"], budget)
+        query_tokens = estimate_tokens(content)
+        budget -= query_tokens
+
+        # Pack the most relevant chunks that fit, skipping the ones too long
+        items = list(query_context or [])
+        if all(item.distance is not None for item in items):
+            items.sort(key=lambda item: item.distance)
+        context_budget = min(self.max_context_tokens, budget)
+        header_tokens = estimate_tokens(self.CONTEXT_HEADER)
+        chunks, context_tokens = [], 0
+        for item in items:
+            tokens = estimate_tokens(item.text)
+            if header_tokens + context_tokens + tokens <= context_budget:
+                chunks.append(item.text)
+                context_tokens += tokens
+        if chunks:
+            context_tokens += header_tokens
+            content += f"\n\n{self.CONTEXT_HEADER}\n\n" + "\n\n".join(chunks)
+        budget -= context_tokens
+
+        # Keep the newest turns, truncating the oldest one that partially fits
+        kept, history_tokens = [], 0
+        for message in reversed(history):
+            if budget <= 0:
+                break
+            text = self._truncate(message["content"], budget, keep_end=True)
+            kept.append({"role": message["role"], "content": text})
+            history_tokens += estimate_tokens(text)
+            budget -= estimate_tokens(text)
+        kept.reverse()
+
+        messages = kept + [{"role": question["role"], "content": content}]
+        stats = {
+            "prompt_tokens": query_tokens + context_tokens + history_tokens,
+            "query_tokens": query_tokens,
+            "context_tokens": context_tokens,
+            "history_tokens": history_tokens,
+            "context_chunks": len(chunks),
+            "context_chunks_dropped": len(items) - len(chunks),
+            "history_messages": len(kept),
+            "history_messages_dropped": len(history) - len(kept),
+        }
+        return messages, stats
+
+    @staticmethod
+    def _truncate(text: str, max_tokens: int, keep_end: bool = False) -> str:
+        """Cut a text to a number of tokens, keeping its start or its end."""
+        if estimate_tokens(text) <= max_tokens:
+            return text
+        max_chars = max(max_tokens, 0) * 4
+        if keep_end:
+            return text[len(text) - max_chars :]
+        return text[:max_chars]
@@ -1,9 +1,103 @@
+import time
+import asyncio
 from abc import abstractmethod
+from typing import AsyncIterator, Iterator
+
+from src.helpers.metrics import METRICS
 
 
 LLMResponse = str
 
 
+class LLMStream:
+    """
+    Iterator over the tokens of an answer as they are generated.
+    While it is consumed it measures the time to the first token and the
+    generation speed, and it accumulates the full answer in `text`.
+    """
+
+    def __init__(self, tokens: Iterator[str], prompt_stats: dict = None) -> None:
+        """Initialize the LLMStream class.
+
+        Args:
+            tokens (Iterator[str]): Tokens (or text pieces) of the answer.
+            prompt_stats (dict, optional): Token counts of the prompt. Defaults to None.
+        """
+        self._tokens: Iterator[str] = tokens
+        self.prompt_stats: dict = prompt_stats
+        self.text: LLMResponse = ""
+        self.num_tokens: int = 0
+        self.time_to_first_token: float = None
+        self.total_time: float = None
+
+    def __iter__(self) -> Iterator[str]:
+        start = time.perf_counter()
+        for token in self._tokens:
+            self._on_token(token, start)
+            yield token
+        self._on_end(start)
+
+    def _on_token(self, token: str, start: float) -> None:
+        if self.time_to_first_token is None:
+            self.time_to_first_token = time.perf_counter() - start
+        self.num_tokens += 1
+        self.text += token
+
+    def _on_end(self, start: float) -> None:
+        self.total_time = time.perf_counter() - start
+        if self.time_to_first_token is not None:
+            METRICS.record("llm.first_token", self.time_to_first_token)
+        METRICS.record("llm.answer", self.total_time)
+        METRICS.increment("llm.tokens", self.num_tokens)
+
+    @property
+    def tokens_per_second(self) -> float:
+        """Get the generation speed, measured after the first token."""
+        if self.total_time is None or self.num_tokens < 2:
+            return None
+        generation_time = self.total_time - self.time_to_first_token
+        if generation_time <= 0:
+            return None
+        return (self.num_tokens - 1) / generation_time
+
+    @property
+    def stats(self) -> dict:
+        """Get the latency statistics of the stream."""
+        return {
+            "time_to_first_token": self.time_to_first_token,
+            "tokens_per_second": self.tokens_per_second,
+            "num_tokens": self.num_tokens,
+            "total_time": self.total_time,
+            "prompt_tokens": (self.prompt_stats or {}).get("prompt_tokens"),
+        }
+
+
+class AsyncLLMStream(LLMStream):
+    """
+    Asynchronous iterator over the tokens of an answer as they are generated,
+    with the same measures as LLMStream.
+    """
+
+    def __init__(self, tokens: AsyncIterator[str], prompt_stats: dict = None) -> None:
+        """Initialize the AsyncLLMStream class.
+
+        Args:
+            tokens (AsyncIterator[str]): Tokens (or text pieces) of the answer.
+            prompt_stats (dict, optional): Token counts of the prompt. Defaults to None.
+        """
+        super().__init__(tokens, prompt_stats=prompt_stats)
+
+    def __iter__(self) -> Iterator[str]:
+        raise TypeError("AsyncLLMStream must be consumed with `async for`.")
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        start = time.perf_counter()
+        async for token in self._tokens:
+            self._on_token(token, start)
+            yield token
+        self._on_end(start)
+
+
 class LLMModel:
     """
     Abstract class for LLM models.
@@ -34,3 +128,58 @@ class LLMModel:
             LLMResponse: Response from the model.
         """
         pass
+
+    def ask_stream(
+        self, query: str | list[dict], query_context: list[dict] = None
+    ) -> LLMStream:
+        """
+        Ask the model a question and get the answer as it is generated.
+        Models that support streaming should override this method, by default
+        the whole answer is returned as a single piece.
+
+        Args:
+            query (str | list[dict]): Simple text or list of dictionaries with role and content.
+            query_context (list[dict], optional): Context of the query. Defaults to None.
+
+        Returns:
+            LLMStream: Stream of tokens of the response.
+        """
+        return LLMStream(iter([self.ask(query, query_context=query_context)]))
+
+    async def aask(
+        self, query: str | list[dict], query_context: list[dict] = None
+    ) -> LLMResponse:
+        """
+        Ask the model a question without blocking the event loop. Models with
+        an asyncio client should override this method, by default the
+        synchronous method runs in a worker thread.
+
+        Args:
+            query (str | list[dict]): Simple text or list of dictionaries with role and content.
+            query_context (list[dict], optional): Context of the query. Defaults to None.
+
+        Returns:
+            LLMResponse: Response from the model.
+        """
+        return await asyncio.to_thread(self.ask, query, query_context=query_context)
+
+    def aask_stream(
+        self, query: str | list[dict], query_context: list[dict] = None
+    ) -> AsyncLLMStream:
+        """
+        Ask the model a question and get the answer as it is generated, in an
+        event loop. Models that support streaming should override this method,
+        by default the whole answer is returned as a single piece.
+
+        Args:
+            query (str | list[dict]): Simple text or list of dictionaries with role and content.
+            query_context (list[dict], optional): Context of the query. Defaults to None.
+
+        Returns:
+            AsyncLLMStream: Stream of tokens of the response.
+        """
+
+        async def tokens() -> AsyncIterator[str]:
+            yield await self.aask(query, query_context=query_context)
+
+        return AsyncLLMStream(tokens())
@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable
+
+from src.processing.pipeline import IngestionPipeline
+
+
+def find_files(root: str, pattern: str = "*.pdf") -> list[str]:
+    """Find the files of a directory tree matching a pattern.
+
+    Args:
+        root (str): Directory to search.
+        pattern (str, optional): Glob pattern of the file names. Defaults to "*.pdf".
+
+    Returns:
+        list[str]: Paths of the files, sorted so that runs are reproducible.
+    """
+    return sorted(str(path) for path in Path(root).rglob(pattern) if path.is_file())
+
+
+class IngestionCheckpoint:
+    """
+    Append-only record of the files processed by a bulk ingestion, as JSON
+    lines with the path, size and modification time of each file and the
+    outcome of its ingestion.
+
+    A file is finished when the latest record for its path matches its
+    current size and modification time, so files modified since then are
+    ingested again. Appending keeps each save proportional to the new
+    records, and a line truncated by an interruption is ignored.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Initialize the IngestionCheckpoint class.
+
+        Args:
+            path (str): Path to the checkpoint file.
+        """
+        self.path: str = path
+        self.records: dict[str, dict] = {}  # Latest record, by file path
+        if os.path.exists(path):
+            with open(path, "r") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Partial line of an interrupted write
+                    self.records[record["path"]] = record
+
+    @staticmethod
+    def _signature(path: str) -> dict:
+        stat = os.stat(path)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def is_finished(self, path: str, retry_failed: bool = False) -> bool:
+        """
+        Check if a file was already processed in its current version.
+
+        Args:
+            path (str): Path to the file.
+            retry_failed (bool, optional): Whether failed files count as not finished. Defaults to False.
+
+        Returns:
+            bool: True if the file can be skipped, False otherwise.
+        """
+        record = self.records.get(path)
+        if record is None or (retry_failed and record["status"] == "failed"):
+            return False
+        signature = self._signature(path)
+        return all(record.get(key) == value for key, value in signature.items())
+
+    def record(self, path: str, status: str, **details) -> dict:
+        """
+        Build the record of a processed file, to be saved with `append`.
+
+        Args:
+            path (str): Path to the file.
+            status (str): Outcome of the ingestion, "done" or "failed".
+            **details: Other values to record, e.g. the number of chunks.
+
+        Returns:
+            dict: The record.
+        """
+        return {"path": path, **self._signature(path), "status": status, **details}
+
+    def append(self, records: list[dict]) -> None:
+        """
+        Save records at the end of the checkpoint file.
+
+        Args:
+            records (list[dict]): Records built with `record`.
+        """
+        if not records:
+            return
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a") as file:
+            file.writelines(json.dumps(record) + "\n" for record in records)
+            file.flush()
+            os.fsync(file.fileno())
+        for record in records:
+            self.records[record["path"]] = record
+
+
+class BulkIngestion:
+    """
+    Ingests many files with a pool of workers sharing one pipeline, and
+    checkpoints the finished files so an interrupted run can be resumed.
+
+    The manifest of the pipeline is saved before the records of the files it
+    describes are appended to the checkpoint, every `save_interval` seconds.
+    After an interruption, the files finished since the last save are
+    ingested again, which is harmless as the chunks are upserted under the
+    same IDs.
+    """
+
+    def __init__(
+        self,
+        pipeline: IngestionPipeline,
+        checkpoint: IngestionCheckpoint,
+        root: str,
+        max_workers: int = 2,
+        save_interval: float = 30.0,
+        retry_failed: bool = False,
+    ) -> None:
+        """Initialize the BulkIngestion class.
+
+        Args:
+            pipeline (IngestionPipeline): Pipeline used to ingest each file.
+            checkpoint (IngestionCheckpoint): Record of the processed files.
+            root (str): Directory of the files. The chunks are stored with the path relative to it.
+            max_workers (int, optional): Number of files ingested at the same time. Defaults to 2.
+            save_interval (float, optional): Seconds between two saves of the manifest and checkpoint.
+                Defaults to 30.0.
+            retry_failed (bool, optional): Whether the files that failed in a previous run are retried.
+                Defaults to False.
+        """
+        self.pipeline: IngestionPipeline = pipeline
+        self.checkpoint: IngestionCheckpoint = checkpoint
+        self.root: str = root
+        self.max_workers: int = max_workers
+        self.save_interval: float = save_interval
+        self.retry_failed: bool = retry_failed
+        self._pending_records: list[dict] = []
+        self._lock = threading.Lock()
+
+    def run(
+        self, files: list[str], on_result: Callable[[dict], None] = None
+    ) -> dict:
+        """
+        Ingest the files that are not finished according to the checkpoint.
+
+        Args:
+            files (list[str]): Paths of the files, inside the root directory.
+            on_result (Callable[[dict], None], optional): Called with the record of each processed file,
+                from the calling thread. Defaults to None.
+
+        Returns:
+            dict: Number of files found, already finished, done and failed, number of chunks inserted
+                and duration in seconds.
+        """
+        start = time.perf_counter()
+        pending = [
+            path
+            for path in files
+            if not self.checkpoint.is_finished(path, retry_failed=self.retry_failed)
+        ]
+        summary = {
+            "files": len(files),
+            "already_finished": len(files) - len(pending),
+            "done": 0,
+            "failed": 0,
+            "chunks": 0,
+        }
+
+        queued = iter(pending)
+        in_flight: set[Future] = set()
+        last_save = time.monotonic()
+        executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="bulk-ingestion"
+        )
+        try:
+            while True:
+                # Only a few files are queued ahead, so the memory stays flat
+                while len(in_flight) < 2 * self.max_workers:
+                    path = next(queued, None)
+                    if path is None:
+                        break
+                    in_flight.add(executor.submit(self._ingest, path))
+                if not in_flight:
+                    break
+
+                finished, in_flight = wait(
+                    in_flight, timeout=self.save_interval, return_when=FIRST_COMPLETED
+                )
+                for future in finished:
+                    record = future.result()
+                    summary[record["status"]] += 1
+                    summary["chunks"] += record.get("chunks", 0)
+                    if on_result is not None:
+                        on_result(record)
+
+                if time.monotonic() - last_save >= self.save_interval:
+                    self.save()
+                    last_save = time.monotonic()
+        finally:
+            # On interruption, the finished files are saved first, in case the
+            # files being ingested are interrupted too, then these are saved
+            self.save()
+            executor.shutdown(wait=True, cancel_futures=True)
+            self.save()
+
+        summary["seconds"] = round(time.perf_counter() - start, 3)
+        return summary
+
+    def save(self) -> None:
+        """Save the manifest, then the records of the files it describes."""
+        with self._lock:
+            records, self._pending_records = self._pending_records, []
+        if self.pipeline.manifest is not None:
+            self.pipeline.manifest.save()
+        self.checkpoint.append(records)
+
+    def _ingest(self, path: str) -> dict:
+        """Ingest a single file and queue its record for the next save."""
+        start = time.perf_counter()
+        document_path = os.path.relpath(path, self.root).replace(os.sep, "/")
+        try:
+            chunks = self.pipeline.run(path, document_path=document_path)
+            record = self.checkpoint.record(
+                path,
+                "done",
+                document_path=document_path,
+                chunks=chunks,
+                seconds=round(time.perf_counter() - start, 3),
+            )
+        except Exception as e:
+            record = self.checkpoint.record(
+                path,
+                "failed",
+                document_path=document_path,
+                error=str(e),
+                seconds=round(time.perf_counter() - start, 3),
+            )
+        with self._lock:
+            self._pending_records.append(record)
+        return record
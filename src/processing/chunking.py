@@ -1,19 +1,26 @@
 from abc import abstractmethod
+from typing import Iterable, Iterator
 
 from src.processing.readers import Extraction
 
 
 class Chunk:
-    def __init__(self, text: str, location: str) -> None:
+    def __init__(
+        self, text: str, location: str, start: int = None, end: int = None
+    ) -> None:
         """
         Represents a chunk of text extracted from the original text.
 
         Args:
             text (str): The text chunk.
             location (str): The source of extraction (e.g., page).
+            start (int, optional): Offset of the chunk in the extraction text. Defaults to None.
+            end (int, optional): Offset after the chunk in the extraction text. Defaults to None.
         """
         self.text: str = text  # The text chunk
         self.location: str = location  # The source of extraction (e.g., page)
+        self.start: int = start  # Offsets of the chunk in the extraction text
+        self.end: int = end
 
 
 class Chunker:
@@ -34,6 +41,16 @@ class Chunker:
         """
         pass
 
+    def iter_chunks(self, *args, **kwargs) -> Iterator[Chunk]:
+        """
+        Get the text chunks lazily. Chunkers that can consume the extractions
+        as they arrive should override this method, by default it wraps get_chunks.
+
+        Returns:
+            Iterator[Chunk]: Text chunks.
+        """
+        yield from self.get_chunks(*args, **kwargs)
+
 
 ###################################################################################
 ##################################### PDFs ########################################
@@ -47,61 +64,71 @@ class SymbolChunker(Chunker):
         """Initialize the BreaksChunker class.
 
         Args:
-            chars_limit (int, optional): The maximum number of characters in a chunk. Defaults to 256.
-            overlap (int, optional): The number of characters to overlap between chunks. Defaults to 50.
+            chars_limit (int, optional): The maximum number of characters in a chunk. Defaults to 1024.
+            overlap (int, optional): The number of characters to overlap between chunks. Defaults to 256.
             symbol (str, optional): The symbol to use as a break. Defaults to "\n".
         """
         super().__init__()
+        if not 0 <= overlap < chars_limit:
+            raise ValueError(
+                f"The overlap ({overlap}) must be smaller than the chunk size "
+                f"({chars_limit})."
+            )
         self.chars_limit: int = chars_limit
         self.overlap: int = overlap
         self.symbol: str = symbol
 
     def get_chunks(
         self,
-        extractions: Extraction,
+        extractions: Iterable[Extraction],
     ) -> list[Chunk]:
         """
         Get the text chunks based on breaks.
 
         Args:
-            extractions (Extraction): The text to chunk.
+            extractions (Iterable[Extraction]): The text to chunk.
 
 
         Returns:
             List[Chunk]: Text chunks.
         """
-        chunks = []  # List to store the chunks of text
+        return list(self.iter_chunks(extractions))
 
-        # Iterate through each Extraction object
-        for extraction in extractions:
-            lines = extraction.text.split(self.symbol)  # Split the text into lines
+    def iter_chunks(self, extractions: Iterable[Extraction]) -> Iterator[Chunk]:
+        """
+        Get the text chunks based on breaks, chunking each extraction as soon
+        as it is available.
 
-            current_chunk = (
-                ""  # Initialize an empty string for the current chunk of text
-            )
-            current_chunk_length = 0  # Initialize the length of the current chunk
-
-            # Iterate through each line of the text
-            for line in lines:
-                # If adding the current line to the current chunk doesn't exceed the text limit
-                if len(current_chunk) + len(line) + self.overlap <= self.chars_limit:
-                    current_chunk += line + "\n"  # Add the line to the current chunk
-                    current_chunk_length += (
-                        len(line) + 1
-                    )  # Update the length of the current chunk
-                else:  # If adding the current line to the current chunk exceeds the text limit
-                    chunks.append(
-                        Chunk(current_chunk.strip(), extraction.location)
-                    )  # Add the current chunk to the list
-                    current_chunk = (
-                        current_chunk[len(line) - self.overlap :] + line + "\n"
-                    )  # Start a new chunk with overlap
-                    current_chunk_length = (
-                        len(line) + 1
-                    )  # Update the length of the new chunk
-
-            # Add the remaining part as a chunk if it exceeds the text limit
-            if current_chunk:
-                chunks.append(Chunk(current_chunk.strip(), extraction.location))
-
-        return chunks
+        Every chunk has at most `chars_limit` characters and ends right after
+        the last break that fits in it (or at the limit if there is none).
+        Each chunk starts exactly `overlap` characters before the end of the
+        previous one. The text is walked once tracking (start, end) offsets,
+        and substrings are only created when a chunk is emitted.
+
+        Args:
+            extractions (Iterable[Extraction]): The text to chunk.
+
+        Returns:
+            Iterator[Chunk]: Text chunks.
+        """
+        for extraction in extractions:
+            text = extraction.text
+            text_length = len(text)
+
+            start = 0
+            while start < text_length:
+                end = min(start + self.chars_limit, text_length)
+                if end < text_length:
+                    # Cut after the last break of the window. The break must leave
+                    # the chunk longer than the overlap, so the next one moves forward
+                    cut = text.rfind(self.symbol, start + self.overlap + 1, end)
+                    if cut != -1:
+                        end = cut + len(self.symbol)
+
+                chunk_text = text[start:end]
+                if chunk_text.strip():  # Skip chunks with only blank characters
+                    yield Chunk(chunk_text, extraction.location, start, end)
+
+                if end == text_length:
+                    break
+                start = end - self.overlap
@@ -0,0 +1,193 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from src.processing.pipeline import IngestionPipeline
+
+
+class IngestionJob:
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+
+    def __init__(self, name: str, path: str, document_hash: str) -> None:
+        """
+        Represents the ingestion of a single file by the IngestionJobQueue.
+
+        Args:
+            name (str): Name of the document, stored with its chunks.
+            path (str): Path to the file to ingest.
+            document_hash (str): Hash of the file content.
+        """
+        self.name: str = name
+        self.path: str = path
+        self.document_hash: str = document_hash
+        self.status: str = self.QUEUED
+        self.progress: dict[str, int] = {}  # Items processed, by pipeline stage
+        self.total_pages: int = None
+        self.chunks: int = 0
+        self.error: str = None
+        self.created_at: float = time.time()
+        self.finished_at: float = None
+
+    @property
+    def finished(self) -> bool:
+        """Whether the job is not waiting nor running anymore."""
+        return self.status in (self.DONE, self.SKIPPED, self.FAILED)
+
+    @property
+    def fraction(self) -> float:
+        """Fraction of the pages read, between 0 and 1."""
+        if self.finished:
+            return 1.0
+        if not self.total_pages:
+            return 0.0
+        return min(self.progress.get("read", 0) / self.total_pages, 1.0)
+
+    def _on_progress(self, stage: str, processed: int, total: int | None) -> None:
+        self.progress[stage] = processed
+
+
+class IngestionJobQueue:
+    """
+    Runs ingestion jobs on a bounded pool of background workers, outside the
+    request path. Files are deduplicated by content, so submitting the same
+    file again (e.g. on every Streamlit rerun) returns the existing job, even
+    if it failed. Failed jobs keep their file and run again only with `retry`.
+    """
+
+    def __init__(
+        self,
+        pipeline: IngestionPipeline,
+        max_workers: int = 2,
+        upload_dir: str = "tmp",
+        max_finished_jobs: int = 50,
+    ) -> None:
+        """Initialize the IngestionJobQueue class.
+
+        Args:
+            pipeline (IngestionPipeline): Pipeline used to ingest the files.
+            max_workers (int, optional): Maximum number of files ingested at the same time. Defaults to 2.
+            upload_dir (str, optional): Folder where the submitted files are written. Defaults to "tmp".
+            max_finished_jobs (int, optional): Number of finished jobs kept for status. Defaults to 50.
+        """
+        self.pipeline: IngestionPipeline = pipeline
+        self.upload_dir: str = upload_dir
+        self.max_finished_jobs: int = max_finished_jobs
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="ingestion"
+        )
+        self._jobs: OrderedDict[str, IngestionJob] = OrderedDict()  # By hash
+        self._lock = threading.Lock()
+
+    @property
+    def jobs(self) -> list[IngestionJob]:
+        """Get the jobs, from the oldest to the newest."""
+        with self._lock:
+            return list(self._jobs.values())
+
+    @property
+    def active(self) -> bool:
+        """Whether some job is waiting or running."""
+        return any(not job.finished for job in self.jobs)
+
+    def submit(self, name: str, data: bytes) -> IngestionJob:
+        """
+        Queue a file to be ingested.
+
+        Args:
+            name (str): Name of the document, stored with its chunks.
+            data (bytes): Content of the file.
+
+        Returns:
+            IngestionJob: The new job, or the existing job for the same content.
+        """
+        document_hash = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            job = self._jobs.get(document_hash)
+            if job is not None:
+                return job
+
+            path = os.path.join(self.upload_dir, f"{document_hash}.pdf")
+            job = IngestionJob(name=name, path=path, document_hash=document_hash)
+            self._jobs[document_hash] = job
+            self._jobs.move_to_end(document_hash)
+            self._forget_finished_jobs()
+
+        manifest = self.pipeline.manifest
+        if manifest is not None and manifest.contains(document_hash):
+            job.status = IngestionJob.SKIPPED
+            job.finished_at = time.time()
+            return job
+
+        os.makedirs(self.upload_dir, exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(data)
+        self.executor.submit(self._run, job)
+        return job
+
+    def retry(self, job: IngestionJob) -> None:
+        """
+        Run a failed job again, e.g. when the user asks for it.
+
+        Args:
+            job (IngestionJob): Job that failed.
+        """
+        with self._lock:
+            if job.status != IngestionJob.FAILED:
+                return
+            job.status = IngestionJob.QUEUED
+            job.error = None
+            job.progress = {}
+            job.finished_at = None
+        self.executor.submit(self._run, job)
+
+    def clear_finished(self) -> None:
+        """Forget the finished jobs, e.g. after the database is cleared, so
+        that their files can be submitted again."""
+        with self._lock:
+            for key in [key for key, job in self._jobs.items() if job.finished]:
+                self._forget(key)
+
+    def _run(self, job: IngestionJob) -> None:
+        """Ingest the file of a job, recording its status and progress."""
+        job.status = IngestionJob.RUNNING
+        try:
+            num_pages = getattr(self.pipeline.reader, "num_pages", None)
+            job.total_pages = num_pages(job.path) if num_pages else None
+            job.chunks = self.pipeline.run(
+                job.path,
+                document_path=job.name,
+                # Uploads with the same name can be unrelated documents, so an
+                # upload never replaces the chunks of another one
+                document_key=job.document_hash,
+                total_pages=job.total_pages,
+                on_progress=job._on_progress,
+            )
+            job.status = IngestionJob.DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = IngestionJob.FAILED
+        finally:
+            job.finished_at = time.time()
+            # The chunks are stored with the job name, the file is only kept to
+            # retry a failed job
+            if job.status != IngestionJob.FAILED and os.path.exists(job.path):
+                os.remove(job.path)
+
+    def _forget_finished_jobs(self) -> None:
+        """Drop the oldest finished jobs beyond `max_finished_jobs`."""
+        finished = [key for key, job in self._jobs.items() if job.finished]
+        for key in finished[: max(len(finished) - self.max_finished_jobs, 0)]:
+            self._forget(key)
+
+    def _forget(self, key: str) -> None:
+        """Drop a finished job and the file kept if it failed."""
+        job = self._jobs.pop(key)
+        if os.path.exists(job.path):
+            os.remove(job.path)
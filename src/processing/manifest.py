@@ -0,0 +1,145 @@
+import os
+import json
+import hashlib
+import threading
+from collections import Counter
+
+
+def text_hash(text: str) -> str:
+    """Compute the SHA-256 hash of a text.
+
+    Args:
+        text (str): Text to hash.
+
+    Returns:
+        str: Hexadecimal digest of the text.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class IngestionManifest:
+    """
+    Record of the documents ingested into a vector store.
+
+    For each document it keeps the hash of the file content, the path stored
+    with its chunks and, for each page, the hash of its text and the IDs of the
+    chunks inserted from it. This allows skipping files that were already
+    ingested and re-processing only the pages that changed when a new version
+    of a document is ingested.
+
+    Documents are identified by a key: files ingested again under the same key
+    are new versions of the same document. The key is the document path for
+    files read from a directory tree, and the content hash for uploads, as two
+    uploads with the same name can be unrelated documents.
+
+    The manifest is a JSON file with the following structure:
+    {"documents": {key: {"hash": str, "document_path": str, "pages": {location: {"hash": str, "ids": list[str]}}}}}
+    """
+
+    def __init__(self, path: str, autosave: bool = True) -> None:
+        """Initialize the IngestionManifest class.
+
+        Args:
+            path (str): Path to the manifest file, usually next to the vector store.
+            autosave (bool, optional): Whether every change is saved right away. Bulk ingestions disable it
+                and call `save` periodically, as the whole file is written on each save. Defaults to True.
+        """
+        self.path: str = path
+        self.autosave: bool = autosave
+        self._lock = threading.Lock()
+        self.documents: dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, "r") as file:
+                self.documents = json.load(file).get("documents", {})
+        # Number of documents with each content hash, for constant-time lookups
+        self._hashes: Counter = Counter(
+            document["hash"] for document in self.documents.values()
+        )
+
+    @property
+    def document_paths(self) -> list[str]:
+        """Get the paths stored with the chunks of the documents, sorted."""
+        with self._lock:
+            return sorted(
+                {
+                    document.get("document_path", key)
+                    for key, document in self.documents.items()
+                }
+            )
+
+    def contains(self, document_hash: str) -> bool:
+        """
+        Check if a file with the given content hash was already ingested.
+
+        Args:
+            document_hash (str): Hash of the file content.
+
+        Returns:
+            bool: True if the file was already ingested, False otherwise.
+        """
+        with self._lock:
+            return self._hashes[document_hash] > 0
+
+    def get_pages(self, key: str) -> dict[str, dict]:
+        """
+        Get the pages recorded for a document.
+
+        Args:
+            key (str): Key of the document.
+
+        Returns:
+            dict[str, dict]: Hash and chunk IDs of each page, by location.
+        """
+        with self._lock:
+            document = self.documents.get(key)
+            return dict(document["pages"]) if document else {}
+
+    def update(
+        self,
+        key: str,
+        document_hash: str,
+        pages: dict[str, dict],
+        document_path: str = None,
+    ) -> None:
+        """
+        Record a document and save the manifest if `autosave` is enabled.
+
+        Args:
+            key (str): Key of the document.
+            document_hash (str): Hash of the file content.
+            pages (dict[str, dict]): Hash and chunk IDs of each page, by location.
+            document_path (str, optional): Path stored with the chunks. Defaults to `key`.
+        """
+        with self._lock:
+            previous = self.documents.get(key)
+            if previous is not None:
+                self._hashes[previous["hash"]] -= 1
+            self._hashes[document_hash] += 1
+            self.documents[key] = {
+                "hash": document_hash,
+                "document_path": document_path or key,
+                "pages": pages,
+            }
+            if self.autosave:
+                self._save()
+
+    def clear(self) -> None:
+        """Forget every document and save the manifest."""
+        with self._lock:
+            self.documents = {}
+            self._hashes = Counter()
+            self._save()
+
+    def save(self) -> None:
+        """Save the manifest, e.g. after changes made without `autosave`."""
+        with self._lock:
+            self._save()
+
+    def _save(self) -> None:
+        """Write the manifest atomically, so an interruption never corrupts it."""
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump({"documents": self.documents}, file)
+        os.replace(temporary_path, self.path)
@@ -0,0 +1,314 @@
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from src.helpers import file_hash
+from src.helpers.metrics import METRICS
+from src.processing.readers import Reader
+from src.processing.manifest import IngestionManifest, text_hash
+from src.processing.chunking import Chunk, Chunker
+from src.embeddings.types import EmbeddingModel
+from src.database.types import CollectionItem, VectorDatabase
+
+
+# Progress callback: (stage, items processed, total items or None if unknown)
+ProgressCallback = Callable[[str, int, int | None], None]
+
+STAGES = ("read", "chunk", "embed", "insert")
+
+_DONE = object()  # Sentinel that closes a queue
+
+
+class IngestionPipeline:
+    """
+    Streaming read -> chunk -> embed -> insert pipeline.
+
+    Each stage runs concurrently and is connected to the next one by a bounded
+    queue, so pages are chunked while the document is still being parsed and
+    chunks are embedded while the next pages are read. Memory stays flat no
+    matter the size of the document.
+
+    When a manifest is given, files that were already ingested are skipped and,
+    for new versions of a document, only the pages whose text changed are
+    chunked, embedded and inserted. The chunks of the old pages are removed.
+    Runs for the same document are serialized, so two versions ingested at the
+    same time do not race on its manifest entry and on its stale pages.
+    """
+
+    def __init__(
+        self,
+        reader: Reader,
+        chunker: Chunker,
+        embedder: EmbeddingModel,
+        database: VectorDatabase,
+        batch_size: int = 128,
+        queue_size: int = 4,
+        manifest: IngestionManifest = None,
+    ) -> None:
+        """Initialize the IngestionPipeline class.
+
+        Args:
+            reader (Reader): Reader used to extract the pages.
+            chunker (Chunker): Chunker used to split the pages.
+            embedder (EmbeddingModel): Model used to embed the chunks.
+            database (VectorDatabase): Database where the chunks are inserted.
+            batch_size (int, optional): Number of chunks embedded and inserted together. Defaults to 128.
+            queue_size (int, optional): Maximum number of items waiting between two stages. Defaults to 4.
+            manifest (IngestionManifest, optional): Record of the ingested documents. Defaults to None.
+        """
+        self.reader: Reader = reader
+        self.chunker: Chunker = chunker
+        self.embedder: EmbeddingModel = embedder
+        self.database: VectorDatabase = database
+        self.batch_size: int = batch_size
+        self.queue_size: int = queue_size
+        self.manifest: IngestionManifest = manifest
+        # Lock of each document being ingested, with the number of runs using it
+        self._document_locks: dict[str, list] = {}
+        self._locks_lock = threading.Lock()
+
+    def run(
+        self,
+        path: str,
+        document_path: str = None,
+        document_key: str = None,
+        total_pages: int = None,
+        on_progress: ProgressCallback = None,
+    ) -> int:
+        """
+        Ingest a document into the database.
+
+        Args:
+            path (str): Path to the file to read.
+            document_path (str, optional): Path stored with the chunks. Defaults to `path`.
+            document_key (str, optional): Key of the document in the manifest. A file ingested under the
+                key of a recorded document replaces it as its new version. Defaults to `document_path`.
+            total_pages (int, optional): Number of pages, reported to the progress callback. Defaults to None.
+            on_progress (ProgressCallback, optional): Called with (stage, processed, total) when a stage
+                makes progress. It is always called from the thread running the pipeline. Defaults to None.
+
+        Returns:
+            int: Number of chunks inserted, 0 if the file was already ingested.
+        """
+        document_path = document_path or path
+        document_key = document_key or document_path
+        with self._document_lock(document_key):
+            return _PipelineRun(self, path, document_path, document_key).run(
+                total_pages=total_pages, on_progress=on_progress
+            )
+
+    @contextmanager
+    def _document_lock(self, document_key: str) -> Iterator[None]:
+        """Hold the lock of a document, dropping it once no run uses it."""
+        with self._locks_lock:
+            entry = self._document_locks.setdefault(
+                document_key, [threading.Lock(), 0]
+            )
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._locks_lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._document_locks[document_key]
+
+
+class _PipelineRun:
+    """State of a single IngestionPipeline.run call."""
+
+    def __init__(
+        self,
+        pipeline: IngestionPipeline,
+        path: str,
+        document_path: str,
+        document_key: str,
+    ) -> None:
+        self.pipeline = pipeline
+        self.path = path
+        self.document_path = document_path
+        self.document_key = document_key
+        self.document_hash = file_hash(path)
+
+        # Pages recorded in the manifest for a previous version of the document,
+        # and pages of this version with the IDs of their chunks (by location)
+        manifest = pipeline.manifest
+        self.previous_pages = manifest.get_pages(document_key) if manifest else {}
+        self.current_pages: dict[str, dict] = {}
+
+        self.pages = queue.Queue(maxsize=pipeline.queue_size)
+        self.batches = queue.Queue(maxsize=pipeline.queue_size)
+        self.embedded = queue.Queue(maxsize=pipeline.queue_size)
+
+        self.counts = {stage: 0 for stage in STAGES}
+        self.stop = threading.Event()
+        self.errors: list[Exception] = []
+
+    def run(self, total_pages: int, on_progress: ProgressCallback) -> int:
+        """Start the worker stages and run the insert stage in this thread."""
+        manifest = self.pipeline.manifest
+        if manifest is not None and manifest.contains(self.document_hash):
+            return 0  # The same file was already ingested
+
+        workers = [
+            threading.Thread(target=self._stage, args=(self._read,), daemon=True),
+            threading.Thread(target=self._stage, args=(self._chunk,), daemon=True),
+            threading.Thread(target=self._stage, args=(self._embed,), daemon=True),
+        ]
+        for worker in workers:
+            worker.start()
+
+        totals = {"read": total_pages}
+        reported = dict(self.counts)
+        try:
+            while True:
+                try:
+                    item = self.embedded.get(timeout=0.1)
+                except queue.Empty:
+                    if self.stop.is_set():  # A worker stage failed
+                        break
+                    item = None
+                if item is _DONE:
+                    break
+                if item is not None:
+                    self._insert(*item)
+
+                if on_progress is not None:
+                    for stage in STAGES:
+                        if self.counts[stage] != reported[stage]:
+                            reported[stage] = self.counts[stage]
+                            on_progress(stage, reported[stage], totals.get(stage))
+        except BaseException:
+            self.stop.set()
+            raise
+        finally:
+            for worker in workers:
+                worker.join()
+
+        if self.errors:
+            raise self.errors[0]
+
+        if manifest is not None:
+            self._update_manifest()
+        return self.counts["insert"]
+
+    def _update_manifest(self) -> None:
+        """Remove the chunks of the pages that changed and record this version."""
+        current_ids = {
+            chunk_id for page in self.current_pages.values() for chunk_id in page["ids"]
+        }
+        stale_ids = [
+            chunk_id
+            for location, page in self.previous_pages.items()
+            if self.current_pages.get(location) is not page
+            for chunk_id in page["ids"]
+            if chunk_id not in current_ids  # Upserted again by this run
+        ]
+        if stale_ids:
+            self.pipeline.database.delete(stale_ids)
+        self.pipeline.manifest.update(
+            self.document_key,
+            self.document_hash,
+            self.current_pages,
+            document_path=self.document_path,
+        )
+
+    def _stage(self, target: Callable[[], None]) -> None:
+        """Run a worker stage, stopping the whole pipeline on errors."""
+        try:
+            target()
+        except Exception as e:
+            self.errors.append(e)
+            self.stop.set()
+
+    def _put(self, output: queue.Queue, item: object) -> None:
+        """Put an item in a bounded queue unless the pipeline was stopped."""
+        while not self.stop.is_set():
+            try:
+                output.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _iter(self, source: queue.Queue) -> Iterator:
+        """Iterate over the items of a queue until it is closed."""
+        while not self.stop.is_set():
+            try:
+                item = source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                return
+            yield item
+
+    def _read(self) -> None:
+        for extraction in self.pipeline.reader.iter_text(self.path):
+            if self.stop.is_set():
+                return
+            page_hash = text_hash(extraction.text)
+            previous_page = self.previous_pages.get(extraction.location)
+            if previous_page is not None and previous_page["hash"] == page_hash:
+                # Unchanged page, its chunks are already in the database
+                self.current_pages[extraction.location] = previous_page
+            else:
+                self.current_pages[extraction.location] = {"hash": page_hash, "ids": []}
+                self._put(self.pages, extraction)
+            self.counts["read"] += 1
+        self._put(self.pages, _DONE)
+
+    def _chunk(self) -> None:
+        batch = []
+        for extraction in self._iter(self.pages):
+            # Pages are chunked one at a time, so the span excludes the time
+            # waiting for the reader
+            with METRICS.span("chunker.page"):
+                chunks = self.pipeline.chunker.get_chunks([extraction])
+            METRICS.increment("chunker.chunks", len(chunks))
+            for chunk in chunks:
+                batch.append(chunk)
+                self.counts["chunk"] += 1
+                if len(batch) == self.pipeline.batch_size:
+                    self._put(self.batches, batch)
+                    batch = []
+        if batch:
+            self._put(self.batches, batch)
+        self._put(self.batches, _DONE)
+
+    def _embed(self) -> None:
+        for batch in self._iter(self.batches):
+            embeddings = self.pipeline.embedder.get_embeddings(
+                [chunk.text for chunk in batch]
+            )
+            self.counts["embed"] += len(batch)
+            self._put(self.embedded, (batch, embeddings))
+        self._put(self.embedded, _DONE)
+
+    def _chunk_id(self, chunk: Chunk, position: int) -> str:
+        """
+        Build the ID of a chunk from its page and its offset in the page, so it
+        does not depend on the pages re-processed in this run and never
+        collides with the chunks kept from unchanged pages.
+        """
+        offset = chunk.start if chunk.start is not None else position
+        return CollectionItem.make_id(self.document_hash, f"{chunk.location}:{offset}")
+
+    def _insert(self, batch: list[Chunk], embeddings: list) -> None:
+        documents = []
+        for chunk, embedding in zip(batch, embeddings):
+            ids = self.current_pages[chunk.location]["ids"]
+            documents.append(
+                CollectionItem(
+                    id=self._chunk_id(chunk, len(ids)),
+                    embedding=embedding,
+                    document_path=self.document_path,
+                    location=chunk.location,
+                    text=chunk.text,
+                )
+            )
+            ids.append(documents[-1].id)
+        with METRICS.span("database.insert"):
+            self.pipeline.database.insert_many(documents)
+        METRICS.increment("database.documents", len(documents))
+        self.counts["insert"] += len(batch)
@@ -1,14 +1,44 @@
-from PIL import Image
+import signal
+import threading
+import multiprocessing
 from abc import abstractmethod
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator
 
 import fitz  # PyMuPDF
 
-from surya.ocr import run_ocr as surya_ocr
-from surya.model.detection import segformer as surya_ssegformer
-from surya.model.recognition.model import load_model as surya_recognition_load_model
-from surya.model.recognition.processor import (
-    load_processor as surya_recognition_load_processor,
-)
+from src.helpers.metrics import METRICS
+
+# The OCR stack (surya, torch and PIL) is heavy to import and load, so it is only
+# imported the first time a scanned page has to be read (see PDFReader._load_ocr)
+
+
+def _extract_pages(pdf_path: str, start: int, end: int) -> list[str]:
+    """
+    Extract the text layer of a range of pages. Runs in a worker process,
+    which opens its own copy of the document.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+        start (int): Index of the first page.
+        end (int): Index after the last page.
+
+    Returns:
+        list[str]: Text of each page in the range.
+    """
+    with fitz.open(pdf_path) as doc:
+        return [doc[page_index].get_text() for page_index in range(start, end)]
+
+
+def _ignore_interrupt() -> None:
+    """
+    Leave Ctrl-C to the parent process. A worker interrupted while it holds
+    the lock of the task queue would block the pool and the parent with it.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
 
 
 # Define a base class for extractions
@@ -35,6 +65,16 @@ class Reader:
             list[Extraction]: List of extractions per page.
         """
 
+    def iter_text(self, *args, **kwargs) -> Iterator[Extraction]:
+        """
+        Get the text from the file lazily. Readers that can extract the text
+        incrementally should override this method, by default it wraps get_text.
+
+        Returns:
+            Iterator[Extraction]: Extractions per page, in order.
+        """
+        yield from self.get_text(*args, **kwargs)
+
 
 ###################################################################################
 ##################################### PDFs ########################################
@@ -43,24 +83,60 @@ class PDFReader(Reader):
     """Class for reading PDFs."""
 
     def __init__(
-        self, enable_ocr: bool = False, min_text_condifence: float = 0.35
+        self,
+        enable_ocr: bool = False,
+        min_text_condifence: float = 0.35,
+        num_workers: int = 1,
+        pages_per_task: int = 16,
+        ocr_batch_size: int = 8,
+        ocr_dpi: int = 72,
     ) -> None:
         """Initialize the PDFReader class.
 
         Args:
             enable_ocr (bool, optional): Whether use OCR or not. Defaults to False.
             min_text_condifence (float, optional): Minimum confidence for the text. Defaults to 0.35.
+            num_workers (int, optional): Number of processes extracting text layers. Defaults to 1, no pool.
+            pages_per_task (int, optional): Number of pages extracted by a worker at a time. Defaults to 16.
+            ocr_batch_size (int, optional): Number of page images sent to OCR at a time. Defaults to 8.
+            ocr_dpi (int, optional): Resolution of the page images sent to OCR. Defaults to 72.
         """
         super().__init__()
-        if enable_ocr:  # Configure and load OCR models
-            self.langs = ["en"]  # Replace with your languages
-            self.det_processor = surya_ssegformer.load_processor()
-            self.det_model = surya_ssegformer.load_model()
-            self.rec_model = surya_recognition_load_model()
-            self.rec_processor = surya_recognition_load_processor()
+        self.langs = ["en"]  # Replace with your languages
+        self._ocr = None  # OCR models, loaded on the first scanned page
+        self._ocr_lock = threading.Lock()
+        self._pool: ProcessPoolExecutor = None  # Created on the first large PDF
+        self._pool_lock = threading.Lock()
 
         self.enable_ocr = enable_ocr
         self.min_text_condifence = min_text_condifence
+        self.num_workers = num_workers
+        self.pages_per_task = pages_per_task
+        self.ocr_batch_size = ocr_batch_size
+        self.ocr_dpi = ocr_dpi
+
+    def close(self) -> None:
+        """Stop the worker processes extracting the text layers, if any."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """
+        Get the pool of worker processes, shared by every document. The workers
+        are spawned rather than forked: the reader runs in multi-threaded
+        processes (web app, ingestion workers), and a forked child can inherit
+        a lock held by another thread and deadlock.
+        """
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.num_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_ignore_interrupt,
+                )
+            return self._pool
 
     def is_digital(self, pdf_path: str) -> bool:
         """
@@ -74,16 +150,24 @@ class PDFReader(Reader):
         """
         # Check if the PDF contains selectable text
         try:
-            doc = fitz.open(pdf_path)
-            for page in doc:
-                text = page.get_text()
-                if text.strip():
-                    return True
-            return False
+            return any(text.strip() for text in self._iter_page_texts(pdf_path))
         except Exception as e:
             print("Error:", e)
             return False
 
+    def num_pages(self, pdf_path: str) -> int:
+        """
+        Get the number of pages of a PDF without extracting its text.
+
+        Args:
+            pdf_path (str): Path to the PDF file.
+
+        Returns:
+            int: Number of pages.
+        """
+        with fitz.open(pdf_path) as doc:
+            return doc.page_count
+
     def get_text(self, pdf_path: str) -> list[Extraction]:
         """
         Implementation of get_text method for PDFReader.
@@ -94,10 +178,67 @@ class PDFReader(Reader):
         Returns:
             list[Extraction]: List of extractions.
         """
-        if self.enable_ocr and not self.is_digital(pdf_path):
-            return self.get_scanned_text(pdf_path)
-        else:
-            return self.get_digitized_text(pdf_path)
+        return list(self.iter_text(pdf_path))
+
+    def iter_text(self, pdf_path: str) -> Iterator[Extraction]:
+        """
+        Implementation of iter_text method for PDFReader.
+
+        Args:
+            pdf_path (str): Path to the PDF file.
+
+        Returns:
+            Iterator[Extraction]: Extractions per page, in order.
+        """
+        # Pages are routed one by one: pages with a text layer are used as they
+        # are and image-only pages are sent to OCR in batches. Pages are held
+        # back only while there are scanned pages waiting for their batch.
+        if not self.enable_ocr:
+            yield from self.iter_digitized_text(pdf_path)
+            return
+
+        with fitz.open(pdf_path) as doc:
+            buffer: list[tuple[int, Extraction]] = []  # Pages waiting for the OCR
+            scanned: list[int] = []  # Positions of the scanned pages in the buffer
+            for page_index, text in enumerate(self._iter_page_texts(pdf_path)):
+                extraction = Extraction(text=text, location=f"Page {page_index + 1}")
+                if text.strip() and not scanned:
+                    yield extraction
+                    continue
+
+                buffer.append((page_index, extraction))
+                if not text.strip():
+                    scanned.append(len(buffer) - 1)
+                if (
+                    len(scanned) >= self.ocr_batch_size
+                    or len(buffer) >= 4 * self.ocr_batch_size
+                ):
+                    yield from self._flush_ocr(doc, buffer, scanned)
+                    buffer, scanned = [], []
+
+            yield from self._flush_ocr(doc, buffer, scanned)
+
+    def _flush_ocr(
+        self,
+        doc: fitz.Document,
+        buffer: list[tuple[int, Extraction]],
+        scanned: list[int],
+    ) -> list[Extraction]:
+        """
+        Fill the scanned pages of the buffer with their OCR text.
+
+        Args:
+            doc (fitz.Document): Opened PDF document.
+            buffer (list[tuple[int, Extraction]]): Page indexes and pages waiting to be emitted, in order.
+            scanned (list[int]): Positions of the scanned pages in the buffer.
+
+        Returns:
+            list[Extraction]: The buffered pages, in order.
+        """
+        texts = self._ocr_pages(doc, [buffer[position][0] for position in scanned])
+        for position, text in zip(scanned, texts):
+            buffer[position][1].text = text
+        return [extraction for _, extraction in buffer]
 
     def get_scanned_text(self, pdf_path: str) -> list[Extraction]:
         """
@@ -109,47 +250,108 @@ class PDFReader(Reader):
         Returns:
             list[Extraction]: List of extractions.
         """
-        doc = fitz.open(pdf_path)
+        return list(self.iter_scanned_text(pdf_path))
+
+    def iter_scanned_text(self, pdf_path: str) -> Iterator[Extraction]:
+        """
+        Apply OCR to the PDF file, `ocr_batch_size` pages at a time.
 
-        texts = []
-        for page_index, page in enumerate(doc):
-            pix = page.get_pixmap()
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        Args:
+            pdf_path (str): Path to the PDF file.
 
+        Returns:
+            Iterator[Extraction]: Extractions per page, in order.
+        """
+        with fitz.open(pdf_path) as doc:
+            for start in range(0, doc.page_count, self.ocr_batch_size):
+                page_indexes = range(
+                    start, min(start + self.ocr_batch_size, doc.page_count)
+                )
+                texts = self._ocr_pages(doc, page_indexes)
+                for page_index, text in zip(page_indexes, texts):
+                    yield Extraction(
+                        text=text,
+                        location=f"Page {page_index + 1}",
+                    )
+
+    def _load_ocr(self) -> tuple:
+        """
+        Import and load the OCR models the first time they are needed.
+
+        Returns:
+            tuple: OCR function, detection model and processor, recognition model and processor.
+        """
+        with self._ocr_lock:
+            if self._ocr is None:
+                from surya.ocr import run_ocr as surya_ocr
+                from surya.model.detection import segformer as surya_ssegformer
+                from surya.model.recognition.model import (
+                    load_model as surya_recognition_load_model,
+                )
+                from surya.model.recognition.processor import (
+                    load_processor as surya_recognition_load_processor,
+                )
+
+                self._ocr = (
+                    surya_ocr,
+                    surya_ssegformer.load_model(),
+                    surya_ssegformer.load_processor(),
+                    surya_recognition_load_model(),
+                    surya_recognition_load_processor(),
+                )
+            return self._ocr
+
+    def _ocr_pages(self, doc: fitz.Document, page_indexes: list[int]) -> list[str]:
+        """
+        Render a batch of pages at `ocr_dpi` and apply OCR to all of them at once.
+
+        Args:
+            doc (fitz.Document): Opened PDF document.
+            page_indexes (list[int]): Indexes of the pages to read.
+
+        Returns:
+            list[str]: Text of each page.
+        """
+        if not page_indexes:
+            return []
+
+        from PIL import Image
+
+        surya_ocr, det_model, det_processor, rec_model, rec_processor = self._load_ocr()
+        images = []
+        for page_index in page_indexes:
+            pix = doc[page_index].get_pixmap(dpi=self.ocr_dpi)
+            images.append(Image.frombytes("RGB", [pix.width, pix.height], pix.samples))
+
+        with METRICS.span("reader.ocr"):
             predictions = surya_ocr(
-                [img],
-                [self.langs],
-                self.det_model,
-                self.det_processor,
-                self.rec_model,
-                self.rec_processor,
+                images,
+                [self.langs] * len(images),
+                det_model,
+                det_processor,
+                rec_model,
+                rec_processor,
             )
+        METRICS.increment("reader.ocr_pages", len(images))
 
-            """
-            The predictions is a list of OCRResult(s), an object
-            that contains TextLine(s) with the following attributes:
-            - polygon: list of coordinates of the bounding box
-            - confidence: confidence score of the prediction
-            - text: the predicted text
-            - bbox: bounding box of the text line
-            """
-            image_predicition = predictions[0]  # We only used one image
-            text = "\n".join(
+        """
+        The predictions is a list of OCRResult(s), an object
+        that contains TextLine(s) with the following attributes:
+        - polygon: list of coordinates of the bounding box
+        - confidence: confidence score of the prediction
+        - text: the predicted text
+        - bbox: bounding box of the text line
+        """
+        return [
+            "\n".join(
                 [
                     line.text
                     for line in image_predicition.text_lines
                     if line.confidence > self.min_text_condifence
                 ]
             )
-
-            texts.append(
-                Extraction(
-                    text=text,
-                    location=f"Page {page_index + 1}",
-                )
-            )
-
-        return texts
+            for image_predicition in predictions
+        ]
 
     def get_digitized_text(self, pdf_path: str) -> list[Extraction]:
         """
@@ -161,15 +363,78 @@ class PDFReader(Reader):
         Returns:
             list[Extraction]: List of extractions.
         """
+        return list(self.iter_digitized_text(pdf_path))
+
+    def iter_digitized_text(self, pdf_path: str) -> Iterator[Extraction]:
+        """
+        Get digitized text from the PDF file, one page at a time.
+
+        Args:
+            pdf_path (str): Path to the PDF file.
+
+        Returns:
+            Iterator[Extraction]: Extractions per page, in order.
+        """
         # Extract text from digital PDF
-        texts = []
-        doc = fitz.open(pdf_path)
-        for page_index, page in enumerate(doc):
-            texts.append(
-                Extraction(
-                    text=page.get_text(),
-                    location=f"Page {page_index + 1}",
-                )
+        for page_index, text in enumerate(self._iter_page_texts(pdf_path)):
+            yield Extraction(
+                text=text,
+                location=f"Page {page_index + 1}",
             )
 
-        return texts
+    def _iter_page_texts(self, pdf_path: str) -> Iterator[str]:
+        """
+        Extract the text layer of every page, in page order. When `num_workers`
+        is greater than one, the page ranges of documents with more than one
+        range are split across the process pool and a bounded number of ranges
+        is kept in flight. Smaller documents are extracted in this process.
+
+        Args:
+            pdf_path (str): Path to the PDF file.
+
+        Returns:
+            Iterator[str]: Text of each page.
+        """
+        with fitz.open(pdf_path) as doc:
+            page_count = doc.page_count
+            if self.num_workers <= 1 or page_count <= self.pages_per_task:
+                for page in doc:
+                    with METRICS.span("reader.extract"):
+                        text = page.get_text()
+                    METRICS.increment("reader.pages")
+                    yield text
+                return
+
+        page_ranges = iter(
+            [
+                (start, min(start + self.pages_per_task, page_count))
+                for start in range(0, page_count, self.pages_per_task)
+            ]
+        )
+        executor = self._get_pool()
+        in_flight = deque()
+        try:
+            in_flight.extend(
+                executor.submit(_extract_pages, pdf_path, start, end)
+                for start, end in islice(page_ranges, 2 * self.num_workers)
+            )
+            while in_flight:
+                # Time waited for the workers, as their own timings stay in them
+                with METRICS.span("reader.extract"):
+                    texts = in_flight.popleft().result()
+                METRICS.increment("reader.pages", len(texts))
+                for start, end in islice(page_ranges, 1):
+                    in_flight.append(
+                        executor.submit(_extract_pages, pdf_path, start, end)
+                    )
+                yield from texts
+        except BrokenProcessPool:
+            # A worker died (e.g. killed), the next document gets a new pool
+            with self._pool_lock:
+                if self._pool is executor:
+                    self._pool = None
+            raise
+        finally:
+            # Ranges of a document abandoned midway are not extracted
+            for future in in_flight:
+                future.cancel()
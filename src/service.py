@@ -0,0 +1,300 @@
+"""
+HTTP service answering questions over the vector store, without the web app.
+
+Every request runs on the event loop: embeddings and answers use the asyncio
+clients of the models and the database search runs in a thread, so slow
+requests never block the others. The number of requests processed at the
+same time is limited, and requests beyond the limit wait in a bounded queue.
+When the queue is full, the service answers 429 right away instead of
+letting the latency grow without limit.
+"""
+
+import json
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Literal
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.types import Receive, Scope, Send
+
+from src.helpers.http import AsyncHTTPClient
+from src.helpers.metrics import METRICS
+from src.database.types import CollectionItem, VectorDatabase
+from src.embeddings.types import Embedding, EmbeddingModel
+from src.llm.cache import SemanticAnswerCache
+from src.llm.types import LLMModel
+
+
+class ServiceOverloaded(Exception):
+    """Raised when every slot is taken and the waiting queue is full."""
+
+
+class AdmissionLimiter:
+    """
+    Limits the requests processed at the same time and the requests waiting
+    for a slot, in a single event loop.
+    """
+
+    def __init__(self, max_concurrency: int = 8, max_queue: int = 32) -> None:
+        """Initialize the AdmissionLimiter class.
+
+        Args:
+            max_concurrency (int, optional): Maximum number of requests processed at the same time. Defaults to 8.
+            max_queue (int, optional): Maximum number of requests waiting for a slot. Defaults to 32.
+        """
+        self.max_concurrency: int = max_concurrency
+        self.max_queue: int = max_queue
+        self.running: int = 0
+        self.waiting: int = 0
+        self.rejected: int = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def acquire(self) -> None:
+        """
+        Wait for a slot, to be given back with `release`.
+
+        Raises:
+            ServiceOverloaded: If the waiting queue is full.
+        """
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise ServiceOverloaded(
+                f"{self.running} requests running and {self.waiting} waiting"
+            )
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+
+    def release(self) -> None:
+        """Give back a slot taken with `acquire`."""
+        self.running -= 1
+        self._semaphore.release()
+
+    @property
+    def stats(self) -> dict:
+        """Get the number of requests running, waiting and rejected."""
+        return {
+            "running": self.running,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+        }
+
+
+class _SlotStreamingResponse(StreamingResponse):
+    """
+    Streaming response that gives back the admission slot of its request once
+    it is sent or abandoned, even if the client left before the stream started.
+    """
+
+    def __init__(
+        self, content: AsyncIterator[str], release: Callable[[], None], **kwargs
+    ) -> None:
+        super().__init__(content, **kwargs)
+        self.release: Callable[[], None] = release
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release()
+
+
+class RetrieveRequest(BaseModel):
+    query: str = Field(min_length=1)
+    top_k: int | None = Field(default=None, ge=1, le=100)
+    document_path: str | None = None  # Search only the chunks of this document
+
+
+class Message(BaseModel):
+    role: Literal["user", "assistant"]
+    content: str
+
+
+class AskRequest(RetrieveRequest):
+    history: list[Message] = []  # Previous messages of the conversation
+    stream: bool = True
+
+
+def _item_to_dict(item: CollectionItem) -> dict:
+    return {
+        "id": item.id,
+        "text": item.text,
+        "document_path": item.document_path,
+        "location": item.location,
+        "distance": item.distance,
+    }
+
+
+def create_app(
+    embedder: EmbeddingModel,
+    database: VectorDatabase,
+    llm: LLMModel,
+    answer_cache: SemanticAnswerCache = None,
+    top_k: int = 3,
+    max_concurrency: int = 8,
+    max_queue: int = 32,
+) -> FastAPI:
+    """Create the HTTP service over the given components.
+
+    Args:
+        embedder (EmbeddingModel): Model used to embed the queries.
+        database (VectorDatabase): Database searched for the context.
+        llm (LLMModel): Model answering the questions.
+        answer_cache (SemanticAnswerCache, optional): Cache of the answers to similar questions. Defaults to None.
+        top_k (int, optional): Default number of chunks of context. Defaults to 3.
+        max_concurrency (int, optional): Maximum number of requests processed at the same time. Defaults to 8.
+        max_queue (int, optional): Maximum number of requests waiting for a slot. Defaults to 32.
+
+    Returns:
+        FastAPI: The application, to be served with an ASGI server such as uvicorn.
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        yield
+        # The clients of the event loop of the service are not used anymore
+        await AsyncHTTPClient.aclose_shared()
+
+    app = FastAPI(title="Ask Me Anything with RAG", lifespan=lifespan)
+    limiter = AdmissionLimiter(max_concurrency=max_concurrency, max_queue=max_queue)
+    app.state.limiter = limiter
+
+    async def acquire() -> None:
+        try:
+            await limiter.acquire()
+        except ServiceOverloaded as e:
+            raise HTTPException(
+                status_code=429, detail=str(e), headers={"Retry-After": "1"}
+            ) from e
+
+    async def embed(query: str) -> Embedding:
+        try:
+            return await embedder.aget_embedding(query)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=str(e)) from e
+
+    async def search(
+        request: RetrieveRequest, query_embedding: Embedding
+    ) -> list[CollectionItem]:
+        where = (
+            None
+            if request.document_path is None
+            else {"document_path": request.document_path}
+        )
+        # The search is CPU or disk bound, it runs outside the event loop
+        with METRICS.span("database.search"):
+            return await asyncio.to_thread(
+                database.search,
+                query_embedding,
+                top_k=request.top_k or top_k,
+                where=where,
+                include_distances=True,
+                query_text=request.query,
+            )
+
+    @app.get("/health")
+    async def health() -> dict:
+        return {"status": "ok", **limiter.stats}
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics() -> str:
+        return METRICS.to_prometheus()
+
+    @app.post("/retrieve")
+    async def retrieve_endpoint(request: RetrieveRequest) -> dict:
+        await acquire()
+        try:
+            items = await search(request, await embed(request.query))
+        finally:
+            limiter.release()
+        return {"items": [_item_to_dict(item) for item in items]}
+
+    @app.post("/ask")
+    async def ask_endpoint(request: AskRequest):
+        await acquire()
+        try:
+            query_embedding = await embed(request.query)
+            # Near-identical questions over the same collection reuse the cached
+            # answer. Answers scoped to a single document or following a history,
+            # which is part of the prompt, are not cached.
+            cacheable = (
+                answer_cache is not None
+                and request.document_path is None
+                and not request.history
+            )
+            version = database.version
+            cached = None
+            if cacheable:
+                cached = answer_cache.lookup(query_embedding, version)
+            if cached is not None:
+                items = cached.query_context
+            else:
+                items = await search(request, query_embedding)
+        except BaseException:
+            limiter.release()
+            raise
+
+        messages = [
+            *(message.model_dump() for message in request.history),
+            {"role": "user", "content": request.query},
+        ]
+        context = [_item_to_dict(item) for item in items]
+
+        if not request.stream:
+            try:
+                if cached is not None:
+                    answer = cached.answer
+                else:
+                    answer = await llm.aask(messages, query_context=items)
+                    if cacheable:
+                        answer_cache.store(query_embedding, version, answer, items)
+            except Exception as e:
+                raise HTTPException(status_code=502, detail=str(e)) from e
+            finally:
+                limiter.release()
+            return {"answer": answer, "cached": cached is not None, "context": context}
+
+        released = False
+
+        def release() -> None:
+            # Called when the answer is complete and when the response is closed
+            nonlocal released
+            if not released:
+                released = True
+                limiter.release()
+
+        async def stream() -> AsyncIterator[str]:
+            # The slot is held until the answer is complete or the client leaves
+            try:
+                yield json.dumps({"context": context}) + "\n"
+                if cached is not None:
+                    yield json.dumps({"token": cached.answer}) + "\n"
+                    stats = {}
+                else:
+                    tokens = llm.aask_stream(messages, query_context=items)
+                    async for token in tokens:
+                        yield json.dumps({"token": token}) + "\n"
+                    stats = tokens.stats
+                    if cacheable:
+                        answer = tokens.text
+                        answer_cache.store(query_embedding, version, answer, items)
+                done = {"done": True, "cached": cached is not None, "stats": stats}
+                yield json.dumps(done) + "\n"
+            except Exception as e:
+                # The status is already sent, the error ends the stream instead
+                yield json.dumps({"done": True, "error": str(e)}) + "\n"
+            finally:
+                release()
+
+        return _SlotStreamingResponse(
+            stream(), release, media_type="application/x-ndjson"
+        )
+
+    return app
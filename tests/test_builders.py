@@ -0,0 +1,22 @@
+import yaml
+
+from src.helpers.config import Config
+from src.builders import build_manifest
+
+
+def load_config(tmp_path, database: str) -> Config:
+    with open("configs/settings-ollama.yaml", "r") as file:
+        settings = yaml.safe_load(file)
+    settings["vectorstore"].update(path=str(tmp_path), database=database)
+    path = tmp_path / f"settings-{database}.yaml"
+    path.write_text(yaml.safe_dump(settings))
+    return Config(str(path))
+
+
+def test_each_backend_has_its_own_manifest(tmp_path):
+    chroma_manifest = build_manifest(load_config(tmp_path, "chromadb"))
+    chroma_manifest.update("report.pdf", "hash", {})
+
+    numpy_manifest = build_manifest(load_config(tmp_path, "numpy"))
+    assert numpy_manifest.path != chroma_manifest.path
+    assert not numpy_manifest.contains("hash")
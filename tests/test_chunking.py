@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from src.processing.chunking import SymbolChunker
+from src.processing.readers import Extraction
+
+
+def random_text(seed: int, length: int) -> str:
+    generator = random.Random(seed)
+    return "".join(generator.choice("abcdef \n") for _ in range(length))
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("chars_limit, overlap", [(64, 0), (64, 16), (100, 99)])
+def test_chunks_are_bounded_overlapping_and_cut_after_the_last_break(
+    seed, chars_limit, overlap
+):
+    chunker = SymbolChunker(chars_limit=chars_limit, overlap=overlap)
+    text = random_text(seed, 1000)
+    chunks = list(chunker.iter_chunks([Extraction(text, "page 1")]))
+
+    assert chunks[0].start == 0 and chunks[-1].end == len(text)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.start == previous.end - overlap
+
+    for chunk in chunks:
+        assert chunk.text == text[chunk.start : chunk.end]
+        assert chunk.location == "page 1"
+        assert len(chunk.text) <= chars_limit
+        if chunk.end == len(text):
+            continue
+        # No break left between the cut and the end of the window, and the
+        # cut is right after a break unless the window has none to cut at
+        window = text[chunk.start : chunk.start + chars_limit]
+        breaks = window.rfind("\n", overlap + 1)
+        if breaks == -1:
+            assert chunk.end == chunk.start + chars_limit
+        else:
+            assert chunk.end == chunk.start + breaks + 1
+
+
+def test_the_cut_lands_after_the_last_break():
+    chunker = SymbolChunker(chars_limit=10, overlap=2)
+    text = "abc\nde\nfghijklmn"
+    chunks = list(chunker.iter_chunks([Extraction(text, "page 1")]))
+
+    assert [(chunk.start, chunk.end) for chunk in chunks] == [(0, 7), (5, 15), (13, 16)]
+    assert chunks[0].text == "abc\nde\n"
+
+
+def test_a_window_without_breaks_is_cut_at_the_limit():
+    chunker = SymbolChunker(chars_limit=10, overlap=3)
+    text = "a" * 25
+    chunks = list(chunker.iter_chunks([Extraction(text, "page 1")]))
+
+    assert [(chunk.start, chunk.end) for chunk in chunks] == [
+        (0, 10),
+        (7, 17),
+        (14, 24),
+        (21, 25),
+    ]
+
+
+def test_a_break_inside_the_overlap_is_not_used_as_cut():
+    # Cutting after the break at offset 1 would make the next chunk start
+    # before this one, so the window is cut at the limit instead
+    chunker = SymbolChunker(chars_limit=8, overlap=4)
+    text = "a\n" + "b" * 20
+    chunks = list(chunker.iter_chunks([Extraction(text, "page 1")]))
+
+    assert chunks[0].end == 8
+    assert all(
+        chunk.start > previous.start for previous, chunk in zip(chunks, chunks[1:])
+    )
@@ -0,0 +1,52 @@
+import asyncio
+import threading
+
+from src.embeddings.cache import CachedEmbedding
+from src.embeddings.types import EmbeddingModel, Embedding
+
+
+class LengthEmbedding(EmbeddingModel):
+    def __init__(self) -> None:
+        super().__init__(model="length", base_url="")
+        self.calls = 0
+
+    def get_embedding(self, text: str) -> Embedding:
+        self.calls += 1
+        return [float(len(text)), 1.0]
+
+
+def test_async_lookups_run_outside_the_event_loop(tmp_path):
+    embedder = LengthEmbedding()
+    cache = CachedEmbedding(embedder, path=str(tmp_path / "cache.sqlite"))
+    threads = []
+    lookup = cache._lookup
+
+    def recording_lookup(keys: list[str]) -> dict[str, Embedding]:
+        threads.append(threading.current_thread())
+        return lookup(keys)
+
+    cache._lookup = recording_lookup
+
+    async def main() -> list[Embedding]:
+        first = await cache.aget_embeddings(["a", "bb"])
+        return first + await cache.aget_embeddings(["bb", "ccc"])
+
+    assert asyncio.run(main()) == [[1.0, 1.0], [2.0, 1.0], [2.0, 1.0], [3.0, 1.0]]
+    assert embedder.calls == 3
+    assert threads and threading.main_thread() not in threads
+
+
+def test_the_disk_bound_is_kept_without_counting_the_rows(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = CachedEmbedding(LengthEmbedding(), path=path, max_disk_items=3)
+    statements = []
+    cache.connection.set_trace_callback(statements.append)
+    cache.get_embeddings(["a", "bb"])
+    cache.get_embeddings(["bb", "ccc", "dddd", "eeeee"])
+    assert cache.disk_items == 3 and cache.disk_evictions == 2
+    assert not any("COUNT" in statement for statement in statements)
+
+    reopened = CachedEmbedding(LengthEmbedding(), path=path, max_disk_items=3)
+    assert reopened.disk_items == 3
+    reopened.get_embeddings(["ccc", "dddd", "eeeee"])
+    assert reopened.disk_hits == 3
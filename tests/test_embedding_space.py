@@ -0,0 +1,39 @@
+import pytest
+
+from src.database.types import CollectionItem
+from src.database.numpydb import NumpyDB
+from src.database.chromadb import ChromaDB
+
+
+def item(id: str, embedding: list[float]) -> CollectionItem:
+    return CollectionItem(
+        id=id, text=id, embedding=embedding, document_path="doc", location=id
+    )
+
+
+def test_the_space_is_recorded_and_checked(tmp_path):
+    database = NumpyDB(path=str(tmp_path))
+    database.check_embedding_space("ollama:nomic:/api/embed")
+    database.insert_many([item("a", [3.0, 4.0])])
+
+    reopened = NumpyDB(path=str(tmp_path))
+    reopened.check_embedding_space("ollama:nomic:/api/embed")
+    with pytest.raises(ValueError, match="Clear the database"):
+        reopened.check_embedding_space("ollama:mxbai:/api/embed")
+
+    reopened.remove()
+    reopened.check_embedding_space("ollama:mxbai:/api/embed")
+
+
+def test_collections_of_unnormalized_vectors_are_refused(tmp_path):
+    # Collections filled by /api/embeddings, before the space was recorded
+    database = ChromaDB(path=str(tmp_path))
+    database.insert_many([item("a", [3.0, 4.0]), item("b", [0.0, 2.0])])
+    with pytest.raises(ValueError, match="unnormalized"):
+        database.check_embedding_space("ollama:nomic:/api/embed")
+
+    normalized = ChromaDB(path=str(tmp_path), name="normalized")
+    normalized.insert_many([item("a", [0.6, 0.8])])
+    normalized.check_embedding_space("ollama:nomic:/api/embed")
+    reopened = ChromaDB(path=str(tmp_path), name="normalized")
+    assert reopened.collection.metadata["embedding_space"] == "ollama:nomic:/api/embed"
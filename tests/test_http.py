@@ -0,0 +1,64 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import AsyncIterator
+
+import httpx
+import pytest
+
+from src.helpers import web_healthcheck
+from src.helpers.http import AsyncHTTPClient
+
+
+class OverloadedHandler(BaseHTTPRequestHandler):
+    """Answers every request with 503, which the shared client retries."""
+
+    requests = 0
+
+    def do_HEAD(self) -> None:
+        type(self).requests += 1
+        self.send_response(503)
+        self.end_headers()
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def test_the_healthcheck_is_not_retried():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OverloadedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        assert not web_healthcheck(url, timeout=1.0)
+        assert OverloadedHandler.requests == 1
+    finally:
+        server.shutdown()
+
+
+class InterruptedStream(httpx.AsyncByteStream):
+    """Body of a response whose connection times out after the first line."""
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        yield b'{"message": {"content": "Hello"}}\n'
+        raise httpx.ReadTimeout("The server stopped answering")
+
+
+def test_a_stream_failing_after_the_headers_is_recorded_once():
+    async def main() -> tuple[list[dict], dict]:
+        client = AsyncHTTPClient("http://ollama")
+        client.client = httpx.AsyncClient(
+            base_url=client.base_url,
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, stream=InterruptedStream())
+            ),
+        )
+        chunks = []
+        with pytest.raises(httpx.ReadTimeout):
+            async for chunk in client.stream("/api/chat", json={}):
+                chunks.append(chunk)
+        await client.aclose()
+        return chunks, client.metrics
+
+    chunks, metrics = asyncio.run(main())
+    assert chunks == [{"message": {"content": "Hello"}}]
+    assert metrics["/api/chat"]["requests"] == 1
@@ -0,0 +1,82 @@
+from src.database.types import CollectionItem
+from src.database.numpydb import NumpyDB
+from src.database.lexical import LexicalIndex
+from src.database.hybrid import HybridDatabase
+
+
+def item(id: str, text: str, embedding: list[float]) -> CollectionItem:
+    return CollectionItem(
+        id=id, text=text, embedding=embedding, document_path="doc", location=id
+    )
+
+
+def test_queries_with_only_common_terms_use_the_vector_ranking(tmp_path):
+    vectors = NumpyDB(path=str(tmp_path))
+    database = HybridDatabase(vectors, LexicalIndex(str(tmp_path / "lexical.sqlite")))
+    database.insert_many(
+        [
+            item("closest", "how the engine is cooled", [1.0, 0.0]),
+            item("close", "what is the fuel of the engine", [1.0, 0.5]),
+            item("far", "what is the price of the car", [0.0, 1.0]),
+            item("farthest", "what is the color of the car", [-1.0, 0.0]),
+        ]
+    )
+    # Every term of the question is in most chunks, so none selects candidates
+    results = database.search([1.0, 0.1], top_k=2, query_text="what is the")
+    assert [result.id for result in results] == ["closest", "close"]
+
+
+class CountingNumpyDB(NumpyDB):
+    """NumpyDB counting its full vector searches."""
+
+    searches = 0
+
+    def search_many(self, *args, **kwargs):
+        self.searches += 1
+        return super().search_many(*args, **kwargs)
+
+
+def keyword_collection(tmp_path) -> tuple[CountingNumpyDB, HybridDatabase]:
+    vectors = CountingNumpyDB(path=str(tmp_path))
+    database = HybridDatabase(
+        vectors, LexicalIndex(str(tmp_path / "lexical.sqlite")), candidates=3
+    )
+    database.insert_many(
+        [item(f"filler{index}", f"chunk {index}", [0.0, 1.0]) for index in range(40)]
+        + [
+            item("radiator", "the radiator cools the engine", [1.0, 0.2]),
+            item("coolant", "coolant flows through the radiator", [1.0, 0.0]),
+        ]
+    )
+    return vectors, database
+
+
+def test_selective_keywords_score_only_their_matches(tmp_path):
+    vectors, database = keyword_collection(tmp_path)
+    results = database.search(
+        [1.0, 0.1], top_k=2, query_text="radiator", include_distances=True
+    )
+    assert vectors.searches == 0
+    assert {result.id for result in results} == {"radiator", "coolant"}
+    assert all(result.distance is not None for result in results)
+
+
+def test_too_few_matches_use_the_full_vector_search(tmp_path):
+    vectors, database = keyword_collection(tmp_path)
+    results = database.search([1.0, 0.1], top_k=3, query_text="radiator")
+    assert vectors.searches == 1
+    assert {"radiator", "coolant"} <= {result.id for result in results}
+
+
+def test_the_index_is_backfilled_from_the_database(tmp_path):
+    vectors = NumpyDB(path=str(tmp_path))
+    vectors.insert_many(
+        [
+            item("radiator", "the radiator cools the engine", [1.0, 0.0]),
+            item("tyres", "the tyres grip the road", [0.0, 1.0]),
+            item("brakes", "the brakes stop the car", [1.0, 1.0]),
+        ]
+    )
+    database = HybridDatabase(vectors, LexicalIndex(str(tmp_path / "lexical.sqlite")))
+    assert database.index.num_documents == 3
+    assert database.index.search("radiator", 5)[0][0] == "radiator"
@@ -0,0 +1,100 @@
+import time
+import threading
+
+from src.processing.readers import Extraction, Reader
+from src.processing.chunking import SymbolChunker
+from src.processing.manifest import IngestionManifest
+from src.processing.pipeline import IngestionPipeline
+from src.processing.jobs import IngestionJob, IngestionJobQueue
+from src.embeddings.types import EmbeddingModel, Embedding
+from src.database.numpydb import NumpyDB
+
+
+class CountingReader(Reader):
+    """Reads every file as a single page, optionally failing, and records the
+    largest number of files read at the same time."""
+
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+        self.calls = 0
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def get_text(self, path: str) -> list[Extraction]:
+        with self._lock:
+            self.calls += 1
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            time.sleep(0.05)
+            if self.fail:
+                raise ValueError("unreadable file")
+            with open(path, "rb") as file:
+                return [Extraction(file.read().decode(), "Page 1")]
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+class ConstantEmbedding(EmbeddingModel):
+    def get_embedding(self, text: str) -> Embedding:
+        return [1.0, 0.0]
+
+
+def make_pipeline(tmp_path, reader: Reader) -> IngestionPipeline:
+    return IngestionPipeline(
+        reader=reader,
+        chunker=SymbolChunker(chars_limit=64, overlap=8),
+        embedder=ConstantEmbedding(model="constant", base_url=""),
+        database=NumpyDB(path=str(tmp_path / "db")),
+        manifest=IngestionManifest(str(tmp_path / "manifest.json")),
+    )
+
+
+def wait_finished(queue: IngestionJobQueue) -> None:
+    deadline = time.monotonic() + 10
+    while queue.active and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_failed_jobs_run_again_only_when_retried(tmp_path):
+    reader = CountingReader(fail=True)
+    queue = IngestionJobQueue(
+        make_pipeline(tmp_path, reader), upload_dir=str(tmp_path / "uploads")
+    )
+    job = queue.submit("broken.pdf", b"content")
+    wait_finished(queue)
+    assert job.status == IngestionJob.FAILED
+
+    # Submitting the same file again, as on every rerun, returns the failed job
+    assert queue.submit("broken.pdf", b"content") is job
+    wait_finished(queue)
+    assert reader.calls == 1
+
+    reader.fail = False
+    queue.retry(job)
+    wait_finished(queue)
+    assert job.status == IngestionJob.DONE and reader.calls == 2
+
+
+def test_runs_for_the_same_document_are_serialized(tmp_path):
+    reader = CountingReader()
+    pipeline = make_pipeline(tmp_path, reader)
+    paths = []
+    for version in range(4):
+        path = tmp_path / f"version-{version}.txt"
+        path.write_text(f"version {version}")
+        paths.append(str(path))
+
+    threads = [
+        threading.Thread(target=pipeline.run, args=(path, "report")) for path in paths
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert reader.max_running == 1
+    assert pipeline.database.num_documents == 1
+    assert pipeline._document_locks == {}
@@ -0,0 +1,16 @@
+from src.processing.manifest import IngestionManifest
+
+
+def test_contains_follows_the_latest_version(tmp_path):
+    manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+    manifest.update("report", "hash-a", {})
+    manifest.update("copy", "hash-a", {})
+    manifest.update("report", "hash-b", {})
+    assert manifest.contains("hash-a") and manifest.contains("hash-b")
+
+    manifest.update("copy", "hash-c", {})
+    assert not manifest.contains("hash-a")
+
+    reloaded = IngestionManifest(manifest.path)
+    assert reloaded.contains("hash-b") and reloaded.contains("hash-c")
+    assert reloaded.document_paths == ["copy", "report"]
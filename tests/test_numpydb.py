@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+
+from src.database.types import CollectionItem
+from src.database.numpydb import NumpyDB
+
+
+def item(id: str, embedding: list[float]) -> CollectionItem:
+    return CollectionItem(
+        id=id,
+        text=f"text of {id}",
+        embedding=embedding,
+        document_path="doc",
+        location=id,
+    )
+
+
+def test_an_id_repeated_in_a_batch_keeps_its_last_document(tmp_path):
+    database = NumpyDB(path=str(tmp_path))
+    database.insert_many(
+        [item("a", [1.0, 0.0]), item("b", [1.0, 1.0]), item("a", [0.0, 1.0])]
+    )
+    results = database.search([0.0, 1.0], top_k=2, include_embeddings=True)
+    assert [result.id for result in results] == ["a", "b"]
+    assert results[0].embedding == [0.0, 1.0]
+
+
+@pytest.mark.parametrize("precision", ["float32", "int8"])
+def test_dead_rows_are_reclaimed(tmp_path, precision):
+    database = NumpyDB(path=str(tmp_path), precision=precision)
+    for version in range(10):  # Every document is overwritten on each ingestion
+        database.insert_many(
+            [item(str(index), [index, version + 1.0]) for index in range(8)]
+        )
+    database.delete(["0", "1", "2"])
+    assert database.num_rows <= 8 / (1 - database.max_dead_share)
+
+    for reopened in (database, NumpyDB(path=str(tmp_path), precision=precision)):
+        assert reopened.num_documents == 5
+        results = reopened.search([1.0, 0.0], top_k=2)
+        assert [result.id for result in results] == ["7", "6"]
+        assert reopened.get(["3"])[0].text == "text of 3"
+
+
+
+def test_searches_score_outside_the_lock_and_survive_a_vacuum(tmp_path):
+    database = NumpyDB(path=str(tmp_path))
+    database.insert_many([item(str(index), [index, 1.0]) for index in range(8)])
+    scores = database._scores
+    calls = []
+
+    def scores_during_a_vacuum(*args, **kwargs):
+        # Another thread can write while the rows are scored
+        writer = threading.Thread(target=database.delete, args=(["5", "6", "7"],))
+        if not calls:
+            writer.start()
+            writer.join(timeout=5)
+        calls.append(not writer.is_alive())
+        return scores(*args, **kwargs)
+
+    database._scores = scores_during_a_vacuum
+    results = database.search([1.0, 0.0], top_k=2)
+    # The rows moved by the vacuum are scored again
+    assert calls == [True, True]
+    assert [result.id for result in results] == ["4", "3"]
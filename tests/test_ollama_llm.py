@@ -0,0 +1,20 @@
+from src.llm.ollama import OllamaLLM
+from src.llm.prompt import PromptBuilder
+
+
+class StubOllamaLLM(OllamaLLM):
+    """OllamaLLM answering with the question, without an Ollama server."""
+
+    def __init__(self) -> None:
+        self.prompt_builder = PromptBuilder()
+
+    def _stream_chat(self, messages: list[dict]):
+        yield messages[-1]["content"]
+
+
+def test_each_stream_keeps_the_stats_of_its_prompt():
+    llm = StubOllamaLLM()
+    short = llm.ask_stream("Short?")
+    long = llm.ask_stream("A much longer question than the other one? " * 10)
+    assert list(short) == ["Short?"]
+    assert short.stats["prompt_tokens"] < long.stats["prompt_tokens"]
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from src.processing.readers import Extraction, Reader
+from src.processing.chunking import SymbolChunker
+from src.processing.manifest import IngestionManifest
+from src.processing.pipeline import IngestionPipeline
+from src.embeddings.types import EmbeddingModel, Embedding
+from src.database.numpydb import NumpyDB
+
+
+class PagesReader(Reader):
+    """Reads a JSON file holding the text of each page."""
+
+    def get_text(self, path: str) -> list[Extraction]:
+        with open(path, "r") as file:
+            pages = json.load(file)
+        return [
+            Extraction(text, f"Page {number}")
+            for number, text in enumerate(pages, start=1)
+        ]
+
+
+class LengthEmbedding(EmbeddingModel):
+    def get_embedding(self, text: str) -> Embedding:
+        return [float(len(text)), 1.0, 0.0]
+
+
+@pytest.fixture
+def pipeline(tmp_path) -> IngestionPipeline:
+    return IngestionPipeline(
+        reader=PagesReader(),
+        chunker=SymbolChunker(chars_limit=64, overlap=8),
+        embedder=LengthEmbedding(model="length", base_url=""),
+        database=NumpyDB(path=str(tmp_path / "db")),
+        manifest=IngestionManifest(str(tmp_path / "manifest.json")),
+    )
+
+
+def write_pages(path, pages: list[str]) -> str:
+    path.write_text(json.dumps(pages))
+    return str(path)
+
+
+def stored_pages(pipeline: IngestionPipeline, document_path: str) -> dict[str, str]:
+    """Text stored for each page, read back through the IDs of the manifest."""
+    pages = pipeline.manifest.get_pages(document_path)
+    stored = {}
+    for location, page in pages.items():
+        items = pipeline.database.get(page["ids"])
+        assert len(items) == len(page["ids"])
+        assert all(item.location == location for item in items)
+        stored[location] = "".join(item.text for item in items)
+    return stored
+
+
+def test_reingesting_a_previous_version_keeps_unchanged_pages(pipeline, tmp_path):
+    version_a = ["first page", "second page", "third page"]
+    version_b = ["first page", "second page", "third page, edited"]
+    path_a = write_pages(tmp_path / "a.json", version_a)
+    path_b = write_pages(tmp_path / "b.json", version_b)
+
+    assert pipeline.run(path_a, document_path="report") == 3
+    assert pipeline.run(path_b, document_path="report") == 1
+    # Only the third page changed, the first two keep the chunks of version A
+    assert pipeline.run(path_a, document_path="report") == 1
+
+    assert stored_pages(pipeline, "report") == {
+        "Page 1": "first page",
+        "Page 2": "second page",
+        "Page 3": "third page",
+    }
+    ids = [
+        chunk_id
+        for page in pipeline.manifest.get_pages("report").values()
+        for chunk_id in page["ids"]
+    ]
+    assert len(ids) == len(set(ids)) == pipeline.database.num_documents
+
+
+def test_uploads_with_the_same_name_are_kept_apart(pipeline, tmp_path):
+    path_a = write_pages(tmp_path / "a.json", ["one document"])
+    path_b = write_pages(tmp_path / "b.json", ["another document"])
+    for path in (path_a, path_b):
+        pipeline.run(path, document_path="upload.pdf", document_key=path)
+
+    assert pipeline.manifest.document_paths == ["upload.pdf"]
+    assert stored_pages(pipeline, path_a) == {"Page 1": "one document"}
+    assert stored_pages(pipeline, path_b) == {"Page 1": "another document"}
+    assert pipeline.database.num_documents == 2
@@ -0,0 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz
+
+from src.processing.readers import PDFReader
+
+
+def write_pdf(path, num_pages: int) -> str:
+    with fitz.open() as doc:
+        for number in range(num_pages):
+            doc.new_page().insert_text((72, 72), f"Text of page {number + 1}")
+        doc.save(str(path))
+    return str(path)
+
+
+def test_large_documents_share_one_spawned_pool(tmp_path):
+    reader = PDFReader(num_workers=2, pages_per_task=4)
+    paths = [write_pdf(tmp_path / f"{index}.pdf", 10 + index) for index in range(3)]
+    try:
+        # Documents read from several threads, as in the ingestion workers
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            results = list(executor.map(reader.get_text, paths))
+        pool = reader._pool
+        assert pool is not None and pool._mp_context.get_start_method() == "spawn"
+
+        for index, extractions in enumerate(results):
+            assert [extraction.text.strip() for extraction in extractions] == [
+                f"Text of page {number + 1}" for number in range(10 + index)
+            ]
+        reader.get_text(paths[0])
+        assert reader._pool is pool
+    finally:
+        reader.close()
+    assert reader._pool is None
+
+
+def test_small_documents_are_read_without_the_pool(tmp_path):
+    reader = PDFReader(num_workers=2, pages_per_task=4)
+    extractions = reader.get_text(write_pdf(tmp_path / "small.pdf", 3))
+    assert len(extractions) == 3 and reader._pool is None